@@ -2,9 +2,14 @@ from dotenv import load_dotenv
 from flask import Flask, jsonify, make_response, Response, request
 from config import ProductionConfig, TestConfig
 from werkzeug.exceptions import BadRequest, Unauthorized
+from datetime import datetime
+import copy
 import logging
+import os
 import requests
 import random
+import sqlite3
+import threading
 
 from typing import Dict
 from workout.utils.logger import configure_logger
@@ -13,8 +18,12 @@ logger = logging.getLogger(__name__)
 configure_logger(logger)
 
 from workout.models.user_model import create_user, login, update_password, clear_users, get_id_by_username
-from workout.models.recommendations_model import RecommendationsModel, Exercise
+from workout.models.recommendations_model import HISTORY_MODES, RecommendationsModel, Exercise, prewarm_results, result_cache_stats
 from workout.models.log_model import *
+from workout.models import catalog_model, plan_model, snapshot_model, track_model
+from workout.utils.http_client import get_client
+from workout.utils.refresher import BackgroundRefresher, RefreshJob
+from workout.utils.sql_utils import shared_db_connection
 
 # Load environment variables from .env file
 load_dotenv()
@@ -23,6 +32,70 @@ app = Flask(__name__)
 
 accounts: Dict[str, RecommendationsModel] = {}
 
+# Page size of the find-exercise routes when no limit is given, and the largest allowed
+DEFAULT_RESULT_LIMIT = int(os.getenv("DEFAULT_RESULT_LIMIT", 20))
+MAX_RESULT_LIMIT = int(os.getenv("MAX_RESULT_LIMIT", 100))
+
+# Keeps the wger catalog and Jamendo tracks fresh so requests never wait on a refresh
+refresher = BackgroundRefresher(
+    base_backoff=float(os.getenv("REFRESH_BACKOFF_SECONDS", 30)),
+    max_backoff=float(os.getenv("REFRESH_MAX_BACKOFF_SECONDS", 3600)),
+)
+refresher.add(RefreshJob(
+    "wger_catalog",
+    current=lambda: catalog_model.get_catalog(ttl=float("inf")),
+    refresh=catalog_model.revalidate_catalog,
+    ttl=catalog_model.CATALOG_TTL_SECONDS,
+))
+refresher.add(RefreshJob(
+    "jamendo_tracks",
+    current=lambda: track_model.get_tracks(ttl=float("inf")),
+    refresh=track_model.revalidate_tracks,
+    ttl=track_model.TRACKS_TTL_SECONDS,
+))
+if os.getenv("PRECOMPUTE_WEEKLY_PLANS", "false").lower() == "true":
+    # Plans next week for every stored profile once a day, off the request path
+    refresher.add(RefreshJob(
+        "weekly_plans",
+        current=plan_model.get_plan_batch,
+        refresh=plan_model.precompute_weekly_plans,
+        ttl=float(os.getenv("PLAN_BATCH_INTERVAL_SECONDS", 24 * 60 * 60)),
+        ahead=1.0,
+        jitter=0.0,
+    ))
+
+def start_services() -> None:
+    """
+    Restores stored accounts and starts the background work of the web process.
+
+    Runs only when app.py is the entry point, not on import: plan batch workers are
+    spawned processes that import app.py again as __mp_main__, and must not restore
+    profiles, start a refresher or call upstream themselves.
+    """
+    try:
+        # Restore the accounts whose profiles were stored before a restart
+        for profile in plan_model.load_profiles():
+            model = accounts[profile.username] = RecommendationsModel(profile.username)
+            if profile.target_groups:
+                model.set_target_groups(profile.target_groups)
+            if profile.equipment:
+                model.set_equipment(profile.equipment)
+    except sqlite3.Error as e:
+        logger.warning("Could not restore stored profiles: %s", str(e))
+    if snapshot_model.OFFLINE_ONLY:
+        # Load the snapshot up front so the first request does not pay for it, and refuse
+        # to start without one rather than quietly calling the upstreams
+        if snapshot_model.get_snapshot_index() is None:
+            raise snapshot_model.missing_snapshot_error()
+    elif os.getenv("BACKGROUND_REFRESH", "true").lower() == "true":
+        refresher.start()
+    if os.getenv("PREWARM_RESULTS", "false").lower() == "true":
+        # Cache the standard target group queries without delaying startup
+        threading.Thread(target=prewarm_results, name="prewarm-results", daemon=True).start()
+    if os.getenv("PREFILL_SONG_POOL", "true").lower() == "true":
+        # Draw the first random songs before the first request asks for one
+        track_model.prefill_song_pool()
+
 ####################################################
 #
 # Healthchecks
@@ -35,10 +108,30 @@ def healthcheck() -> Response:
     Health check route to verify the service is running.
 
     Returns:
-        JSON response indicating the health status of the service.
+        JSON response indicating the health status of the service, the background refresher,
+        the offline snapshot, the recommendation result cache and the random song pool.
     """
     app.logger.info('Health check')
-    return make_response(jsonify({'status': 'healthy'}), 200)
+    return make_response(jsonify({'status': 'healthy', 'refresher': refresher.status(),
+                                  'snapshot': snapshot_model.snapshot_status(),
+                                  'results': result_cache_stats(),
+                                  'songs': track_model.song_pool_stats()}), 200)
+
+@app.route('/api/upstream-stats', methods=['GET'])
+def upstream_stats() -> Response:
+    """
+    Route to report request counts and latencies for the upstream APIs.
+
+    Returns:
+        JSON response with per-host request, error and retry counts and latency percentiles,
+        how many identical concurrent requests were coalesced, plus the on-disk
+        response cache counters when the cache is enabled.
+    """
+    client = get_client()
+    stats = {'status': 'success', 'upstreams': client.stats(), 'coalesced': client.flight_stats()}
+    if client.cache is not None:
+        stats['cache'] = client.cache.stats()
+    return make_response(jsonify(stats), 200)
 
 ##########################################################
 #
@@ -69,6 +162,7 @@ def create_account() -> Response:
 
         create_user(username, password)
         accounts[username] = RecommendationsModel(username)
+        _save_profile(accounts[username])
         app.logger.info("User added: %s", username)
         
         return make_response(jsonify({'status': 'user added', 'username': username}), 201)
@@ -152,6 +246,7 @@ def clear_users_route():
     app.logger.warning("Attempting to clear all users. Ensure this route is secure.")
     try:
         clear_users()
+        plan_model.clear_profiles()
         accounts.clear()
         app.logger.info("All users cleared successfully.")
         return jsonify({"message": "All users cleared successfully."}), 200
@@ -164,6 +259,15 @@ def clear_users_route():
 # Target Management
 #
 ##########################################################
+
+def _save_profile(model: RecommendationsModel) -> None:
+    """
+    Stores a user's target groups and equipment so the weekly plan batch picks up the change.
+
+    Args:
+        model (RecommendationsModel): The user's model.
+    """
+    plan_model.save_profile(model.username, model.get_target_groups(), model.get_equipment())
     
 @app.route('/api/set-target-groups', methods=['POST'])
 def api_set_target_groups():
@@ -189,6 +293,7 @@ def api_set_target_groups():
         result = model.set_target_groups(groups)
         
         if result:
+            _save_profile(model)
             return jsonify({"status": "success"}), 200
         else:
             return jsonify({"status": "error"}), 500
@@ -221,6 +326,7 @@ def api_add_target_group():
         result = model.add_target_group(group)
         
         if result:
+            _save_profile(model)
             return jsonify({"status": "success"}), 200
         else:
             return jsonify({"status": "error"}), 500
@@ -253,6 +359,7 @@ def api_remove_target_group():
         result = model.remove_target_group(group)
         
         if result:
+            _save_profile(model)
             return jsonify({"status": "success"}), 200
         else:
             return jsonify({"status": "error"}), 500
@@ -317,6 +424,7 @@ def api_set_available_equipment_list():
         result = model.set_equipment(equipment_list)
         
         if result:
+            _save_profile(model)
             return jsonify({"status": "success"}), 200
         else:
             return jsonify({"status": "error"}), 500
@@ -349,6 +457,7 @@ def api_add_available_equipment():
         result = model.add_equipment(equipment)
         
         if result:
+            _save_profile(model)
             return jsonify({"status": "success"}), 200
         else:
             return jsonify({"status": "error"}), 500
@@ -381,6 +490,7 @@ def api_remove_available_equipment():
         result = model.remove_equipment(equipment)
         
         if result:
+            _save_profile(model)
             return jsonify({"status": "success"}), 200
         else:
             return jsonify({"status": "error"}), 500
@@ -421,6 +531,43 @@ def api_get_available_equipment():
 #
 ##########################################################
 
+def _page_args():
+    """
+    Reads the limit and offset query parameters of the paged routes.
+
+    Returns:
+        tuple: (limit, offset), with limit capped at MAX_RESULT_LIMIT.
+
+    Raises:
+        ValueError: If either is not a non-negative integer.
+    """
+    limit = int(request.args.get('limit', DEFAULT_RESULT_LIMIT))
+    offset = int(request.args.get('offset', 0))
+    if limit < 0 or offset < 0:
+        raise ValueError("limit and offset must be non-negative")
+    return min(limit, MAX_RESULT_LIMIT), offset
+
+def _history_args():
+    """
+    Reads the history and history_days query parameters of the find-exercise routes.
+
+    Returns:
+        tuple: (history, history_days); history is None, "exclude" or "downweight",
+            history_days is None when not given.
+
+    Raises:
+        ValueError: If history is unknown or history_days is not a non-negative integer.
+    """
+    history = request.args.get('history') or None
+    history_days = request.args.get('history_days')
+    if history is not None and history not in HISTORY_MODES:
+        raise ValueError(f"history must be one of {', '.join(HISTORY_MODES)}")
+    if history_days is not None:
+        history_days = int(history_days)
+        if history_days < 0:
+            raise ValueError("history_days must be non-negative")
+    return history, history_days
+
 @app.route('/api/find-exercise_by-target_groups', methods=['GET'])
 def api_find_exercise_by_target_groups():
     """
@@ -428,21 +575,33 @@ def api_find_exercise_by_target_groups():
 
     Query Parameters:
         - username (str): The username of the user.
+        - limit (int, optional): Number of exercises to return, at most MAX_RESULT_LIMIT. Defaults to DEFAULT_RESULT_LIMIT.
+        - offset (int, optional): Number of ranked exercises to skip. Defaults to 0.
+        - history (str, optional): "exclude" or "downweight" exercises the user logged recently.
+        - history_days (int, optional): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
 
     Returns:
-        JSON response containing the status of the operation and a list of exercises matching the user's target groups.
+        JSON response containing the status of the operation and one page of the best ranked exercises matching the user's target groups.
     """
     try:
         username = request.args.get('username')
         
         if not username: return jsonify({"error": "username required"}), 400
         if username not in accounts: return jsonify({"error": "username not found"}), 404
+        try:
+            limit, offset = _page_args()
+        except ValueError:
+            return jsonify({"error": "limit and offset must be non-negative integers"}), 400
+        try:
+            history, history_days = _history_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         model = accounts[username]
         target_groups = model.get_target_groups()
-        exercises = model.get_exercises_by_many_muscle_groups(target_groups)
+        exercises = model.get_exercises_by_many_muscle_groups(target_groups, limit, offset, history, history_days)
         
-        return jsonify({"status": "success", "exercises": exercises}), 200
+        return jsonify({"status": "success", "exercises": exercises, "limit": limit, "offset": offset}), 200
         
     except Exception as e:
         app.logger.info(e)
@@ -456,9 +615,13 @@ def api_find_exercise_by_groups():
     Query Parameters:
         - username (str): The username of the user.
         - groups (list): A list of muscle groups to search for exercises.
+        - limit (int, optional): Number of exercises to return, at most MAX_RESULT_LIMIT. Defaults to DEFAULT_RESULT_LIMIT.
+        - offset (int, optional): Number of ranked exercises to skip. Defaults to 0.
+        - history (str, optional): "exclude" or "downweight" exercises the user logged recently.
+        - history_days (int, optional): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
 
     Returns:
-        JSON response containing the status of the operation and a list of exercises matching the specified muscle groups.
+        JSON response containing the status of the operation and one page of the best ranked exercises matching the specified muscle groups.
     """
     try:
         username = request.args.get('username')
@@ -466,11 +629,19 @@ def api_find_exercise_by_groups():
 
         if not username or not groups: return jsonify({"error": "username and groups required"}), 400
         if username not in accounts: return jsonify({"error": "username not found"}), 404
+        try:
+            limit, offset = _page_args()
+        except ValueError:
+            return jsonify({"error": "limit and offset must be non-negative integers"}), 400
+        try:
+            history, history_days = _history_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         model = accounts[username]
-        exercises = model.get_exercises_by_many_muscle_groups(groups)
+        exercises = model.get_exercises_by_many_muscle_groups(groups, limit, offset, history, history_days)
         
-        return jsonify({"status": "success", "exercises": exercises}), 200
+        return jsonify({"status": "success", "exercises": exercises, "limit": limit, "offset": offset}), 200
         
     except Exception as e:
         app.logger.info(e)
@@ -483,21 +654,33 @@ def api_find_exercise_by_available_equipment():
 
     Query Parameters:
         - username (str): The username of the user.
+        - limit (int, optional): Number of exercises to return, at most MAX_RESULT_LIMIT. Defaults to DEFAULT_RESULT_LIMIT.
+        - offset (int, optional): Number of ranked exercises to skip. Defaults to 0.
+        - history (str, optional): "exclude" or "downweight" exercises the user logged recently.
+        - history_days (int, optional): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
 
     Returns:
-        JSON response containing the status of the operation and a list of exercises that can be performed with the available equipment.
+        JSON response containing the status of the operation and one page of the best ranked exercises that can be performed with the available equipment.
     """
     try:
         username = request.args.get('username')
 
         if not username: return jsonify({"error": "username required"}), 400
         if username not in accounts: return jsonify({"error": "username not found"}), 404
+        try:
+            limit, offset = _page_args()
+        except ValueError:
+            return jsonify({"error": "limit and offset must be non-negative integers"}), 400
+        try:
+            history, history_days = _history_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         model = accounts[username]
         available_equipment = model.get_equipment()
-        exercises = model.get_exercises_by_many_equipment(available_equipment)
+        exercises = model.get_exercises_by_many_equipment(available_equipment, limit, offset, history, history_days)
         
-        return jsonify({"status": "success", "exercises": exercises}), 200
+        return jsonify({"status": "success", "exercises": exercises, "limit": limit, "offset": offset}), 200
         
     except Exception as e:
         app.logger.info(e)
@@ -511,9 +694,13 @@ def api_find_exercise_by_equipment():
     Query Parameters:
         - username (str): The username of the user.
         - equipment (list): A list of equipment items to search for exercises.
+        - limit (int, optional): Number of exercises to return, at most MAX_RESULT_LIMIT. Defaults to DEFAULT_RESULT_LIMIT.
+        - offset (int, optional): Number of ranked exercises to skip. Defaults to 0.
+        - history (str, optional): "exclude" or "downweight" exercises the user logged recently.
+        - history_days (int, optional): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
 
     Returns:
-        JSON response containing the status of the operation and a list of exercises that can be performed with the specified equipment.
+        JSON response containing the status of the operation and one page of the best ranked exercises that can be performed with the specified equipment.
     """
     try:
         data = request.get_json()
@@ -522,11 +709,209 @@ def api_find_exercise_by_equipment():
 
         if not username or not equipment: return jsonify({"error": "username and equipment required"}), 400
         if username not in accounts: return jsonify({"error": "username not found"}), 404
+        try:
+            limit, offset = _page_args()
+        except ValueError:
+            return jsonify({"error": "limit and offset must be non-negative integers"}), 400
+        try:
+            history, history_days = _history_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
         
         model = accounts[username]
-        exercises = model.get_exercises_by_many_equipment(equipment)
+        exercises = model.get_exercises_by_many_equipment(equipment, limit, offset, history, history_days)
         
-        return jsonify({"status": "success", "exercises": exercises}), 200
+        return jsonify({"status": "success", "exercises": exercises, "limit": limit, "offset": offset}), 200
+
+    except Exception as e:
+        app.logger.info(e)
+        return jsonify({"error": str(e)}), 500
+    
+@app.route('/api/find-exercise-by-groups-and-equipment', methods=['GET'])
+def api_find_exercise_by_groups_and_equipment():
+    """
+    Route to find exercises working the given muscle groups that can be done with the given equipment.
+
+    Query Parameters:
+        - username (str): The username of the user.
+        - groups (list, optional): Muscle groups to search for. Defaults to the user's target groups.
+        - equipment (list, optional): Equipment available. Defaults to the user's equipment.
+        - limit (int, optional): Number of exercises to return, at most MAX_RESULT_LIMIT. Defaults to DEFAULT_RESULT_LIMIT.
+        - offset (int, optional): Number of ranked exercises to skip. Defaults to 0.
+        - history (str, optional): "exclude" or "downweight" exercises the user logged recently.
+        - history_days (int, optional): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
+
+    Returns:
+        JSON response containing the status of the operation and one page of the best ranked exercises matching both.
+    """
+    try:
+        username = request.args.get('username')
+
+        if not username: return jsonify({"error": "username required"}), 400
+        if username not in accounts: return jsonify({"error": "username not found"}), 404
+        try:
+            limit, offset = _page_args()
+        except ValueError:
+            return jsonify({"error": "limit and offset must be non-negative integers"}), 400
+        try:
+            history, history_days = _history_args()
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        model = accounts[username]
+        groups = request.args.getlist('groups') or model.get_target_groups()
+        equipment = request.args.getlist('equipment') or model.get_equipment()
+        if not groups: return jsonify({"error": "groups required"}), 400
+        exercises = model.get_exercises_by_groups_and_equipment(groups, equipment, limit, offset, history, history_days)
+
+        return jsonify({"status": "success", "exercises": exercises, "limit": limit, "offset": offset}), 200
+
+    except Exception as e:
+        app.logger.info(e)
+        return jsonify({"error": str(e)}), 500
+    
+@app.route('/api/build-workout-plan', methods=['GET'])
+def api_build_workout_plan():
+    """
+    Route to build a workout plan that fills a time budget.
+
+    Query Parameters:
+        - username (str): The username of the user.
+        - minutes (int): The time budget in minutes.
+        - groups (list, optional): Muscle groups to work. Defaults to the user's target groups.
+        - equipment (list, optional): Equipment available. Defaults to the user's equipment.
+
+    Returns:
+        JSON response containing the status of the operation and the plan: exercises with their
+        sets and minutes, the minutes used and the budget.
+    """
+    try:
+        username = request.args.get('username')
+        minutes = request.args.get('minutes')
+
+        if not username or not minutes: return jsonify({"error": "username and minutes required"}), 400
+        if username not in accounts: return jsonify({"error": "username not found"}), 404
+
+        model = accounts[username]
+        groups = request.args.getlist('groups') or None
+        equipment = request.args.getlist('equipment') or None
+        try:
+            plan = model.build_workout_plan(int(minutes), groups, equipment)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"status": "success", "plan": plan}), 200
+
+    except Exception as e:
+        app.logger.info(e)
+        return jsonify({"error": str(e)}), 500
+    
+@app.route('/api/get-weekly-plan', methods=['GET'])
+def api_get_weekly_plan():
+    """
+    Route to get a user's workout plan for a week.
+
+    Plans precomputed by the weekly plan batch are served as stored; a week the batch has
+    not planned for the user is built from their profile and stored.
+
+    Query Parameters:
+        - username (str): The username of the user.
+        - week_start (str, optional): Monday of the week, YYYY-MM-DD. Defaults to the current week.
+
+    Returns:
+        JSON response containing the status of the operation, the plan of each session and
+        whether the plan was precomputed.
+    """
+    try:
+        username = request.args.get('username')
+        week = request.args.get('week_start')
+
+        if not username: return jsonify({"error": "username required"}), 400
+        if username not in accounts: return jsonify({"error": "username not found"}), 404
+        if week is not None:
+            try:
+                week = plan_model.week_start(datetime.strptime(week, "%Y-%m-%d").date()).isoformat()
+            except ValueError:
+                return jsonify({"error": f"Invalid week_start {week}. week_start must be in format: YYYY-MM-DD"}), 400
+
+        plan = plan_model.get_weekly_plan(username, week)
+        precomputed = plan is not None
+        if plan is None:
+            model = accounts[username]
+            profile = plan_model.Profile(username, model.get_target_groups(), model.get_equipment())
+            plan = plan_model.plan_profile(catalog_model.get_catalog_index(), profile,
+                                           week or plan_model.week_start().isoformat())
+            plan_model.store_weekly_plans([plan])
+
+        return jsonify({"status": "success", "week_start": plan.week_start, "sessions": plan.sessions,
+                        "precomputed": precomputed}), 200
+
+    except Exception as e:
+        app.logger.info(e)
+        return jsonify({"error": str(e)}), 500
+
+@app.route('/api/precompute-weekly-plans', methods=['POST'])
+def api_precompute_weekly_plans():
+    """
+    Route to run the weekly plan batch now rather than waiting for the nightly run.
+
+    Expected JSON Input:
+        - week_start (str, optional): Monday of the week to plan, YYYY-MM-DD. Defaults to next week.
+        - workers (int, optional): Worker processes. Defaults to PLAN_BATCH_WORKERS.
+
+    Returns:
+        JSON response with the batch report: users found, planned and failed, workers,
+        seconds and users per second.
+    """
+    app.logger.warning("Running the weekly plan batch. Ensure this route is secure.")
+    try:
+        data = request.get_json(silent=True) or {}
+        week = data.get('week_start')
+        workers = data.get('workers')
+        if week is not None:
+            try:
+                week = plan_model.week_start(datetime.strptime(week, "%Y-%m-%d").date()).isoformat()
+            except ValueError:
+                return jsonify({"error": f"Invalid week_start {week}. week_start must be in format: YYYY-MM-DD"}), 400
+
+        batch = plan_model.precompute_weekly_plans(week, workers=None if workers is None else int(workers))
+        return jsonify({"status": "success", "batch": batch}), 200
+
+    except Exception as e:
+        app.logger.error("Error running the weekly plan batch: %s", str(e))
+        return jsonify({"error": "An unexpected error occurred."}), 500
+
+@app.route('/api/replace-exercise', methods=['GET'])
+def api_replace_exercise():
+    """
+    Route to swap a recommended exercise for a different one with the same muscles and equipment.
+
+    Query Parameters:
+        - username (str): The username of the user.
+        - exercise_name (str): The exercise to replace.
+        - muscle_group (str, optional): Target group to pick from when nothing shares the exercise's profile.
+        - seed (int, optional): Selects among the alternatives; the same seed gives the same pick. Defaults to 0.
+
+    Returns:
+        JSON response containing the status of the operation and the replacement exercise.
+    """
+    try:
+        username = request.args.get('username')
+        exercise_name = request.args.get('exercise_name')
+        muscle_group = request.args.get('muscle_group')
+
+        if not username or not exercise_name: return jsonify({"error": "username and exercise_name required"}), 400
+        if username not in accounts: return jsonify({"error": "username not found"}), 404
+        try:
+            seed = int(request.args.get('seed', 0))
+        except ValueError:
+            return jsonify({"error": "seed must be an integer"}), 400
+
+        model = accounts[username]
+        exercise = model.replace_exercise(exercise_name, muscle_group, seed)
+        if exercise is None: return jsonify({"error": "no alternative exercise found"}), 404
+
+        return jsonify({"status": "success", "exercise": exercise}), 200
 
     except Exception as e:
         app.logger.info(e)
@@ -741,9 +1126,11 @@ def fetch_songs_by_workouts():
     
     Query Parameters:
         - workout_count (int): The number of workouts completed by the user.
+        - limit (int, optional): Number of songs to return, at most MAX_RESULT_LIMIT. Defaults to DEFAULT_RESULT_LIMIT.
+        - offset (int, optional): Number of matching songs to skip. Defaults to 0.
 
     Returns:
-        JSON response with a list of song names and their artists.
+        JSON response with one page of song names and their artists, shortest songs first.
     """
     try:
         username = request.args.get('username')
@@ -751,14 +1138,18 @@ def fetch_songs_by_workouts():
         
         if not username: return jsonify({"error": "username required"}), 400
         if username not in accounts: return jsonify({"error": "username not found"}), 404
+        try:
+            limit, offset = _page_args()
+        except ValueError:
+            return jsonify({"error": "limit and offset must be non-negative integers"}), 400
         
         model = accounts[username]
         
         workout_count = int(count)
-        songs = model.fetch_songs_based_on_workouts(workout_count)
+        songs = model.fetch_songs_based_on_workouts(workout_count, limit, offset)
         
-        if songs:
-            return jsonify({"status": "success", "songs": songs}), 200
+        if songs or offset:
+            return jsonify({"status": "success", "songs": songs, "limit": limit, "offset": offset}), 200
         else:
             return jsonify({"status": "error", "songs": "no songs found"}), 404
         
@@ -766,6 +1157,39 @@ def fetch_songs_by_workouts():
         logger.error(f"Error fetching songs by workouts: {e}")
         return jsonify({"error": str(e)}), 500
 
+@app.route('/api/build-playlist', methods=['GET'])
+def api_build_playlist():
+    """
+    Route to build a playlist covering a workout session.
+
+    Query Parameters:
+        - username (str): The username of the user.
+        - minutes (int): Length of the session.
+        - seed (int, optional): Selects among the playlists that fit; the same seed gives the same playlist. Defaults to 0.
+
+    Returns:
+        JSON response containing the status of the operation and the playlist: its songs, their
+        total length and the session length in seconds, and whether the search finished in time.
+    """
+    try:
+        username = request.args.get('username')
+        minutes = request.args.get('minutes')
+
+        if not username or not minutes: return jsonify({"error": "username and minutes required"}), 400
+        if username not in accounts: return jsonify({"error": "username not found"}), 404
+
+        model = accounts[username]
+        try:
+            playlist = model.build_playlist(int(minutes), int(request.args.get('seed', 0)))
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+
+        return jsonify({"status": "success", "playlist": playlist}), 200
+
+    except Exception as e:
+        logger.error(f"Error building playlist: {e}")
+        return jsonify({"error": str(e)}), 500
+
 @app.route('/api/fetch-random-song', methods=['GET'])
 def fetch_random_song_route():
     """
@@ -790,5 +1214,175 @@ def fetch_random_song_route():
         logger.error(f"Error fetching random song: {e}")
         return jsonify({"error": str(e)}), 500
 
+##########################################################
+#
+# Batching
+#
+##########################################################
+
+# Routes a batch may run. Writes are rolled back together when one of them fails.
+# Upstream routes may wait on wger or Jamendo, so they never share a batch with
+# writes and the database write lock is never held across an upstream request.
+BATCH_READS = {
+    "login", "get-target-groups", "get-available-equipment",
+    "get-all-logs", "get-log-by-date", "get-log-by-muscle-group",
+}
+BATCH_WRITES = {
+    "create-account", "update-password",
+    "set-target-groups", "add-target-group", "remove-target-group",
+    "set-available-equipment-list", "add-available-equipment", "remove-available-equipment",
+    "create-log", "clear-logs", "delete-log-by-date", "update-log",
+}
+BATCH_UPSTREAM = {
+    "find-exercise_by-target_groups", "find-exercise-by-groups", "find-exercise-by-available-equipment",
+    "find-exercise-by-groups-and-equipment", "build-workout-plan", "get-weekly-plan", "replace-exercise",
+    "fetch-songs-by-workouts", "build-playlist", "fetch-random-song",
+}
+
+def _find_batch_route(route: str):
+    """
+    Looks up the endpoint and HTTP method serving /api/<route>.
+
+    Args:
+        route (str): The route name without the /api/ prefix.
+
+    Returns:
+        tuple: (endpoint, method), or None if no route matches.
+    """
+    path = f"/api/{route}"
+    for rule in app.url_map.iter_rules():
+        if rule.rule == path and rule.endpoint != 'api_batch':
+            return rule.endpoint, 'POST' if 'POST' in rule.methods else 'GET'
+    return None
+
+def _parse_batch(data) -> list:
+    """
+    Checks a batch request and resolves its operations.
+
+    Args:
+        data: The decoded JSON body.
+
+    Returns:
+        list: (route, args, endpoint, method) per operation, with the default username filled in.
+
+    Raises:
+        BadRequest: If the batch is malformed, names a route a batch may not run, or mixes
+            writes with upstream routes.
+    """
+    if not isinstance(data, dict):
+        raise BadRequest("JSON object required")
+    username = data.get('username')
+    operations = data.get('operations')
+    if not operations or not isinstance(operations, list):
+        raise BadRequest("operations required")
+
+    parsed = []
+    for operation in operations:
+        if not isinstance(operation, dict) or not isinstance(operation.get('route'), str):
+            raise BadRequest("each operation needs a route")
+        route = operation['route']
+        if route not in BATCH_READS | BATCH_WRITES | BATCH_UPSTREAM:
+            raise BadRequest(f"route {route} cannot run in a batch")
+        args = operation.get('args') or {}
+        if not isinstance(args, dict):
+            raise BadRequest(f"args of {route} must be an object")
+        args = dict(args)
+        if username and 'username' not in args:
+            args['username'] = username
+        target = _find_batch_route(route)
+        if target is None:
+            raise BadRequest(f"route {route} not found")
+        parsed.append((route, args) + target)
+
+    routes = {operation[0] for operation in parsed}
+    if routes & BATCH_WRITES and routes & BATCH_UPSTREAM:
+        raise BadRequest("a batch cannot mix writes with routes that call wger or Jamendo")
+    return parsed
+
+def _run_batch_operation(route: str, args: dict, endpoint: str, method: str) -> dict:
+    """
+    Runs one batch operation through its route handler.
+
+    Returns:
+        dict: The route, status code and JSON body of the response.
+    """
+    if method == 'GET':
+        context = app.test_request_context(f"/api/{route}", method=method, query_string=args)
+    else:
+        context = app.test_request_context(f"/api/{route}", method=method, json=args)
+    with context:
+        response = app.make_response(app.view_functions[endpoint]())
+    return {"route": route, "code": response.status_code, "body": response.get_json(silent=True)}
+
+@app.route('/api/batch', methods=['POST'])
+def api_batch():
+    """
+    Route to run several API operations in one request.
+
+    Operations run in order against the existing handlers and share one database
+    connection. Writes share its transaction; if any write fails, the transaction is
+    rolled back and the accounts the batch touched are restored. Only the routes in
+    BATCH_READS, BATCH_WRITES and BATCH_UPSTREAM may run, and writes cannot share a
+    batch with upstream routes.
+
+    Expected JSON Input:
+        - username (str, optional): Default username for operations that do not set one.
+        - operations (list): Objects with:
+            - route (str): The route name without the /api/ prefix, e.g. "get-target-groups".
+            - args (dict, optional): Query parameters for GET routes or the JSON body for POST routes.
+
+    Returns:
+        JSON response with one result per operation, in order, and whether writes were committed.
+    """
+    try:
+        operations = _parse_batch(request.get_json(silent=True))
+    except BadRequest as e:
+        return jsonify({"error": e.description}), 400
+
+    try:
+        if not any(route in BATCH_WRITES for route, _, _, _ in operations):
+            # Reads open no transaction, so the shared connection holds no lock across upstream calls
+            with shared_db_connection():
+                results = [_run_batch_operation(*operation) for operation in operations]
+            return jsonify({"status": "success", "committed": True, "results": results}), 200
+
+        # Account models live in memory, so keep copies of the ones the batch touches to
+        # put back if it rolls back; accounts of other users are left alone
+        usernames = {args['username'] for _, args, _, _ in operations if isinstance(args.get('username'), str)}
+        saved_models = {username: copy.deepcopy(accounts[username]) for username in usernames if username in accounts}
+
+        def restore_accounts() -> None:
+            for username in usernames:
+                if username in saved_models:
+                    accounts[username] = saved_models[username]
+                else:
+                    # Created by the batch
+                    accounts.pop(username, None)
+            # Recent logs remembered by the rolled back writes are read again on next use
+            clear_recent_logs()
+
+        results = []
+        failed_write = False
+        try:
+            with shared_db_connection() as conn:
+                for operation in operations:
+                    result = _run_batch_operation(*operation)
+                    results.append(result)
+                    if operation[0] in BATCH_WRITES and result["code"] >= 400:
+                        failed_write = True
+                if failed_write:
+                    conn.rollback()
+                    restore_accounts()
+        except Exception:
+            restore_accounts()
+            raise
+
+        return jsonify({"status": "success", "committed": not failed_write, "results": results}), 200
+
+    except Exception as e:
+        app.logger.info(e)
+        return jsonify({"error": str(e)}), 500
+
 if __name__ == '__main__':
+    start_services()
     app.run(debug=True, host='0.0.0.0', port=5000)
@@ -0,0 +1,78 @@
+"""
+Compares catalog filtering strategies on synthetic catalogs.
+
+    python -m benchmarks.bench_catalog_filter [sizes...]
+
+For each size it times, per query:
+  loops   the original per-target scans: keyword substring checks for groups and
+          equality with the joined equipment string for equipment
+  masks   a Python loop over the precomputed record bitmasks
+  numpy   CatalogIndex.select, one array expression per filter
+"""
+import random
+import sys
+import timeit
+
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.keyword_matcher import get_matcher
+from workout.utils.vocabulary import EQUIPMENT, MUSCLE_GROUPS
+
+EQUIPMENT_NAMES = ["Barbell", "Bench", "Dumbbell", "Gym mat", "Incline bench", "Kettlebell",
+                   "Pull-up bar", "SZ-Bar", "Swiss Ball", "Resistance band"]
+WORDS = ["squat", "running", "curl", "tricep", "pull", "row", "crunch", "plank", "swim", "press",
+         "lunge", "raise", "fly", "dip", "hold", "bridge", "extension", "kickback"]
+
+def synthetic_items(count: int, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    return [
+        {
+            "id": base_id,
+            "muscles": [],
+            "equipment": [{"name": name} for name in rng.sample(EQUIPMENT_NAMES, rng.choice([0, 1, 1, 2, 3]))],
+            "exercises": [{"name": f"{' '.join(rng.sample(WORDS, 2)).title()} {base_id}", "language": 2}],
+        }
+        for base_id in range(count)
+    ]
+
+def loops(index: CatalogIndex, groups: list, equipment: list) -> int:
+    rules = get_matcher().rules
+    found = 0
+    for target in groups:
+        for record in index.records:
+            if any(keyword in record.lowered_name for keyword in rules.get(target, ())):
+                found += 1
+    for target in equipment:
+        for record in index.records:
+            if record.equipment == target:
+                found += 1
+    return found
+
+def masks(index: CatalogIndex, group_mask: int, owned_mask: int) -> int:
+    found = 0
+    for record in index.records:
+        if record.language == 2 and record.group_mask & group_mask and not record.equipment_mask & ~owned_mask:
+            found += 1
+    return found
+
+def vectorized(index: CatalogIndex, group_mask: int, owned_mask: int) -> int:
+    return int(index.select(any_groups=group_mask, owned_equipment=owned_mask).sum())
+
+def main(sizes: list) -> None:
+    groups = ["leg", "back", "cardio"]
+    equipment = ["Barbell", "Bench", "Dumbbell"]
+    group_mask = MUSCLE_GROUPS.mask(groups)
+    owned_mask = EQUIPMENT.mask(name.lower() for name in equipment)
+
+    print(f"{'entries':>8} {'loops ms':>10} {'masks ms':>10} {'numpy ms':>10} {'speedup':>8}")
+    for size in sizes:
+        index = CatalogIndex(synthetic_items(size), version=f"bench-{size}")
+        timings = []
+        for run in (lambda: loops(index, groups, equipment),
+                    lambda: masks(index, group_mask, owned_mask),
+                    lambda: vectorized(index, group_mask, owned_mask)):
+            repeat = max(3, 200_000 // size)
+            timings.append(1000 * min(timeit.repeat(run, number=1, repeat=repeat)))
+        print(f"{size:>8} {timings[0]:>10.2f} {timings[1]:>10.2f} {timings[2]:>10.2f} {timings[0] / timings[2]:>7.0f}x")
+
+if __name__ == "__main__":
+    main([int(size) for size in sys.argv[1:]] or [10_000, 100_000])
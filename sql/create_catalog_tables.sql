@@ -0,0 +1,17 @@
+-- Drop the tables if they already exist
+DROP TABLE IF EXISTS exercise_catalog;
+DROP TABLE IF EXISTS catalog_meta;
+
+-- Create the exercise catalog table (local copy of wger exercisebaseinfo)
+CREATE TABLE exercise_catalog (
+    position INTEGER PRIMARY KEY, -- Order of the item in the upstream catalog
+    base_id INTEGER, -- wger exercise base id
+    data TEXT NOT NULL -- The exercisebaseinfo item as JSON
+);
+
+-- Create the catalog metadata table
+CREATE TABLE catalog_meta (
+    name TEXT PRIMARY KEY, -- Catalog name, e.g. 'wger'
+    version TEXT NOT NULL, -- Content hash of the stored catalog
+    fetched_at REAL NOT NULL -- Unix time the catalog was downloaded
+);
@@ -6,11 +6,15 @@ if [ -f "$DB_PATH" ]; then
     # Drop and recreate the tables
     sqlite3 "$DB_PATH" < /app/sql/create_login_table.sql
     sqlite3 "$DB_PATH" < /app/sql/create_logs_table.sql
+    sqlite3 "$DB_PATH" < /app/sql/create_catalog_tables.sql
+    sqlite3 "$DB_PATH" < /app/sql/create_plan_tables.sql
     echo "Database recreated successfully."
 else
     echo "Creating database at $DB_PATH."
     # Create the database for the first time
     sqlite3 "$DB_PATH" < /app/sql/create_login_table.sql
     sqlite3 "$DB_PATH" < /app/sql/create_logs_table.sql
+    sqlite3 "$DB_PATH" < /app/sql/create_catalog_tables.sql
+    sqlite3 "$DB_PATH" < /app/sql/create_plan_tables.sql
     echo "Database created successfully."
 fi
\ No newline at end of file
@@ -0,0 +1,34 @@
+-- Drop the tables if they already exist
+DROP TABLE IF EXISTS profiles;
+DROP TABLE IF EXISTS weekly_plans;
+DROP TABLE IF EXISTS plan_batches;
+
+-- Create the profiles table (target groups and equipment the plan batch plans for)
+CREATE TABLE profiles (
+    username TEXT PRIMARY KEY, -- Unique username
+    target_groups TEXT NOT NULL, -- Target groups as a JSON list
+    equipment TEXT NOT NULL, -- Equipment as a JSON list
+    updated_at REAL NOT NULL -- Unix time the profile last changed
+);
+
+-- Create the weekly plans table
+CREATE TABLE weekly_plans (
+    username TEXT NOT NULL,
+    week_start TEXT NOT NULL, -- Monday of the planned week, YYYY-MM-DD
+    catalog_version TEXT NOT NULL, -- Version of the catalog the plan was built from
+    sessions TEXT NOT NULL, -- The plan of each session as JSON
+    created_at REAL NOT NULL, -- Unix time the plan was built
+    PRIMARY KEY (username, week_start)
+);
+
+-- Create the plan batch report table
+CREATE TABLE plan_batches (
+    week_start TEXT PRIMARY KEY, -- Monday of the planned week, YYYY-MM-DD
+    catalog_version TEXT NOT NULL,
+    users INTEGER NOT NULL, -- Profiles the batch found
+    planned INTEGER NOT NULL, -- Plans stored
+    failed INTEGER NOT NULL, -- Profiles that could not be planned
+    workers INTEGER NOT NULL, -- Worker processes used
+    seconds REAL NOT NULL, -- Wall time of the batch
+    finished_at REAL NOT NULL -- Unix time the batch finished
+);
@@ -0,0 +1,28 @@
+import pytest
+
+from workout.models import catalog_model, log_model, plan_model, recommendations_model, snapshot_model, track_model
+from workout.utils import http_client, sql_utils
+
+@pytest.fixture(autouse=True)
+def isolated_catalog(tmp_path, monkeypatch):
+    """Point the database at a per-test file and start every test without cached catalogs or responses."""
+    monkeypatch.setattr(sql_utils, "DB_PATH", str(tmp_path / "workout.db"))
+    monkeypatch.setattr(catalog_model, "CATALOG_CHECKPOINT_PATH", str(tmp_path / "catalog_crawl.json"))
+    monkeypatch.setattr(catalog_model, "CATALOG_CRAWL_BACKOFF", 0)
+    monkeypatch.setattr(track_model, "TRACKS_CRAWL_BACKOFF", 0)
+    monkeypatch.setattr(snapshot_model, "SNAPSHOT_PATH", str(tmp_path / "snapshot.bin"))
+    monkeypatch.setattr(snapshot_model, "OFFLINE_ONLY", False)
+    monkeypatch.setattr(plan_model, "PLAN_SNAPSHOT_PATH", str(tmp_path / "plan_catalog.bin"))
+    monkeypatch.setenv("UPSTREAM_CACHE_DIR", "")
+    monkeypatch.setattr(http_client, "_client", None)
+    catalog_model.clear_catalog_cache()
+    track_model.clear_track_cache()
+    snapshot_model.clear_snapshot_cache()
+    recommendations_model.clear_result_cache()
+    log_model.clear_recent_logs()
+    yield
+    catalog_model.clear_catalog_cache()
+    track_model.clear_track_cache()
+    snapshot_model.clear_snapshot_cache()
+    recommendations_model.clear_result_cache()
+    log_model.clear_recent_logs()
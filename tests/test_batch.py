@@ -0,0 +1,158 @@
+import os
+import sqlite3
+
+import pytest
+
+from workout.utils import sql_utils
+from workout.utils.sql_utils import get_db_connection, shared_db_connection
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def client(monkeypatch):
+    """Fixture to provide a test client against a fresh database with the login and logs tables."""
+    monkeypatch.setenv("BACKGROUND_REFRESH", "false")
+    monkeypatch.setenv("PREFILL_SONG_POOL", "false")
+    import app
+
+    conn = sqlite3.connect(sql_utils.DB_PATH)
+    for script in ("create_login_table.sql", "create_logs_table.sql"):
+        with open(os.path.join("sql", script)) as file:
+            conn.executescript(file.read())
+    conn.close()
+
+    app.accounts.clear()
+    yield app.app.test_client()
+    app.accounts.clear()
+
+def usernames():
+    with get_db_connection() as conn:
+        return [row[0] for row in conn.execute("SELECT username FROM login ORDER BY username")]
+
+######################################################
+#
+#    shared_db_connection
+#
+######################################################
+
+def test_shared_connection_commits_once(client):
+    """Test that writes through get_db_connection inside the block share one committed transaction."""
+    with shared_db_connection() as shared:
+        with get_db_connection() as conn:
+            assert conn is shared
+            conn.execute("INSERT INTO login (username, salt, hashed_password) VALUES ('a', 's', 'h')")
+            conn.commit()
+
+    assert usernames() == ["a"]
+
+def test_shared_connection_rolls_back_on_error(client):
+    """Test that an exception in the block undoes every write, including per-call commits."""
+    with pytest.raises(RuntimeError):
+        with shared_db_connection():
+            with get_db_connection() as conn:
+                conn.execute("INSERT INTO login (username, salt, hashed_password) VALUES ('a', 's', 'h')")
+                conn.commit()
+            raise RuntimeError("boom")
+
+    assert usernames() == []
+
+######################################################
+#
+#    /api/batch
+#
+######################################################
+
+def test_batch_success(client):
+    """Test that a batch of writes and reads runs in order and commits."""
+    response = client.post("/api/batch", json={"username": "alice", "operations": [
+        {"route": "create-account", "args": {"password": "secret"}},
+        {"route": "set-target-groups", "args": {"groups": ["leg"]}},
+        {"route": "get-target-groups"},
+    ]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["committed"] is True
+    assert [result["code"] for result in body["results"]] == [201, 200, 200]
+    assert usernames() == ["alice"]
+
+    import app
+    assert app.accounts["alice"].get_target_groups() == ["leg"]
+
+def test_batch_rollback_restores_accounts(client):
+    """Test that a failed write rolls back the database and the in-memory accounts."""
+    assert client.post("/api/create-account", json={"username": "alice", "password": "secret"}).status_code == 201
+    import app
+    app.accounts["alice"].set_target_groups(["arm"])
+
+    response = client.post("/api/batch", json={"username": "alice", "operations": [
+        {"route": "create-account", "args": {"username": "bob", "password": "secret"}},
+        {"route": "set-target-groups", "args": {"groups": ["leg"]}},
+        {"route": "create-account", "args": {"password": "secret"}},
+    ]})
+
+    body = response.get_json()
+    assert response.status_code == 200
+    assert body["committed"] is False
+    assert body["results"][-1]["code"] == 400
+    assert usernames() == ["alice"]
+    assert set(app.accounts) == {"alice"}
+    assert app.accounts["alice"].get_target_groups() == ["arm"]
+
+def test_batch_rollback_keeps_other_accounts(client, monkeypatch):
+    """Test that rolling back drops the accounts the batch created and keeps accounts created meanwhile."""
+    import app
+    run_operation = app._run_batch_operation
+
+    def run_with_concurrent_signup(*operation):
+        # Another request creates an account while the batch runs
+        app.accounts.setdefault("carol", app.RecommendationsModel("carol"))
+        return run_operation(*operation)
+
+    monkeypatch.setattr(app, "_run_batch_operation", run_with_concurrent_signup)
+    response = client.post("/api/batch", json={"username": "bob", "operations": [
+        {"route": "create-account", "args": {"password": "secret"}},
+        {"route": "create-account", "args": {"password": "secret"}},
+    ]})
+
+    assert response.get_json()["committed"] is False
+    assert set(app.accounts) == {"carol"}
+
+def test_read_batch_shares_connection(client, monkeypatch):
+    """Test that a batch of reads runs on one shared connection."""
+    import app
+    opened = []
+    shared = app.shared_db_connection
+
+    def counting_shared_connection():
+        opened.append(True)
+        return shared()
+
+    monkeypatch.setattr(app, "shared_db_connection", counting_shared_connection)
+    response = client.post("/api/batch", json={"username": "alice", "operations": [
+        {"route": "get-target-groups"},
+        {"route": "get-available-equipment"},
+    ]})
+
+    assert response.status_code == 200
+    assert len(opened) == 1
+
+@pytest.mark.parametrize("payload", [
+    None,
+    {"operations": []},
+    {"operations": ["get-target-groups"]},
+    {"operations": [{"route": "get-target-groups", "args": ["alice"]}]},
+    {"operations": [{"route": "clear-users"}]},
+    {"operations": [{"route": "no-such-route"}]},
+    {"operations": [{"route": "set-target-groups", "args": {"groups": ["leg"]}}, {"route": "fetch-random-song"}]},
+])
+def test_batch_malformed(client, payload):
+    """Test that malformed batches, routes a batch may not run and writes mixed with upstream routes are rejected before running."""
+    response = client.post("/api/batch", json=payload)
+
+    assert response.status_code == 400
+    assert "error" in response.get_json()
@@ -0,0 +1,182 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import os
+import threading
+import time
+from urllib.parse import parse_qs, urlencode, urlparse
+
+import pytest
+import requests
+
+from workout.utils.catalog_crawler import CatalogCrawler, catalog_version
+
+######################################################
+#
+#    Stub server
+#
+######################################################
+
+class StubCatalog:
+    """Serves a paginated exercisebaseinfo-style listing and records requested offsets."""
+
+    def __init__(self, total: int):
+        self.items = [{"id": i, "exercises": [{"name": f"Exercise {i}", "language": 2}]} for i in range(total)]
+        self.requested = []
+        self.failures = {}  # offset -> number of 503s still to return
+        self.delay = 0.0  # seconds to wait before answering
+        self.lock = threading.Lock()
+
+    def page(self, base_url: str, limit: int, offset: int, query: str = "") -> dict:
+        # Like DRF, the next link repeats the request's other query parameters
+        end = offset + limit
+        return {
+            "count": len(self.items),
+            "next": f"{base_url}?{query}&limit={limit}&offset={end}" if end < len(self.items) else None,
+            "previous": None,
+            "results": self.items[offset:end],
+        }
+
+@pytest.fixture
+def stub_server():
+    """Run a stub paginated API on a local port for the duration of a test."""
+    catalog = StubCatalog(total=45)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            limit = int(query.get("limit", ["20"])[0])
+            offset = int(query.get("offset", ["0"])[0])
+            with catalog.lock:
+                catalog.requested.append(offset)
+                failing = catalog.failures.get(offset, 0)
+                if failing:
+                    catalog.failures[offset] = failing - 1
+            time.sleep(catalog.delay)
+            if failing:
+                self.send_response(503)
+                self.end_headers()
+                return
+            others = urlencode({name: values[0] for name, values in query.items() if name not in ("limit", "offset")})
+            body = json.dumps(catalog.page(base_url, limit, offset, others)).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/api/v2/exercisebaseinfo/"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield base_url, catalog
+    server.shutdown()
+    server.server_close()
+
+######################################################
+#
+#    Crawling
+#
+######################################################
+
+def test_crawl_follows_all_pages(stub_server):
+    """Test that every page is fetched and items come back in listing order."""
+    base_url, catalog = stub_server
+    crawler = CatalogCrawler(base_url, page_size=10, max_workers=3, backoff=0)
+
+    snapshot = crawler.crawl()
+
+    assert snapshot.items == catalog.items
+    assert snapshot.count == 45
+    assert snapshot.version == catalog_version(catalog.items)
+    assert sorted(catalog.requested) == [0, 10, 20, 30, 40]
+
+def test_concurrent_crawls_share_page_requests(stub_server):
+    """Test that two crawls of the same listing running at once request each page once."""
+    base_url, catalog = stub_server
+    catalog.delay = 0.3
+    snapshots = []
+
+    def crawl():
+        snapshots.append(CatalogCrawler(base_url, page_size=10, max_workers=5, backoff=0).crawl())
+
+    threads = [threading.Thread(target=crawl) for _ in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert [snapshot.items for snapshot in snapshots] == [catalog.items, catalog.items]
+    assert sorted(catalog.requested) == [0, 10, 20, 30, 40]
+
+def test_crawl_retries_transient_errors(stub_server):
+    """Test that a page answering 503 is retried until it succeeds."""
+    base_url, catalog = stub_server
+    catalog.failures[20] = 2
+    crawler = CatalogCrawler(base_url, page_size=10, retries=2, backoff=0)
+
+    snapshot = crawler.crawl()
+
+    assert snapshot.items == catalog.items
+    assert catalog.requested.count(20) == 3
+
+def test_crawl_resumes_from_checkpoint(stub_server, tmp_path):
+    """Test that an interrupted crawl only refetches the pages it is missing."""
+    base_url, catalog = stub_server
+    checkpoint_path = str(tmp_path / "crawl.json")
+    catalog.failures[30] = 5
+
+    crawler = CatalogCrawler(base_url, page_size=10, retries=1, backoff=0, checkpoint_path=checkpoint_path)
+    with pytest.raises(requests.HTTPError):
+        crawler.crawl()
+    assert os.path.exists(checkpoint_path)
+
+    catalog.failures.clear()
+    catalog.requested.clear()
+    snapshot = crawler.crawl()
+
+    assert snapshot.items == catalog.items
+    assert catalog.requested == [30]
+    assert not os.path.exists(checkpoint_path)
+
+def test_checkpoint_leaves_out_secrets(stub_server, tmp_path):
+    """Test that credentials in the query parameters are not written to the checkpoint."""
+    base_url, catalog = stub_server
+    checkpoint_path = str(tmp_path / "crawl.json")
+    catalog.failures[30] = 5
+
+    crawler = CatalogCrawler(base_url, params={"api_key": "s3cret"}, page_size=10, retries=0, backoff=0,
+                             checkpoint_path=checkpoint_path)
+    with pytest.raises(requests.HTTPError):
+        crawler.crawl()
+
+    with open(checkpoint_path) as f:
+        checkpoint = f.read()
+    assert "s3cret" not in checkpoint
+    assert len(checkpoint.splitlines()) == 5
+
+def test_stale_checkpoint_is_discarded(stub_server, tmp_path):
+    """Test that a checkpoint older than checkpoint_max_age is crawled again from scratch."""
+    base_url, catalog = stub_server
+    checkpoint_path = str(tmp_path / "crawl.json")
+    catalog.failures[30] = 5
+
+    crawler = CatalogCrawler(base_url, page_size=10, retries=0, backoff=0, checkpoint_path=checkpoint_path)
+    with pytest.raises(requests.HTTPError):
+        crawler.crawl()
+    with open(checkpoint_path) as f:
+        lines = f.read().splitlines()
+    header = json.loads(lines[0])
+    header["saved_at"] -= 3600
+    with open(checkpoint_path, "w") as f:
+        f.write("\n".join([json.dumps(header)] + lines[1:]) + "\n")
+
+    catalog.failures.clear()
+    catalog.requested.clear()
+    crawler.checkpoint_max_age = 60
+    snapshot = crawler.crawl()
+
+    assert snapshot.items == catalog.items
+    assert sorted(catalog.requested) == [0, 10, 20, 30, 40]
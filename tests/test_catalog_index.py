@@ -0,0 +1,130 @@
+import random
+
+import pytest
+
+from workout.utils.catalog_index import CatalogIndex, mask_matrix, subset_of, touches_any
+from workout.utils.catalog_records import normalize_catalog
+from workout.utils.vocabulary import EQUIPMENT, MUSCLE_GROUPS, MUSCLES
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def sample_items():
+    return [
+        {
+            "id": 1,
+            "muscles": [{"name": "Quadriceps femoris"}],
+            "equipment": [{"name": "Barbell"}],
+            "exercises": [
+                {"name": "Barbell Squat", "language": 2},
+                {"name": "Kniebeuge", "language": 1},
+            ],
+        },
+        {
+            "id": 2,
+            "muscles": [{"name": "Biceps brachii"}],
+            "equipment": [{"name": "Barbell"}, {"name": "Bench"}],
+            "exercises": [{"name": "Preacher Curl", "language": 2}],
+        },
+        {
+            "id": 3,
+            "muscles": [],
+            "equipment": [],
+            "exercises": [{"name": "Running", "language": 2}],
+        },
+    ]
+
+@pytest.fixture
+def index(sample_items):
+    return CatalogIndex(sample_items, version="v1")
+
+def names(index, ids):
+    return [index.records[entry_id].name for entry_id in ids]
+
+######################################################
+#
+#    Normalization
+#
+######################################################
+
+def test_normalize_catalog(sample_items):
+    """Test that records carry precomputed names, display strings and ids."""
+    records = normalize_catalog(sample_items, language=2)
+
+    assert [record.name for record in records] == ["Barbell Squat", "Preacher Curl", "Running"]
+    curl = records[1]
+    assert curl.lowered_name == "preacher curl"
+    assert curl.equipment == "Barbell, Bench"
+    assert curl.muscle_ids == (MUSCLES.intern("biceps brachii"),)
+    assert curl.equipment_ids == (EQUIPMENT.intern("barbell"), EQUIPMENT.intern("bench"))
+    assert curl.group_mask == MUSCLE_GROUPS.bit("arm")
+    assert records[2].muscles == "No muscles targeted"
+    assert records[2].group_mask == MUSCLE_GROUPS.mask(["leg", "cardio"])
+    assert not hasattr(curl, "__dict__")
+
+######################################################
+#
+#    Lookups
+#
+######################################################
+
+def test_ids_for_group(index):
+    """Test keyword-based group lookups, including keywords shared by two groups."""
+    assert names(index, index.ids_for_group("leg")) == ["Barbell Squat", "Running"]
+    assert names(index, index.ids_for_group("cardio")) == ["Running"]
+    assert index.ids_for_group("unknown") == []
+
+def test_ids_for_language(index):
+    """Test that translations are filtered by language."""
+    assert index.ids_for_group("leg", language=1) == []
+    assert index.group_ids("leg") is index.group_ids("leg")
+    assert names(index, index.ids_for_muscle("quadriceps femoris", language=1)) == ["Kniebeuge"]
+
+######################################################
+#
+#    Vectorized filters
+#
+######################################################
+
+def test_ids_matching_equipment_subset(index):
+    """Test that an entry matches when all of its equipment is owned."""
+    barbell, bench = EQUIPMENT.bit("barbell"), EQUIPMENT.bit("bench")
+
+    assert names(index, index.ids_matching(owned_equipment=barbell)) == ["Barbell Squat", "Running"]
+    assert names(index, index.ids_matching(owned_equipment=barbell | bench)) == ["Barbell Squat", "Preacher Curl", "Running"]
+    assert names(index, index.ids_matching(owned_equipment=0)) == ["Running"]
+
+def test_ids_matching_combines_filters(index):
+    """Test group, muscle and language filters together."""
+    leg = MUSCLE_GROUPS.bit("leg")
+    quads = 1 << MUSCLES.intern("quadriceps femoris")
+
+    assert names(index, index.ids_matching(any_groups=leg | MUSCLE_GROUPS.bit("arm"))) == ["Barbell Squat", "Preacher Curl", "Running"]
+    assert names(index, index.ids_matching(any_groups=leg, owned_equipment=0)) == ["Running"]
+    assert names(index, index.ids_matching(language=1, any_muscles=quads)) == ["Kniebeuge"]
+
+def test_mask_matrix_wider_than_a_word():
+    """Test that masks past 64 bits are split across words."""
+    masks = [1 << 70, (1 << 70) | 1, 2]
+    matrix = mask_matrix(masks)
+
+    assert matrix.shape == (3, 2)
+    assert touches_any(matrix, 1 << 70).tolist() == [True, True, False]
+    assert subset_of(matrix, (1 << 70) | 2).tolist() == [True, False, True]
+    assert subset_of(matrix, 1 << 200).tolist() == [False, False, False]
+
+def test_pick_alternative(index):
+    """Test that alternatives share the profile of an entry and never have the excluded name."""
+    squat = index.id_for_name("barbell squat")
+    rng = random.Random(0)
+
+    assert index.id_for_name("Kniebeuge", language=1) == 1
+    assert index.id_for_name("Kniebeuge") is None
+    assert index.by_profile[index.profile(squat)] == [squat]
+    assert index.pick_alternative(index.by_profile[index.profile(squat)], "barbell squat", rng) is None
+    assert index.pick_alternative([squat, 2, squat], "barbell squat", rng) == 2
+
@@ -0,0 +1,163 @@
+import threading
+import time
+
+import pytest
+import requests
+
+from workout.models import catalog_model
+from workout.models.catalog_model import (
+    catalog_version,
+    clear_catalog_cache,
+    get_catalog,
+    get_catalog_index,
+    get_catalog_items,
+    load_catalog,
+    revalidate_catalog,
+    store_catalog,
+)
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def sample_items():
+    return [
+        {"id": 1, "exercises": [{"name": "Barbell Squat", "language": 2}], "muscles": [], "equipment": []},
+        {"id": 2, "exercises": [{"name": "Barbell Curl", "language": 2}], "muscles": [], "equipment": []},
+    ]
+
+@pytest.fixture
+def mock_wger(mocker, sample_items):
+    mock_get = mocker.patch("requests.Session.get")
+    mock_get.return_value.json.return_value = {"results": sample_items}
+    return mock_get
+
+######################################################
+#
+#    Storage
+#
+######################################################
+
+def test_store_and_load_catalog(sample_items):
+    """Test that a stored catalog loads back in order with its version."""
+    stored = store_catalog(sample_items, fetched_at=100.0)
+    loaded = load_catalog()
+
+    assert loaded.items == sample_items
+    assert loaded.version == stored.version == catalog_version(sample_items)
+    assert loaded.fetched_at == 100.0
+
+def test_load_catalog_empty():
+    """Test loading before anything has been stored."""
+    assert load_catalog() is None
+
+######################################################
+#
+#    TTL refresh
+#
+######################################################
+
+def test_get_catalog_fetches_once_while_fresh(mock_wger, sample_items):
+    """Test that repeated reads inside the TTL do not go back to wger."""
+    assert get_catalog_items() == sample_items
+    assert get_catalog_items() == sample_items
+    assert mock_wger.call_count == 1
+
+def test_get_catalog_uses_stored_copy(mock_wger, sample_items):
+    """Test that a fresh stored catalog is served without downloading."""
+    store_catalog(sample_items)
+    clear_catalog_cache()
+
+    assert get_catalog_items() == sample_items
+    mock_wger.assert_not_called()
+
+def test_get_catalog_refreshes_when_expired(mock_wger, sample_items):
+    """Test that a catalog older than the TTL is downloaded again."""
+    store_catalog(sample_items[:1], fetched_at=time.time() - 100)
+
+    catalog = get_catalog(ttl=10)
+
+    assert catalog.items == sample_items
+    assert mock_wger.call_count == 1
+
+def test_get_catalog_serves_stale_on_error(mocker, sample_items):
+    """Test that an expired catalog is still served when wger is unreachable."""
+    store_catalog(sample_items, fetched_at=time.time() - 100)
+    mocker.patch("requests.Session.get", side_effect=requests.exceptions.ConnectionError("down"))
+
+    assert get_catalog(ttl=10).items == sample_items
+
+def test_get_catalog_error_without_copy(mocker):
+    """Test that the error surfaces when there is no catalog to fall back to."""
+    mocker.patch("requests.Session.get", side_effect=requests.exceptions.ConnectionError("down"))
+
+    with pytest.raises(requests.RequestException):
+        get_catalog()
+
+def test_revalidate_catalog_swaps_in_new_version(mock_wger, sample_items):
+    """Test that a background refresh publishes the catalog with its indexes already built."""
+    old = store_catalog(sample_items[:1])
+    assert get_catalog().version == old.version
+
+    catalog = revalidate_catalog()
+
+    assert get_catalog() is catalog
+    assert catalog.version != old.version
+    assert catalog_model._index.version == catalog.version
+    assert get_catalog_index() is catalog_model._index
+
+def test_revalidate_catalog_raises(mocker, sample_items):
+    """Test that a background refresh surfaces errors instead of serving stale data."""
+    store_catalog(sample_items)
+    mocker.patch("requests.Session.get", side_effect=requests.exceptions.ConnectionError("down"))
+
+    with pytest.raises(requests.RequestException):
+        revalidate_catalog()
+    assert get_catalog().items == sample_items
+
+######################################################
+#
+#    Coalescing
+#
+######################################################
+
+def test_concurrent_reads_share_one_download(mocker, sample_items):
+    """Test that N concurrent reads of a missing catalog produce a single wger request."""
+    def slow_get(*args, **kwargs):
+        time.sleep(0.2)
+        return mocker.MagicMock(status_code=200, **{"json.return_value": {"results": sample_items}})
+
+    mock_get = mocker.patch("requests.Session.get", side_effect=slow_get)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(get_catalog_items())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [sample_items] * 8
+    assert mock_get.call_count == 1
+
+def test_waiting_reader_served_stale(mocker, monkeypatch, sample_items):
+    """Test that a reader holding an expired catalog stops waiting on a slow refresh."""
+    monkeypatch.setattr(catalog_model, "CATALOG_REFRESH_WAIT", 0.05)
+    stale = store_catalog(sample_items[:1], fetched_at=time.time() - 100)
+    get_catalog(ttl=1000)
+    release = threading.Event()
+
+    def blocked_get(*args, **kwargs):
+        release.wait()
+        return mocker.MagicMock(status_code=200, **{"json.return_value": {"results": sample_items}})
+
+    mocker.patch("requests.Session.get", side_effect=blocked_get)
+    refresher = threading.Thread(target=get_catalog, kwargs={"ttl": 10})
+    refresher.start()
+    time.sleep(0.05)
+
+    assert get_catalog(ttl=10).version == stale.version
+    release.set()
+    refresher.join()
+    assert get_catalog(ttl=10).items == sample_items
@@ -0,0 +1,159 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import os
+import threading
+
+import pytest
+import requests
+
+from workout.utils.http_cache import HttpCache
+from workout.utils.http_client import UpstreamClient
+
+######################################################
+#
+#    Stub server
+#
+######################################################
+
+@pytest.fixture
+def etag_server():
+    """Run a stub upstream that answers If-None-Match with 304 while the body is unchanged."""
+    state = {"body": b'{"version": 1}', "etag": '"v1"', "requests": 0, "not_modified": 0}
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            state["requests"] += 1
+            if self.headers.get("If-None-Match") == state["etag"]:
+                state["not_modified"] += 1
+                self.send_response(304)
+                self.send_header("ETag", state["etag"])
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("ETag", state["etag"])
+            self.send_header("Content-Length", str(len(state["body"])))
+            self.end_headers()
+            self.wfile.write(state["body"])
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/", state, server
+    server.shutdown()
+    server.server_close()
+
+######################################################
+#
+#    Revalidation
+#
+######################################################
+
+def test_revalidates_with_etag(etag_server, tmp_path):
+    """Test that a cached body is revalidated and reused after a 304."""
+    url, state, _ = etag_server
+    cache = HttpCache(str(tmp_path / "cache"))
+    client = UpstreamClient(retries=0, cache=cache)
+
+    assert client.get_json(url, params={"page": 1}) == {"version": 1}
+    assert client.get_json(url, params={"page": 1}) == {"version": 1}
+
+    assert state["requests"] == 2
+    assert state["not_modified"] == 1
+    assert cache.stats()["misses"] == 1
+    assert cache.stats()["revalidated"] == 1
+
+def test_downloads_changed_body(etag_server, tmp_path):
+    """Test that a changed upstream body replaces the cached one."""
+    url, state, _ = etag_server
+    client = UpstreamClient(retries=0, cache=HttpCache(str(tmp_path / "cache")))
+    client.get_json(url)
+
+    state["body"], state["etag"] = b'{"version": 2}', '"v2"'
+
+    assert client.get_json(url) == {"version": 2}
+    assert client.get_json(url) == {"version": 2}
+    assert state["not_modified"] == 1
+
+def test_cache_survives_restart(etag_server, tmp_path):
+    """Test that entries written by one process are revalidated by the next."""
+    url, state, _ = etag_server
+    UpstreamClient(retries=0, cache=HttpCache(str(tmp_path / "cache"))).get(url)
+
+    client = UpstreamClient(retries=0, cache=HttpCache(str(tmp_path / "cache")))
+    assert client.get_json(url) == {"version": 1}
+    assert state["not_modified"] == 1
+
+def test_leaves_out_credentials(etag_server, tmp_path):
+    """Test that credentials in the query parameters are not written to the cache directory."""
+    url, _, _ = etag_server
+    directory = str(tmp_path / "cache")
+    client = UpstreamClient(retries=0, cache=HttpCache(directory))
+
+    client.get(url, params={"api_key": "s3cret", "client_id": "c1ient", "page": 1})
+
+    for filename in os.listdir(directory):
+        with open(os.path.join(directory, filename), "rb") as f:
+            content = f.read()
+        assert b"s3cret" not in content and b"c1ient" not in content
+
+######################################################
+#
+#    Offline and eviction
+#
+######################################################
+
+def test_serves_cached_copy_when_unreachable(etag_server, tmp_path):
+    """Test that a cached body is served when the upstream is down, and offline mode never calls it."""
+    url, state, server = etag_server
+    directory = str(tmp_path / "cache")
+    UpstreamClient(retries=0, cache=HttpCache(directory)).get(url)
+    server.shutdown()
+    server.server_close()
+
+    client = UpstreamClient(retries=0, cache=HttpCache(directory))
+    assert client.get_json(url) == {"version": 1}
+
+    offline = UpstreamClient(retries=0, cache=HttpCache(directory, offline=True))
+    assert offline.get_json(url) == {"version": 1}
+    with pytest.raises(requests.ConnectionError):
+        offline.get(url, params={"page": 2})
+    assert state["requests"] == 1
+
+def test_evicts_least_recently_used(etag_server, tmp_path):
+    """Test that the size cap evicts the least recently used entry."""
+    url, _, _ = etag_server
+    cache = HttpCache(str(tmp_path / "cache"), max_bytes=30)
+    client = UpstreamClient(retries=0, cache=cache)
+
+    client.get(url, params={"page": 1})
+    client.get(url, params={"page": 2})
+    client.get(url, params={"page": 1})
+    client.get(url, params={"page": 3})
+
+    assert cache.lookup(HttpCache.key(url, {"page": 1})) is not None
+    assert cache.lookup(HttpCache.key(url, {"page": 2})) is None
+    assert cache.stats()["entries"] == 2
+
+def test_lookup_order_survives_restart(etag_server, tmp_path):
+    """Test that entries used since they were stored are evicted last after a restart."""
+    url, _, _ = etag_server
+    directory = str(tmp_path / "cache")
+    cache = HttpCache(directory, max_bytes=30)
+    client = UpstreamClient(retries=0, cache=cache)
+    client.get(url, params={"page": 1})
+    client.get(url, params={"page": 2})
+    first = HttpCache.key(url, {"page": 1})
+    os.utime(os.path.join(directory, f"{HttpCache.key(url, {'page': 2})}.json"), (1, 1))
+    assert cache.lookup(first) is not None
+
+    restarted = HttpCache(directory, max_bytes=30)
+    UpstreamClient(retries=0, cache=restarted).get(url, params={"page": 3})
+
+    assert restarted.lookup(first) is not None
+    assert restarted.lookup(HttpCache.key(url, {"page": 2})) is None
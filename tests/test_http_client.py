@@ -0,0 +1,123 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import threading
+import time
+
+import pytest
+import requests
+
+from workout.utils.http_client import UpstreamClient
+
+######################################################
+#
+#    Stub server
+#
+######################################################
+
+@pytest.fixture
+def stub_server():
+    """Run a stub upstream that fails a configurable number of times, then answers."""
+    state = {"failures": 0, "delay": 0.0, "requests": 0, "active": 0, "max_active": 0}
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            with lock:
+                state["requests"] += 1
+                state["active"] += 1
+                state["max_active"] = max(state["max_active"], state["active"])
+                failing = state["failures"] > 0
+                if failing:
+                    state["failures"] -= 1
+            time.sleep(state["delay"])
+            body = b'{"ok": true}'
+            self.send_response(503 if failing else 200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+            with lock:
+                state["active"] -= 1
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{server.server_address[1]}/", state
+    server.shutdown()
+    server.server_close()
+
+######################################################
+#
+#    Requests
+#
+######################################################
+
+def test_get_json_retries_retryable_status(stub_server):
+    """Test that a 503 is retried and the eventual success returned."""
+    url, state = stub_server
+    state["failures"] = 2
+    client = UpstreamClient(retries=2, backoff=0)
+
+    assert client.get_json(url) == {"ok": True}
+    assert state["requests"] == 3
+
+    stats = client.stats()[url.split("/")[2]]
+    assert stats["requests"] == 3
+    assert stats["errors"] == 2
+    assert stats["retries"] == 2
+    assert "p95_ms" in stats
+
+def test_get_json_gives_up_after_retries(stub_server):
+    """Test that the error status surfaces once retries run out."""
+    url, state = stub_server
+    state["failures"] = 5
+    client = UpstreamClient(retries=1, backoff=0)
+
+    with pytest.raises(requests.HTTPError):
+        client.get_json(url)
+    assert state["requests"] == 2
+
+def test_read_timeout(stub_server):
+    """Test that a hung upstream fails with a timeout instead of blocking forever."""
+    url, state = stub_server
+    state["delay"] = 0.5
+    client = UpstreamClient(read_timeout=0.1, retries=0)
+
+    with pytest.raises(requests.Timeout):
+        client.get(url)
+
+def test_max_in_flight(stub_server):
+    """Test that concurrent callers never exceed the in-flight limit."""
+    url, state = stub_server
+    state["delay"] = 0.05
+    client = UpstreamClient(max_in_flight=2, retries=0)
+
+    threads = [threading.Thread(target=client.get, args=(url,)) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert state["requests"] == 6
+    assert state["max_active"] <= 2
+
+def test_get_json_coalesces_identical_requests(stub_server):
+    """Test that concurrent identical get_json calls share one upstream request."""
+    url, state = stub_server
+    state["delay"] = 0.2
+    client = UpstreamClient(retries=0)
+    results = []
+
+    threads = [threading.Thread(target=lambda: results.append(client.get_json(url, params={"page": 1}))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [{"ok": True}] * 8
+    assert state["requests"] == 1
+    assert client.flight_stats()["shared"] == 7
@@ -0,0 +1,81 @@
+import json
+import os
+
+import pytest
+
+from workout.models.catalog_model import get_catalog_index, store_catalog
+from workout.utils import keyword_matcher
+from workout.utils.keyword_matcher import KeywordMatcher, get_matcher, load_rules
+from workout.utils.vocabulary import MUSCLE_GROUPS
+
+######################################################
+#
+#    Matching
+#
+######################################################
+
+@pytest.fixture
+def matcher():
+    return KeywordMatcher(load_rules(keyword_matcher.MUSCLE_GROUP_RULES_PATH))
+
+def test_group_mask_single_pass(matcher):
+    """Test that one scan classifies a name against every group."""
+    assert matcher.group_mask("barbell squat") == MUSCLE_GROUPS.bit("leg")
+    assert matcher.group_mask("plank to pull-up") == MUSCLE_GROUPS.mask(["abs", "back"])
+    assert matcher.group_mask("bench press") == 0
+
+def test_overlapping_keywords(matcher):
+    """Test that keywords contained in a longer match are still reported."""
+    assert matcher.keywords("running") == {"running", "run"}
+    assert matcher.group_mask("running") == MUSCLE_GROUPS.mask(["leg", "cardio"])
+    assert matcher.keywords("crunch row") == {"crunch", "run", "row"}
+
+def test_overlaps_at_different_positions():
+    """Test keywords that overlap without one containing the other."""
+    matcher = KeywordMatcher({"a": ["abc"], "b": ["bcd"]})
+    assert matcher.keywords("xabcdx") == {"abc", "bcd"}
+
+######################################################
+#
+#    Reloading
+#
+######################################################
+
+@pytest.fixture
+def rules_file(tmp_path, monkeypatch):
+    path = tmp_path / "rules.json"
+    path.write_text(json.dumps({"leg": ["squat"]}))
+    monkeypatch.setattr(keyword_matcher, "MUSCLE_GROUP_RULES_PATH", str(path))
+    monkeypatch.setattr(keyword_matcher, "_matcher", None)
+    monkeypatch.setattr(keyword_matcher, "_matcher_mtime", None)
+    return path
+
+def rewrite(path, rules):
+    stat = os.stat(path)
+    path.write_text(json.dumps(rules))
+    os.utime(path, (stat.st_atime, stat.st_mtime + 1))
+
+def test_rules_reload_when_file_changes(rules_file):
+    """Test that editing the rules file takes effect without a restart."""
+    assert get_matcher().group_mask("deadlift") == 0
+
+    rewrite(rules_file, {"leg": ["squat"], "back": ["deadlift"]})
+
+    assert get_matcher().group_mask("deadlift") == MUSCLE_GROUPS.bit("back")
+
+def test_invalid_rules_keep_previous(rules_file):
+    """Test that a broken edit keeps the rules already loaded."""
+    version = get_matcher().version
+
+    rewrite(rules_file, {"leg": "squat"})
+
+    assert get_matcher().version == version
+
+def test_index_rebuilt_after_reload(rules_file):
+    """Test that the catalog index reclassifies names when the rules change."""
+    store_catalog([{"id": 1, "exercises": [{"name": "Deadlift", "language": 2}], "muscles": [], "equipment": []}])
+    assert get_catalog_index().ids_for_group("back") == []
+
+    rewrite(rules_file, {"back": ["deadlift"]})
+
+    assert get_catalog_index().ids_for_group("back") == [0]
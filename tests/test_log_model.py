@@ -1,4 +1,5 @@
 from contextlib import contextmanager
+from datetime import date, timedelta
 import re
 import pytest
 
@@ -260,6 +261,22 @@ def test_get_logs_by_muscle_groups(mock_cursor):
     ]
     assert expected_result == result, f"Expected \'{expected_result}\', got \'{result}\' when logs were successfully retrieved."    
 
+def test_get_logs_by_muscle_groups_matches_substrings(mock_cursor):
+    """Test that a group matches every log whose groups contain it, as the LIKE query does."""
+
+    rows = [
+        (1, "Matthew", "Squat", "Legs", "2024-12-01"),
+        (2, "Matthew", "Lunge", "Leg Day, Arm", "2024-12-02")
+    ]
+    mock_cursor.fetchall.return_value = rows
+
+    result = get_logs_by_muscle_group("Matthew", "leg")
+
+    assert result == [Log(*row) for row in rows]
+    mock_cursor.execute.assert_called_once_with(
+        "SELECT * FROM logs WHERE username = ? AND (muscle_groups LIKE ?)", ["Matthew", "%leg%"]
+    )
+
 def test_get_logs_by_muscle_group_empty_muscle_groups():
     """Test getting all logs from a user with no logs by muscle_groups."""
 
@@ -322,4 +339,57 @@ def test_update_log_no_log_found(mock_cursor):
     mock_cursor.rowcount = 0
 
     with pytest.raises(ValueError, match="No log found for username=Matthew and date=2024-12-01"):
-        update_log(username="Matthew", exercise_name="Bench press", muscle_groups="1, 2", date="2024-12-01")
\ No newline at end of file
+        update_log(username="Matthew", exercise_name="Bench press", muscle_groups="1, 2", date="2024-12-01")
+
+######################################################
+#
+#    Recent Exercises
+#
+######################################################
+
+def days_ago(days: int) -> str:
+    return (date.today() - timedelta(days=days)).strftime("%Y-%m-%d")
+
+def test_get_recent_exercises(mock_cursor):
+    """Test that recent exercises are read once and kept up to date by log writes."""
+    mock_cursor.fetchall.return_value = [("Squat", days_ago(1)), ("Curl", days_ago(10)), ("SQUAT", days_ago(3))]
+
+    assert get_recent_exercises("Matthew", 7) == {"squat": 1}
+    assert get_recent_exercises("Matthew", 10) == {"squat": 1, "curl": 10}
+    assert normalize_whitespace(mock_cursor.execute.call_args[0][0]) == \
+        "SELECT exercise_name, date FROM logs WHERE username = ? AND date >= ?"
+    assert mock_cursor.execute.call_count == 1
+
+    mock_cursor.fetchall.return_value = []
+    create_log("Matthew", "Plank", "abs", days_ago(0))
+    assert get_recent_exercises("Matthew", 7) == {"squat": 1, "plank": 0}
+
+    update_log("Matthew", days_ago(0), "Crunch", "abs")
+    delete_log_by_date("Matthew", days_ago(1))
+    assert get_recent_exercises("Matthew", 7) == {"squat": 3, "crunch": 0}
+
+    calls = mock_cursor.execute.call_count
+    clear_logs("Matthew")
+    get_recent_exercises("Matthew", 7)
+    assert mock_cursor.execute.call_count == calls + 2
+
+def test_get_recent_exercises_keeps_logs_written_during_load(mock_cursor, monkeypatch):
+    """Test that a log created or deleted while the recent logs are being read is not lost."""
+    import workout.models.log_model as log_model
+    load = log_model._load_recent
+    mock_cursor.fetchall.return_value = [("Squat", days_ago(1)), ("Curl", days_ago(2))]
+
+    def load_then_write(username):
+        # The read has finished before these writes are committed
+        loaded = load(username)
+        mock_cursor.fetchall.return_value = []
+        create_log(username, "Plank", "abs", days_ago(0))
+        delete_log_by_date(username, days_ago(2))
+        return loaded
+
+    monkeypatch.setattr(log_model, "_load_recent", load_then_write)
+    assert get_recent_exercises("Matthew", 7) == {"squat": 1, "plank": 0}
+
+    monkeypatch.setattr(log_model, "_load_recent", load)
+    assert get_recent_exercises("Matthew", 7) == {"squat": 1, "plank": 0}
+    assert log_model._pending == {} and not log_model._loaders
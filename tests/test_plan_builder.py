@@ -0,0 +1,109 @@
+from itertools import product
+
+import pytest
+
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.plan_builder import CARDIO_SET_MINUTES, build_plan, build_week, set_minutes, set_value, split_groups
+from workout.utils.vocabulary import EQUIPMENT, MUSCLE_GROUPS
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def index():
+    return CatalogIndex([
+        {
+            "id": 1,
+            "muscles": [{"name": "Quadriceps femoris"}, {"name": "Gluteus maximus"}],
+            "equipment": [{"name": "Barbell"}],
+            "exercises": [{"name": "Barbell Squat", "language": 2}],
+        },
+        {
+            "id": 2,
+            "muscles": [{"name": "Biceps brachii"}],
+            "equipment": [],
+            "exercises": [{"name": "Squat Curl", "language": 2}],
+        },
+        {
+            "id": 3,
+            "muscles": [],
+            "equipment": [],
+            "exercises": [{"name": "Running", "language": 2}],
+        },
+        {
+            "id": 4,
+            "muscles": [{"name": "Biceps brachii"}],
+            "equipment": [{"name": "Dumbbell"}],
+            "exercises": [{"name": "Hammer Curl", "language": 2}, {"name": "Hammercurl", "language": 1}],
+        },
+    ], version="v1")
+
+def best_value(index, groups, minutes, max_sets):
+    group_mask = MUSCLE_GROUPS.mask(groups)
+    items = [(set_minutes(record), set_value(record, group_mask)) for record in index.records
+             if record.language == 2 and record.group_mask & group_mask]
+    best = 0
+    for counts in product(range(max_sets + 1), repeat=len(items)):
+        if sum(count * cost for count, (cost, _) in zip(counts, items)) <= minutes:
+            best = max(best, sum(count * value for count, (_, value) in zip(counts, items)))
+    return best
+
+######################################################
+#
+#    Plans
+#
+######################################################
+
+def test_set_minutes(index):
+    """Test that sets take longer with equipment, several muscles, and as cardio."""
+    squat, curl, running, hammer = (index.records[index.id_for_name(name)] for name in
+                                    ("Barbell Squat", "Squat Curl", "Running", "Hammer Curl"))
+
+    assert set_minutes(curl) == 3
+    assert set_minutes(hammer) == 4
+    assert set_minutes(squat) == 5
+    assert set_minutes(running) == CARDIO_SET_MINUTES
+
+@pytest.mark.parametrize("minutes", [0, 3, 7, 11, 20, 45])
+def test_build_plan_is_optimal(index, minutes):
+    """Test that the plan has the best value that fits the budget, checked by brute force."""
+    plan = build_plan(index, ["leg", "arm", "cardio"], minutes, max_sets=2)
+
+    assert plan.total_minutes <= minutes
+    assert plan.budget_minutes == minutes
+    assert plan.value == best_value(index, ["leg", "arm", "cardio"], minutes, max_sets=2)
+    assert all(1 <= item.sets <= 2 for item in plan.items)
+
+def test_build_plan_respects_equipment(index):
+    """Test that only exercises doable with the owned equipment are planned."""
+    plan = build_plan(index, ["leg", "arm"], 60, equipment_mask=EQUIPMENT.mask(["dumbbell"]))
+
+    assert [item.name for item in plan.items] == ["Squat Curl", "Running", "Hammer Curl"]
+    assert [item.sets for item in plan.items] == [3, 3, 3]
+    assert plan.total_minutes == 51
+
+def test_build_plan_nothing_to_plan(index):
+    """Test that unknown groups give an empty plan and invalid budgets are rejected."""
+    assert build_plan(index, ["unknown"], 30).items == []
+    with pytest.raises(ValueError):
+        build_plan(index, ["leg"], -1)
+    with pytest.raises(ValueError):
+        build_plan(index, ["leg"], 10_000)
+
+def test_split_groups():
+    """Test that groups are spread round robin over the sessions and cycled when there are fewer groups."""
+    assert split_groups(["leg", "arm", "chest", "back"], 3) == [["leg", "back"], ["arm"], ["chest"]]
+    assert split_groups(["leg", "arm"], 3) == [["leg"], ["arm"], ["leg"]]
+    assert split_groups([], 2) == [[], []]
+
+def test_build_week(index):
+    """Test that every session of the week gets its own plan filling the budget."""
+    week = build_week(index, ["leg", "arm"], 2, 15)
+
+    assert [[item.name for item in plan.items] for plan in week] == [["Barbell Squat", "Squat Curl"], ["Squat Curl", "Hammer Curl"]]
+    assert all(plan.budget_minutes == 15 for plan in week)
+    with pytest.raises(ValueError):
+        build_week(index, ["leg"], 0, 15)
@@ -0,0 +1,112 @@
+from datetime import date
+
+import pytest
+
+from workout.models import catalog_model
+from workout.models.plan_model import (
+    Profile, clear_profiles, get_last_plan_batch, get_weekly_plan, load_profiles, next_week_start,
+    precompute_weekly_plans, save_profile, week_start
+)
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def stored_catalog():
+    return catalog_model.store_catalog([
+        {
+            "id": 1,
+            "muscles": [{"name": "Quadriceps femoris"}, {"name": "Gluteus maximus"}],
+            "equipment": [{"name": "Barbell"}],
+            "exercises": [{"name": "Barbell Squat", "language": 2}],
+        },
+        {
+            "id": 2,
+            "muscles": [{"name": "Biceps brachii"}],
+            "equipment": [],
+            "exercises": [{"name": "Squat Curl", "language": 2}],
+        },
+        {
+            "id": 3,
+            "muscles": [{"name": "Latissimus dorsi"}],
+            "equipment": [{"name": "Dumbbell"}],
+            "exercises": [{"name": "Dumbbell Row", "language": 2}],
+        },
+    ])
+
+@pytest.fixture
+def profiles():
+    save_profile("alice", ["leg", "arm"], ["Barbell"])
+    save_profile("bob", ["back"], ["dumbbell"])
+    save_profile("carol", [], [])
+
+def session_names(plan):
+    return [[item["name"] for item in session["items"]] for session in plan.sessions]
+
+######################################################
+#
+#    Profiles
+#
+######################################################
+
+def test_save_and_load_profiles(profiles):
+    """Test that saved profiles load back in username order and saving again replaces them."""
+    save_profile("bob", ["abs"], [])
+
+    assert load_profiles() == [
+        Profile("alice", ["leg", "arm"], ["Barbell"]),
+        Profile("bob", ["abs"], []),
+        Profile("carol", [], []),
+    ]
+
+    clear_profiles()
+    assert load_profiles() == []
+
+def test_week_start():
+    """Test that weeks start on Monday and next week starts on the following Monday."""
+    assert week_start(date(2024, 12, 4)) == date(2024, 12, 2)
+    assert week_start(date(2024, 12, 2)) == date(2024, 12, 2)
+    assert next_week_start(date(2024, 12, 8)) == date(2024, 12, 9)
+
+######################################################
+#
+#    Batch
+#
+######################################################
+
+def test_precompute_weekly_plans(stored_catalog, profiles):
+    """Test that the batch plans every profile, stores the plans and reports its progress."""
+    progress = []
+
+    batch = precompute_weekly_plans("2024-12-09", workers=1, chunk_size=2, sessions=2, minutes=15,
+                                    progress=lambda done, total: progress.append((done, total)))
+
+    assert (batch.users, batch.planned, batch.failed, batch.workers) == (3, 3, 0, 1)
+    assert batch.catalog_version == stored_catalog.version
+    assert progress == [(2, 3), (3, 3)]
+    assert get_last_plan_batch() == batch
+
+    assert session_names(get_weekly_plan("alice", "2024-12-09")) == [["Barbell Squat", "Squat Curl"], ["Squat Curl"]]
+    assert session_names(get_weekly_plan("bob", "2024-12-09")) == [["Dumbbell Row"]] * 2
+    assert session_names(get_weekly_plan("carol", "2024-12-09")) == [[], []]
+    assert get_weekly_plan("alice", "2024-12-16") is None
+
+def test_precompute_weekly_plans_process_pool(stored_catalog, profiles):
+    """Test that worker processes planning from the shared snapshot store the same plans as in-process planning."""
+    precompute_weekly_plans("2024-12-09", workers=1, sessions=2, minutes=15)
+    expected = {username: get_weekly_plan(username, "2024-12-09").sessions for username in ("alice", "bob", "carol")}
+
+    batch = precompute_weekly_plans("2024-12-16", workers=2, chunk_size=1, sessions=2, minutes=15)
+
+    assert (batch.users, batch.planned, batch.workers) == (3, 3, 2)
+    assert {username: get_weekly_plan(username, "2024-12-16").sessions for username in expected} == expected
+
+def test_precompute_weekly_plans_without_profiles(stored_catalog):
+    """Test that a batch with no profiles stores an empty report."""
+    batch = precompute_weekly_plans("2024-12-09", workers=4)
+
+    assert (batch.users, batch.planned, batch.workers) == (0, 0, 1)
+    assert get_last_plan_batch() == batch
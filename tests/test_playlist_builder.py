@@ -0,0 +1,68 @@
+from itertools import combinations
+import random
+
+import pytest
+
+from workout.utils.playlist_builder import build_playlist
+from workout.utils.track_index import TrackIndex
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def index():
+    durations = [185, 240, 61, 302, 417, 133, 95, 276, 350, 0, 9000]
+    return TrackIndex([{"id": str(i), "name": f"Song {i}", "artist_name": "Artist", "duration": duration}
+                       for i, duration in enumerate(durations)], "v1")
+
+def best_total(index, target, overrun):
+    durations = [duration for duration in index.durations if 0 < duration <= target + overrun]
+    sums = {sum(chosen) for size in range(len(durations) + 1) for chosen in combinations(durations, size)}
+    return min((total for total in sums if total <= target + overrun), key=lambda total: (abs(total - target), -total))
+
+def total_of(index, playlist):
+    return sum(index.durations[index.labels.index(song)] for song in playlist.songs)
+
+######################################################
+#
+#    Playlists
+#
+######################################################
+
+@pytest.mark.parametrize("minutes", [1, 2, 5, 9, 17, 40])
+def test_build_playlist_best_fit(index, minutes):
+    """Test that the playlist length is the best fit for the session, checked by brute force."""
+    playlist = build_playlist(index, minutes, random.Random(minutes))
+
+    assert playlist.complete
+    assert playlist.target_seconds == minutes * 60
+    assert playlist.total_seconds == best_total(index, minutes * 60, 120)
+    assert total_of(index, playlist) == playlist.total_seconds
+    assert len(set(playlist.songs)) == len(playlist.songs)
+
+def test_build_playlist_seeds_vary():
+    """Test that the same seed repeats a playlist and other seeds can pick other songs of the same fit."""
+    index = TrackIndex([{"id": str(i), "name": f"Song {i}", "duration": 300} for i in range(6)], "v1")
+    first = build_playlist(index, 10, random.Random(1))
+
+    assert build_playlist(index, 10, random.Random(1)) == first
+    others = [build_playlist(index, 10, random.Random(seed)) for seed in range(2, 12)]
+    assert {playlist.total_seconds for playlist in others} == {first.total_seconds}
+    assert any(set(playlist.songs) != set(first.songs) for playlist in others)
+
+def test_build_playlist_time_budget(index):
+    """Test that an exhausted time budget returns an incomplete playlist instead of searching on."""
+    playlist = build_playlist(index, 10, time_budget=-1)
+
+    assert not playlist.complete
+    assert playlist.songs == []
+
+def test_build_playlist_invalid_length(index):
+    """Test that session lengths out of range are rejected."""
+    with pytest.raises(ValueError):
+        build_playlist(index, 0)
+    with pytest.raises(ValueError):
+        build_playlist(index, 601)
@@ -0,0 +1,70 @@
+import math
+
+import numpy as np
+
+from workout.utils.catalog_index import mask_matrix
+from workout.utils.ranking import coverage_scores, fit_scores, row_to_mask, top_k
+
+######################################################
+#
+#    Scores
+#
+######################################################
+
+def test_coverage_scores():
+    """Test that coverage is the share of the wanted bits each row has."""
+    matrix = mask_matrix([0b011, 0b100, 0b000])
+    ids = np.array([0, 1, 2])
+
+    assert coverage_scores(matrix, ids, 0b011).tolist() == [1.0, 0.0, 0.0]
+    assert coverage_scores(matrix, ids, 0b110).tolist() == [0.5, 0.5, 0.0]
+    assert coverage_scores(matrix, ids, 0).tolist() == [0.0, 0.0, 0.0]
+
+def test_fit_scores():
+    """Test that fit is the share of each row's bits that are owned, 1 for empty rows."""
+    matrix = mask_matrix([0b011, 0b001, 0b000])
+    ids = np.array([0, 1, 2])
+
+    assert fit_scores(matrix, ids, 0b001).tolist() == [0.5, 1.0, 1.0]
+    assert fit_scores(matrix, np.array([], dtype=np.int64), 0b001).tolist() == []
+
+def test_row_to_mask_wide():
+    """Test that rows of a multi-word matrix join back into the original mask."""
+    wide = (1 << 70) | 1
+    matrix = mask_matrix([wide, 2])
+
+    assert row_to_mask(matrix[0]) == wide
+    assert row_to_mask(matrix[1]) == 2
+
+######################################################
+#
+#    Top k
+#
+######################################################
+
+def test_top_k_orders_and_pages():
+    """Test that top_k returns the best scores first, ties in id order, one page at a time."""
+    ids = np.array([0, 1, 2, 3])
+    scores = np.array([0.1, 0.9, 0.5, 0.9])
+
+    assert top_k(ids, scores, lambda entry_id: entry_id, None) == [1, 3, 2, 0]
+    assert top_k(ids, scores, lambda entry_id: entry_id, 2) == [1, 3]
+    assert top_k(ids, scores, lambda entry_id: entry_id, 2, offset=2) == [2, 0]
+    assert top_k(ids, scores, lambda entry_id: entry_id, 2, offset=4) == []
+
+def test_top_k_skips_duplicates():
+    """Test that top_k keeps only the best id of each key."""
+    ids = np.array([0, 1, 2])
+    scores = np.array([0.2, 0.8, 0.5])
+    keys = {0: "squat", 1: "squat", 2: "curl"}
+
+    assert top_k(ids, scores, keys.get, None) == [1, 2]
+
+def test_top_k_penalty():
+    """Test that penalized ids drop by their penalty and infinite penalties drop them entirely."""
+    ids = np.array([0, 1, 2])
+    scores = np.array([0.9, 0.8, 0.5])
+    penalties = {0: 0.35, 2: math.inf}
+
+    assert top_k(ids, scores, lambda entry_id: entry_id, None, penalty=lambda entry_id: penalties.get(entry_id, 0.0)) == [1, 0]
+    assert top_k(ids, scores, lambda entry_id: entry_id, 1, penalty=lambda entry_id: penalties.get(entry_id, 0.0)) == [1]
@@ -5,10 +5,15 @@ from unittest.mock import MagicMock
 from datetime import datetime
 from datetime import date
 
+from workout.models import catalog_model, track_model
 from workout.models.recommendations_model import (
     Exercise,
     RecommendationsModel,
+    prewarm_results,
+    result_cache_stats,
 )
+from workout.utils.catalog_records import ExerciseRecord
+from workout.utils.vocabulary import EQUIPMENT, MUSCLE_GROUPS
 
 ######################################################
 #
@@ -199,6 +204,49 @@ def test_get_equipment(recommendations_model, sample_equipment1):
     result = recommendations_model.get_equipment()
     assert result == [sample_equipment1]
 
+def test_profile_masks_track_lists(recommendations_model, sample_target_group_list, sample_equipment_list):
+    """Test that the profile bitmasks follow target group and equipment changes."""
+    group_mask, equipment_mask = MUSCLE_GROUPS.mask(sample_target_group_list), EQUIPMENT.mask(sample_equipment_list)
+    recommendations_model.set_target_groups(list(sample_target_group_list))
+    recommendations_model.set_equipment(list(sample_equipment_list))
+    assert recommendations_model.profile_masks() == (group_mask, equipment_mask)
+
+    recommendations_model.remove_target_group("leg")
+    recommendations_model.remove_equipment("dumbbell")
+    assert recommendations_model.profile_masks() == (MUSCLE_GROUPS.bit("arm"), EQUIPMENT.bit("kettlebell"))
+
+def test_profile_masks_pick_up_later_names(recommendations_model):
+    """Test that equipment first seen in the catalog after the profile was set joins the mask."""
+    recommendations_model.set_equipment(["Profile Only Rack"])
+    assert recommendations_model.equipment_mask == 0
+
+    bit = EQUIPMENT.bit("profile only rack")
+    assert recommendations_model.profile_masks()[1] == bit
+
+def test_fits_profile(recommendations_model):
+    """Test matching a catalog record against the profile masks."""
+    squat = ExerciseRecord("Barbell Squat", "Legs", "Barbell", MUSCLE_GROUPS.bit("leg"), EQUIPMENT.bit("barbell"))
+    bench_squat = ExerciseRecord("Box Squat", "Legs", "Barbell, Bench", MUSCLE_GROUPS.bit("leg"), EQUIPMENT.mask(["barbell", "bench"]))
+    curl = ExerciseRecord("Barbell Curl", "Biceps", "Barbell", MUSCLE_GROUPS.bit("arm"), EQUIPMENT.bit("barbell"))
+    recommendations_model.set_target_groups(["Leg"])
+    recommendations_model.set_equipment(["barbell"])
+
+    assert recommendations_model.fits_profile(squat) is True
+    assert recommendations_model.fits_profile(bench_squat) is False
+    assert recommendations_model.fits_profile(curl) is False
+
+def test_profile_changes_do_not_grow_vocabularies(recommendations_model):
+    """Test that target groups and equipment given by users are not interned into the shared vocabularies."""
+    groups, equipment = len(MUSCLE_GROUPS), len(EQUIPMENT)
+
+    recommendations_model.set_target_groups(["Not A Group"])
+    recommendations_model.add_target_group("another group")
+    recommendations_model.set_equipment(["Not Equipment"])
+    recommendations_model.add_equipment("more equipment")
+
+    assert (len(MUSCLE_GROUPS), len(EQUIPMENT)) == (groups, equipment)
+    assert "not a group" not in MUSCLE_GROUPS and "more equipment" not in EQUIPMENT
+
 ######################################################
 #
 #    target songs
@@ -278,7 +326,7 @@ def test_get_target_songs(recommendations_model, sample_target_song1):
 
 def test_get_exercises_by_many_muscle_groups(mocker, recommendations_model, sample_target_group_list):
     """Test fetching exercises based on multiple muscle groups."""
-    mock_response = mocker.patch("requests.get")
+    mock_response = mocker.patch("requests.Session.get")
     mock_response.return_value.status_code = 200
     mock_response.return_value.json.return_value = {
         "results": [
@@ -330,7 +378,7 @@ def test_get_exercises_by_many_muscle_groups(mocker, recommendations_model, samp
 
 def test_get_exercises_by_many_equipment(mocker, recommendations_model, sample_equipment_list):
     """Test fetching exercises based on multiple equipment types."""
-    mock_response = mocker.patch("requests.get")
+    mock_response = mocker.patch("requests.Session.get")
     mock_response.return_value.status_code = 200
     mock_response.return_value.json.return_value = {
         "results": [
@@ -413,6 +461,199 @@ def test_get_exercises_by_many_equipment(mocker, recommendations_model, sample_e
     
     assert result == expected_results
 
+def test_get_exercises_by_many_equipment_needs_all_owned(mocker, recommendations_model):
+    """Test that an exercise needing several pieces of equipment matches only when all are owned."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = {
+        "results": [
+            {
+                "id": 1,
+                "muscles": [],
+                "equipment": [{"id": 1, "name": "Barbell"}, {"id": 8, "name": "Bench"}],
+                "exercises": [{"name": "Bench Press", "language": 2}],
+            },
+            {
+                "id": 2,
+                "muscles": [],
+                "equipment": [],
+                "exercises": [{"name": "Push-up", "language": 2}],
+            },
+        ]
+    }
+
+    owns_both = recommendations_model.get_exercises_by_many_equipment(["Barbell", "bench"])
+    owns_one = recommendations_model.get_exercises_by_many_equipment(["barbell"])
+
+    assert [exercise.name for exercise in owns_both] == ["Bench Press", "Push-up"]
+    assert [exercise.name for exercise in owns_one] == ["Push-up"]
+
+@pytest.fixture
+def ranking_catalog():
+    return {
+        "results": [
+            {
+                "id": 1,
+                "muscles": [],
+                "equipment": [{"name": "Barbell"}],
+                "exercises": [{"name": "Barbell Squat", "language": 2}],
+            },
+            {
+                "id": 2,
+                "muscles": [],
+                "equipment": [],
+                "exercises": [{"name": "Running", "language": 2}],
+            },
+            {
+                "id": 3,
+                "muscles": [],
+                "equipment": [],
+                "exercises": [{"name": "Squat Curl", "language": 2}],
+            },
+            {
+                "id": 4,
+                "muscles": [],
+                "equipment": [],
+                "exercises": [{"name": "Running", "language": 2}],
+            },
+        ]
+    }
+
+def test_get_exercises_by_many_muscle_groups_ranked(mocker, recommendations_model, ranking_catalog):
+    """Test that exercises are ranked by coverage and equipment fit, with duplicate names listed once."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+
+    result = recommendations_model.get_exercises_by_many_muscle_groups(["leg", "arm"])
+
+    assert [exercise.name for exercise in result] == ["Squat Curl", "Running", "Barbell Squat"]
+
+def test_get_exercises_by_many_muscle_groups_paged(mocker, recommendations_model, ranking_catalog):
+    """Test that limit and offset return one page of the ranking."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+    recommendations_model.set_equipment(["barbell"])
+
+    first = recommendations_model.get_exercises_by_many_muscle_groups(["leg", "arm"], limit=1)
+    second = recommendations_model.get_exercises_by_many_muscle_groups(["leg", "arm"], limit=5, offset=1)
+
+    assert [exercise.name for exercise in first] == ["Squat Curl"]
+    assert [exercise.name for exercise in second] == ["Barbell Squat", "Running"]
+    with pytest.raises(ValueError):
+        recommendations_model.get_exercises_by_many_muscle_groups(["leg"], limit=-1)
+
+def test_get_exercises_prefers_novel(mocker, recommendations_model, ranking_catalog):
+    """Test that exercises already recommended to the user drop below equally good new ones."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+    recommendations_model.set_equipment(["barbell"])
+
+    first = recommendations_model.get_exercises_by_many_muscle_groups(["leg"], limit=1)
+    second = recommendations_model.get_exercises_by_many_muscle_groups(["leg"], limit=1)
+
+    assert [exercise.name for exercise in first] == ["Barbell Squat"]
+    assert [exercise.name for exercise in second] == ["Running"]
+    assert recommendations_model.recommended_counts[1] == 1
+
+def test_get_exercises_pages_are_stable(mocker, recommendations_model):
+    """Test that walking every offset returns each exercise exactly once, although each page counts as recommended."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = {"results": [
+        {"id": i, "muscles": [], "equipment": [], "exercises": [{"name": f"Squat {i}", "language": 2}]}
+        for i in range(8)
+    ]}
+
+    for _ in range(2):
+        names = []
+        for offset in range(0, 9, 3):
+            names += [exercise.name for exercise in
+                      recommendations_model.get_exercises_by_many_muscle_groups(["leg"], limit=3, offset=offset)]
+
+        assert sorted(names) == [f"Squat {i}" for i in range(8)]
+
+def test_get_exercises_by_groups_and_equipment(mocker, recommendations_model, ranking_catalog):
+    """Test that only exercises working a group and doable with the equipment are returned."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+
+    without_barbell = recommendations_model.get_exercises_by_groups_and_equipment(["leg"], [])
+    with_barbell = recommendations_model.get_exercises_by_groups_and_equipment(["leg"], ["Barbell"])
+    unknown_group = recommendations_model.get_exercises_by_groups_and_equipment(["unknown"], ["barbell"])
+
+    assert sorted(exercise.name for exercise in without_barbell) == ["Running", "Squat Curl"]
+    assert sorted(exercise.name for exercise in with_barbell) == ["Barbell Squat", "Running", "Squat Curl"]
+    assert unknown_group == []
+
+def test_get_exercises_history_exclude(mocker, recommendations_model, ranking_catalog):
+    """Test that the exclude history mode drops exercises the user logged recently."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+    mock_recent = mocker.patch("workout.models.recommendations_model.get_recent_exercises", return_value={"squat curl": 0})
+
+    result = recommendations_model.get_exercises_by_many_muscle_groups(["leg", "arm"], history="exclude", history_days=3)
+
+    assert [exercise.name for exercise in result] == ["Running", "Barbell Squat"]
+    mock_recent.assert_called_once_with("Matthew", 3)
+
+def test_get_exercises_history_downweight(mocker, recommendations_model, ranking_catalog):
+    """Test that the downweight history mode ranks recently logged exercises lower, the most recent lowest."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+    mocker.patch("workout.models.recommendations_model.get_recent_exercises", return_value={"squat curl": 0, "running": 6})
+
+    result = recommendations_model.get_exercises_by_many_muscle_groups(["leg", "arm"], history="downweight")
+
+    assert [exercise.name for exercise in result] == ["Running", "Squat Curl", "Barbell Squat"]
+    with pytest.raises(ValueError):
+        recommendations_model.get_exercises_by_many_muscle_groups(["leg"], history="forget")
+
+def test_results_shared_between_users(mocker, ranking_catalog):
+    """Test that users asking the same question share one cached evaluation."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+    first_user = RecommendationsModel("first")
+    second_user = RecommendationsModel("second")
+
+    first = first_user.get_exercises_by_many_muscle_groups(["arm", "leg"])
+    second = second_user.get_exercises_by_many_muscle_groups(["leg", "arm", "unknown"])
+
+    assert first == second
+    assert result_cache_stats()["misses"] == 1
+    assert result_cache_stats()["hits"] == 1
+
+def test_results_invalidated_on_catalog_refresh(mocker, recommendations_model, ranking_catalog):
+    """Test that cached results are dropped once the catalog changes."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+    assert len(recommendations_model.get_exercises_by_many_muscle_groups(["arm"])) == 1
+
+    mock_response.return_value.json.return_value = {"results": ranking_catalog["results"][:2]}
+    catalog_model.refresh_catalog()
+
+    assert recommendations_model.get_exercises_by_many_muscle_groups(["arm"]) == []
+    assert result_cache_stats()["invalidations"] == 1
+
+def test_prewarm_results(mocker, ranking_catalog):
+    """Test that prewarming caches every combination of the standard target groups."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+
+    assert prewarm_results() == 31
+    assert result_cache_stats()["entries"] == 31
+
+    RecommendationsModel("user").get_exercises_by_many_muscle_groups(["leg", "cardio"])
+    assert result_cache_stats()["hits"] == 1
+
 @pytest.fixture
 def mock_api_response():
     """Fixture to provide a mock API response."""
@@ -450,7 +691,7 @@ def sample_muscle_group():
 def test_update_one_exercise(mocker, recommendations_model, sample_recommendations, sample_muscle_group, mock_api_response):
     """Test updating an exercise in the recommendations list."""
     
-    mocker.patch("requests.get", return_value=mock_api_response)
+    mocker.patch("requests.Session.get", return_value=mock_api_response)
     
     assert len(sample_recommendations) == 2
     
@@ -468,7 +709,7 @@ def test_update_one_exercise(mocker, recommendations_model, sample_recommendatio
 def test_update_one_exercise_invalid_index(mocker, recommendations_model, sample_recommendations, sample_muscle_group, mock_api_response):
     """Test updating an exercise with an invalid index."""
     
-    mocker.patch("requests.get", return_value=mock_api_response)
+    mocker.patch("requests.Session.get", return_value=mock_api_response)
     
     assert len(sample_recommendations) == 2
     
@@ -477,6 +718,93 @@ def test_update_one_exercise_invalid_index(mocker, recommendations_model, sample
     assert updated_recommendations[0].name == "Barbell Squat"  
     assert updated_recommendations[1].name == "Push-up"
 
+def test_build_workout_plan(mocker, recommendations_model, ranking_catalog):
+    """Test that plans default to the user's target groups and equipment and fit the budget."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = ranking_catalog
+    recommendations_model.set_target_groups(["leg"])
+
+    plan = recommendations_model.build_workout_plan(10)
+    with_barbell = recommendations_model.build_workout_plan(30, equipment_list=["Barbell"])
+
+    assert plan.total_minutes <= 10
+    assert "Barbell Squat" not in [item.name for item in plan.items]
+    assert "Barbell Squat" in [item.name for item in with_barbell.items]
+
+@pytest.fixture
+def replacement_catalog():
+    return {
+        "results": [
+            {
+                "id": 1,
+                "muscles": [{"name": "Quadriceps femoris"}],
+                "equipment": [{"name": "Barbell"}],
+                "exercises": [{"name": "Barbell Squat", "language": 2}, {"name": "Kniebeuge", "language": 1}],
+            },
+            {
+                "id": 2,
+                "muscles": [{"name": "Quadriceps femoris"}],
+                "equipment": [{"name": "Barbell"}],
+                "exercises": [{"name": "Front Squat", "language": 2}],
+            },
+            {
+                "id": 3,
+                "muscles": [{"name": "Quadriceps femoris"}],
+                "equipment": [{"name": "Barbell"}],
+                "exercises": [{"name": "Zercher Squat", "language": 2}],
+            },
+            {
+                "id": 4,
+                "muscles": [{"name": "Biceps brachii"}],
+                "equipment": [],
+                "exercises": [{"name": "Chin-up Curl", "language": 2}],
+            },
+            {
+                "id": 5,
+                "muscles": [],
+                "equipment": [],
+                "exercises": [{"name": "Running", "language": 2}],
+            },
+        ]
+    }
+
+def test_replace_exercise_same_profile(mocker, recommendations_model, replacement_catalog):
+    """Test that a replacement works the same muscles with the same equipment, repeatably for a seed."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = replacement_catalog
+
+    picks = {recommendations_model.replace_exercise("barbell squat", seed=seed).name for seed in range(20)}
+
+    assert picks == {"Front Squat", "Zercher Squat"}
+    assert recommendations_model.replace_exercise("Barbell Squat", seed=3) == recommendations_model.replace_exercise("Barbell Squat", seed=3)
+
+def test_replace_exercise_falls_back_to_group(mocker, recommendations_model, replacement_catalog):
+    """Test that an exercise without same-profile alternatives is replaced from the target group."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = replacement_catalog
+
+    assert recommendations_model.replace_exercise("Chin-up Curl") is None
+    assert recommendations_model.replace_exercise("Chin-up Curl", muscle="cardio").name == "Running"
+    assert recommendations_model.replace_exercise("Unknown Exercise", muscle="leg").name in ("Barbell Squat", "Front Squat", "Zercher Squat")
+    assert recommendations_model.replace_exercise("Unknown Exercise", muscle="Legs").name in ("Barbell Squat", "Front Squat", "Zercher Squat")
+
+def test_update_one_exercise_replaces(mocker, recommendations_model, sample_recommendations, replacement_catalog):
+    """Test that update_one_exercise swaps only the exercise at the index and leaves the input list alone."""
+    mock_response = mocker.patch("requests.Session.get")
+    mock_response.return_value.status_code = 200
+    mock_response.return_value.json.return_value = replacement_catalog
+
+    updated = recommendations_model.update_one_exercise(sample_recommendations, 0, "leg")
+
+    assert updated[0].name in ("Front Squat", "Zercher Squat")
+    assert updated[0].equipment == "Barbell"
+    assert updated[1] == sample_recommendations[1]
+    assert sample_recommendations[0].name == "Barbell Squat"
+    assert recommendations_model.update_one_exercise(sample_recommendations, 5, "leg") is sample_recommendations
+
 ######################################################
 #
 #    External API Calls (jamendo music api)
@@ -488,6 +816,7 @@ def mock_jamendo_response():
     """Fixture to create a mock response object for the Jamendo API."""
 
     mock_response = MagicMock(spec=requests.Response)
+    mock_response.status_code = 200
 
     mock_response.json.return_value = {
         "results": [
@@ -524,18 +853,29 @@ def test_fetch_songs_based_on_workouts(mocker, recommendations_model):
     }
     mock_response.raise_for_status.return_value = None  
 
-    mocker.patch("requests.get", return_value=mock_response)
+    mocker.patch("requests.Session.get", return_value=mock_response)
 
     expected_songs = ["Song C by Artist C"]
 
     result = recommendations_model.fetch_songs_based_on_workouts(workout_count)
     assert result == expected_songs
 
+def test_fetch_songs_based_on_workouts_paged(mocker, recommendations_model, mock_jamendo_response):
+    """Test that songs long enough for the workouts are served shortest first, one page at a time."""
+    get = mocker.patch("requests.Session.get", return_value=mock_jamendo_response)
+
+    assert recommendations_model.fetch_songs_based_on_workouts(2) == ["Song A by Artist A", "Song C by Artist C"]
+    assert recommendations_model.fetch_songs_based_on_workouts(2, limit=1, offset=1) == ["Song C by Artist C"]
+    assert recommendations_model.fetch_songs_based_on_workouts(2, limit=1, offset=2) == []
+    assert recommendations_model.fetch_songs_based_on_workouts(6) == ["Song C by Artist C"]
+    # The track list, then one crawl for more candidates per minimum duration
+    assert get.call_count == 3
+
 def test_fetch_songs_based_on_workouts_api_error(mocker,recommendations_model):
     """Test handling API request errors."""
     workout_count = 3  # Example workout count
     
-    mocker.patch("requests.get", side_effect=requests.exceptions.RequestException("API error"))
+    mocker.patch("requests.Session.get", side_effect=requests.exceptions.RequestException("API error"))
     
     result = recommendations_model.fetch_songs_based_on_workouts(workout_count)
     
@@ -545,21 +885,98 @@ def test_fetch_songs_based_on_workouts_api_error(mocker,recommendations_model):
 def test_fetch_random_song(mocker, mock_jamendo_response,recommendations_model):
     """Test fetching a random song."""
     
-    mocker.patch("requests.get", return_value=mock_jamendo_response)
+    mocker.patch("requests.Session.get", return_value=mock_jamendo_response)
     
     result = recommendations_model.fetch_random_song()
     
     assert "by" in result  
 
+def test_fetch_random_song_from_pool(mocker, mock_jamendo_response, recommendations_model):
+    """Test that random songs come from the prefetched pool without further requests and repeat with the same seed."""
+    get = mocker.patch("requests.Session.get", return_value=mock_jamendo_response)
+    track_model.seed_song_pool(11)
+    first = [recommendations_model.fetch_random_song() for _ in range(5)]
+
+    track_model.clear_track_cache()
+    track_model.seed_song_pool(11)
+    recommendations_model.rotation = None
+    second = [recommendations_model.fetch_random_song() for _ in range(5)]
+
+    assert first == second
+    assert set(first) <= {"Song A by Artist A", "Song B by Artist B", "Song C by Artist C"}
+    assert get.call_count == 2
+
+def test_fetch_random_song_no_repeats(mocker, mock_jamendo_response, recommendations_model):
+    """Test that every song is served once before any repeats, target songs first."""
+    mocker.patch("requests.Session.get", return_value=mock_jamendo_response)
+    recommendations_model.set_target_songs(["song c"])
+
+    first = [recommendations_model.fetch_random_song() for _ in range(3)]
+    second = [recommendations_model.fetch_random_song() for _ in range(3)]
+
+    assert first[0] == "Song C by Artist C"
+    assert sorted(first) == sorted(second) == ["Song A by Artist A", "Song B by Artist B", "Song C by Artist C"]
+
+def test_fetch_songs_based_on_workouts_rotates(mocker, mock_jamendo_response, recommendations_model):
+    """Test that listings skip songs already served to the user and start over once all were served."""
+    mocker.patch("requests.Session.get", return_value=mock_jamendo_response)
+
+    assert recommendations_model.fetch_songs_based_on_workouts(1, limit=1) == ["Song B by Artist B"]
+    assert recommendations_model.fetch_songs_based_on_workouts(1, limit=1) == ["Song A by Artist A"]
+    assert recommendations_model.fetch_songs_based_on_workouts(2) == ["Song C by Artist C"]
+    assert recommendations_model.fetch_songs_based_on_workouts(2) == ["Song A by Artist A", "Song C by Artist C"]
+
+    recommendations_model.set_target_songs(["Song C by Artist C"])
+    recommendations_model.rotation = None
+    assert recommendations_model.fetch_songs_based_on_workouts(1, limit=2) == ["Song C by Artist C", "Song B by Artist B"]
+
+def test_fetch_songs_based_on_workouts_pages_whole_span(mocker, recommendations_model):
+    """Test that paging through the matching songs serves every song once, whatever was served before."""
+    mock_response = mocker.MagicMock()
+    mock_response.json.return_value = {
+        "results": [{"name": f"S{i}", "artist_name": "Artist", "duration": 100 + i} for i in range(10)]
+    }
+    mocker.patch("requests.Session.get", return_value=mock_response)
+
+    pages = [recommendations_model.fetch_songs_based_on_workouts(1, limit=2, offset=offset) for offset in range(0, 10, 2)]
+    assert pages == [[f"S{i} by Artist", f"S{i + 1} by Artist"] for i in range(0, 10, 2)]
+
+    recommendations_model.rotation = None
+    assert recommendations_model.fetch_songs_based_on_workouts(1, limit=1, offset=3) == ["S3 by Artist"]
+    served = [song for offset in range(0, 10, 2) for song in recommendations_model.fetch_songs_based_on_workouts(1, limit=2, offset=offset)]
+    assert sorted(served) == [f"S{i} by Artist" for i in range(10) if i != 3]
+
+def test_fetch_songs_rotation_survives_merge(mocker, mock_jamendo_response, recommendations_model):
+    """Test that tracks merged into the list by a crawl keep the songs already served to the user."""
+    mocker.patch("requests.Session.get", return_value=mock_jamendo_response)
+
+    assert recommendations_model.fetch_songs_based_on_workouts(1, limit=1) == ["Song B by Artist B"]
+    track_model.merge_tracks([{"name": "Song D", "artist_name": "Artist D", "duration": 120}])
+
+    assert recommendations_model.fetch_songs_based_on_workouts(1) == ["Song D by Artist D", "Song A by Artist A", "Song C by Artist C"]
+
+def test_build_playlist(mocker, mock_jamendo_response, recommendations_model):
+    """Test that the playlist covering a session is built from the cached tracks and repeats for the same seed."""
+    mocker.patch("requests.Session.get", return_value=mock_jamendo_response)
+
+    playlist = recommendations_model.build_playlist(7)
+
+    assert set(playlist.songs) == {"Song A by Artist A", "Song B by Artist B"}
+    assert (playlist.total_seconds, playlist.target_seconds) == (450, 420)
+    assert recommendations_model.build_playlist(7) == playlist
+    with pytest.raises(ValueError):
+        recommendations_model.build_playlist(0)
+
 def test_fetch_random_song_no_results(mocker, recommendations_model):
     """Test the behavior when no songs are found from the Jamendo API."""
 
     mock_response = MagicMock(spec=requests.Response)
+    mock_response.status_code = 200
     
     mock_response.raise_for_status = MagicMock() 
     mock_response.json.return_value = {"results": []} 
     
-    mocker.patch("requests.get", return_value=mock_response)
+    mocker.patch("requests.Session.get", return_value=mock_response)
     
     result = recommendations_model.fetch_random_song()
 
@@ -568,7 +985,7 @@ def test_fetch_random_song_no_results(mocker, recommendations_model):
 def test_fetch_random_song_api_error(mocker,recommendations_model):
     """Test handling API request errors."""
     
-    mocker.patch("requests.get", side_effect=requests.exceptions.RequestException("API error"))
+    mocker.patch("requests.Session.get", side_effect=requests.exceptions.RequestException("API error"))
     
     result = recommendations_model.fetch_random_song()
     
@@ -0,0 +1,105 @@
+import time
+
+import pytest
+
+from workout.utils.refresher import BackgroundRefresher, RefreshJob
+
+class Dataset:
+    def __init__(self, version, fetched_at):
+        self.version = version
+        self.fetched_at = fetched_at
+
+@pytest.fixture
+def source():
+    """A dataset whose refreshes can be made to fail."""
+    state = {"current": Dataset("v1", time.time()), "refreshes": 0, "fail": False}
+
+    def refresh():
+        state["refreshes"] += 1
+        if state["fail"]:
+            raise ConnectionError("down")
+        state["current"] = Dataset(f"v{state['refreshes'] + 1}", time.time())
+        return state["current"]
+
+    return state, refresh
+
+def test_first_run_picks_up_current_copy(source):
+    """Test that a fresh copy is not downloaded again at startup."""
+    state, refresh = source
+    job = RefreshJob("data", current=lambda: state["current"], refresh=refresh, ttl=100)
+    refresher = BackgroundRefresher()
+    refresher.add(job)
+
+    wait = refresher.run_pending()
+
+    assert state["refreshes"] == 0
+    assert job.version == "v1"
+    assert 70 < wait <= 80
+
+def test_refreshes_before_ttl_lapses(source):
+    """Test that a copy past the refresh-ahead point is replaced."""
+    state, refresh = source
+    state["current"] = Dataset("v1", time.time() - 90)
+    job = RefreshJob("data", current=lambda: state["current"], refresh=refresh, ttl=100)
+    refresher = BackgroundRefresher()
+    refresher.add(job)
+
+    refresher.run_pending()
+
+    assert state["refreshes"] == 1
+    assert job.version == "v2"
+    assert job.last_success is not None
+
+def test_failure_backs_off(source):
+    """Test that failed refreshes keep the old version and back off exponentially."""
+    state, refresh = source
+    state["current"] = Dataset("v1", time.time() - 90)
+    state["fail"] = True
+    job = RefreshJob("data", current=lambda: state["current"], refresh=refresh, ttl=100)
+    refresher = BackgroundRefresher(base_backoff=10, max_backoff=15)
+    refresher.add(job)
+
+    refresher.run_pending()
+    assert job.failures == 1
+    assert job.version == "v1"
+    assert 5 <= job.next_run - time.time() <= 10
+
+    job.next_run = 0
+    refresher.run_pending()
+    assert job.failures == 2
+    assert 7.5 <= job.next_run - time.time() <= 15
+
+    status = refresher.status()
+    assert status["running"] is False
+    assert status["jobs"]["data"]["last_error"] == "down"
+
+def test_broken_job_does_not_stop_others(source):
+    """Test that a job returning something that is not a dataset backs off without affecting the other jobs."""
+    state, refresh = source
+    broken = RefreshJob("broken", current=lambda: None, refresh=lambda: None, ttl=100)
+    job = RefreshJob("data", current=lambda: state["current"], refresh=refresh, ttl=100)
+    refresher = BackgroundRefresher(base_backoff=10, max_backoff=15)
+    refresher.add(broken)
+    refresher.add(job)
+
+    refresher.run_pending()
+
+    assert broken.failures == 1 and broken.version is None
+    assert job.version == "v1" and job.failures == 0
+
+def test_thread_start_and_stop(source):
+    """Test that the refresher thread runs jobs in the background and stops cleanly."""
+    state, refresh = source
+    state["current"] = Dataset("v1", time.time() - 90)
+    refresher = BackgroundRefresher()
+    refresher.add(RefreshJob("data", current=lambda: state["current"], refresh=refresh, ttl=100))
+
+    refresher.start()
+    deadline = time.time() + 2
+    while state["refreshes"] == 0 and time.time() < deadline:
+        time.sleep(0.01)
+    assert refresher.status()["running"] is True
+    refresher.stop(timeout=2)
+
+    assert state["refreshes"] == 1
+    assert refresher.status()["running"] is False
@@ -0,0 +1,53 @@
+from workout.utils.result_cache import ResultCache
+
+######################################################
+#
+#    Lookups
+#
+######################################################
+
+def test_get_or_compute_caches():
+    """Test that a result is computed once per key and version."""
+    cache = ResultCache()
+    calls = []
+
+    def compute():
+        calls.append(1)
+        return "result"
+
+    assert cache.get_or_compute("v1", "key", compute) == "result"
+    assert cache.get_or_compute("v1", "key", compute) == "result"
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_lru_eviction():
+    """Test that the least recently used result is evicted past max_entries."""
+    cache = ResultCache(max_entries=2)
+    cache.get_or_compute("v1", "a", lambda: 1)
+    cache.get_or_compute("v1", "b", lambda: 2)
+    cache.get_or_compute("v1", "a", lambda: 1)
+    cache.get_or_compute("v1", "c", lambda: 3)
+
+    assert cache.get_or_compute("v1", "a", lambda: "recomputed") == 1
+    assert cache.get_or_compute("v1", "b", lambda: "recomputed") == "recomputed"
+    assert cache.stats()["entries"] == 2
+
+def test_new_version_drops_results():
+    """Test that a lookup for a new version drops every result of the old one."""
+    cache = ResultCache()
+    cache.get_or_compute("v1", "a", lambda: 1)
+    cache.get_or_compute("v1", "b", lambda: 2)
+
+    assert cache.get_or_compute("v2", "a", lambda: 10) == 10
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["invalidations"] == 1
+    assert cache.version == "v2"
+
+def test_clear():
+    """Test that clear drops every result."""
+    cache = ResultCache()
+    cache.get_or_compute("v1", "a", lambda: 1)
+    cache.clear()
+
+    assert cache.get_or_compute("v1", "a", lambda: 2) == 2
@@ -0,0 +1,115 @@
+import sys
+
+from workout.utils.rotation import SongRotation
+from workout.utils.track_index import TrackIndex
+
+def tracks(durations):
+    return [{"id": str(i), "name": f"Song {i}", "duration": duration} for i, duration in enumerate(durations)]
+
+######################################################
+#
+#    Marking tracks
+#
+######################################################
+
+def test_mark_and_is_played():
+    """Test that marked tracks are played and counted once."""
+    rotation = SongRotation("v1", 20)
+
+    rotation.mark(3)
+    rotation.mark(3)
+    rotation.mark(19)
+
+    assert rotation.is_played(3) and rotation.is_played(19)
+    assert not rotation.is_played(4)
+    assert rotation.played == 2
+
+def test_starts_over_when_exhausted():
+    """Test that marking the last unplayed track starts a new rotation."""
+    rotation = SongRotation("v1", 3)
+
+    rotation.mark(0)
+    rotation.mark(1)
+    rotation.mark(2)
+
+    assert rotation.played == 0
+    assert not any(rotation.is_played(position) for position in range(3))
+
+def test_sync_starts_over_when_tracks_change():
+    """Test that a track list downloaded again starts a new rotation, and the same one keeps it."""
+    index = TrackIndex(tracks(range(10)), "v1")
+    rotation = SongRotation(index.version, len(index), index.lineage)
+    rotation.mark(5)
+
+    rotation.sync(index)
+    assert rotation.is_played(5)
+
+    rotation.sync(TrackIndex(tracks(range(12)), "v2"))
+    assert (rotation.version, rotation.size, rotation.played) == ("v2", 12, 0)
+    assert not rotation.is_played(5)
+
+def test_sync_keeps_rotation_across_merges():
+    """Test that tracks merged into the list keep the played tracks, moved to their new positions."""
+    items = tracks([100, 300, 500, 700])
+    index = TrackIndex(items, "v1")
+    rotation = SongRotation(index.version, len(index), index.lineage)
+    rotation.mark(1)
+    rotation.mark(3)
+
+    merged = items + [{"id": "a", "duration": 200}, {"id": "b", "duration": 600}, {"id": "c", "duration": 50}]
+    rotation.sync(TrackIndex(merged, "v2", "v1"))
+
+    played = [position for position in range(rotation.size) if rotation.is_played(position)]
+    assert (rotation.version, rotation.lineage, rotation.size, rotation.played) == ("v2", "v1", 7, 2)
+    # 300s and 700s tracks, behind the merged 50s, 200s and 600s ones
+    assert played == [3, 6]
+
+def test_state_is_compact():
+    """Test that a rotation over a thousand tracks takes a few hundred bytes."""
+    rotation = SongRotation("v1", 1000)
+
+    assert len(rotation.bits) == 125
+    assert sys.getsizeof(rotation) + sys.getsizeof(rotation.bits) < 400
+
+######################################################
+#
+#    Finding unplayed tracks
+#
+######################################################
+
+def test_next_unplayed_skips_played_and_wraps():
+    """Test that the search skips played tracks, including whole bytes of them, and wraps around."""
+    rotation = SongRotation("v1", 30)
+    for position in range(2, 29):
+        rotation.mark(position)
+
+    assert rotation.next_unplayed(2) == 29
+    assert rotation.next_unplayed(29) == 29
+    assert rotation.next_unplayed(0) == 0
+
+    rotation.mark(29)
+    assert rotation.next_unplayed(5) == 0
+
+def test_next_unplayed_within_range():
+    """Test that a bounded search does not wrap and reports a fully played range."""
+    rotation = SongRotation("v1", 40)
+    for position in range(8, 24):
+        rotation.mark(position)
+
+    assert rotation.next_unplayed(8, 24) is None
+    assert rotation.next_unplayed(8, 25) == 24
+
+    rotation.clear_range(8, 12)
+    assert rotation.next_unplayed(8, 24) == 8
+    assert rotation.played == 12
+
+def test_next_unplayed_ignores_padding():
+    """Test that positions past the last track are never returned."""
+    rotation = SongRotation("v1", 10)
+    for position in range(1, 10):
+        if position != 9:
+            rotation.mark(position)
+
+    assert rotation.next_unplayed(9) == 9
+    rotation.mark(9)
+    assert rotation.next_unplayed(1) == 0
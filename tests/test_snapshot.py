@@ -0,0 +1,163 @@
+import json
+
+import pytest
+import requests
+
+from workout.models import snapshot_model
+from workout.models.catalog_model import get_catalog_index, store_catalog
+from workout.models.recommendations_model import RecommendationsModel
+from workout.models.snapshot_model import build_snapshot, snapshot_status
+from workout.utils import keyword_matcher
+from workout.utils.catalog_records import normalize_catalog
+from workout.utils.snapshot import load_snapshot, write_snapshot
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+@pytest.fixture
+def sample_items():
+    return [
+        {
+            "id": 1,
+            "muscles": [{"name": "Quadriceps femoris"}],
+            "equipment": [{"name": "Barbell"}],
+            "exercises": [{"name": "Barbell Squat", "language": 2}, {"name": "Kniebeuge", "language": 1}],
+        },
+        {
+            "id": 2,
+            "muscles": [{"name": "Biceps brachii"}],
+            "equipment": [{"name": "Barbell"}, {"name": "Bench"}],
+            "exercises": [{"name": "Preacher Curl ü", "language": 2}],
+        },
+        {"id": 3, "muscles": [], "equipment": [], "exercises": [{"name": "Running", "language": 2}]},
+    ]
+
+@pytest.fixture
+def sample_tracks():
+    return [
+        {"id": "11", "name": "Song A", "artist_name": "Artist A", "duration": 180},
+        {"id": "12", "name": "Song B", "artist_name": "Artist B", "duration": 420},
+    ]
+
+@pytest.fixture
+def snapshot_file(tmp_path, sample_items, sample_tracks):
+    path = str(tmp_path / "snapshot.bin")
+    write_snapshot(path, normalize_catalog(sample_items), sample_tracks, "cat-v1", 100.0, "tracks-v1", 200.0)
+    return path
+
+######################################################
+#
+#    Format
+#
+######################################################
+
+def test_round_trip(snapshot_file, sample_items, sample_tracks):
+    """Test that records and tracks load back unchanged."""
+    snapshot = load_snapshot(snapshot_file)
+
+    assert snapshot.records == normalize_catalog(sample_items)
+    assert snapshot.tracks == sample_tracks
+    assert (snapshot.catalog_version, snapshot.catalog_fetched_at) == ("cat-v1", 100.0)
+    assert (snapshot.tracks_version, snapshot.tracks_fetched_at) == ("tracks-v1", 200.0)
+    assert snapshot.load_seconds > 0
+
+def test_missing_durations_are_written_as_zero(tmp_path):
+    """Test that tracks with a null or malformed duration are snapshotted with duration 0."""
+    path = str(tmp_path / "snapshot.bin")
+    tracks = [
+        {"id": "1", "name": "Song A", "artist_name": "Artist A", "duration": None},
+        {"id": "2", "name": "Song B", "artist_name": "Artist B", "duration": "n/a"},
+    ]
+    write_snapshot(path, [], tracks, "cat-v1", 100.0, "tracks-v1", 200.0)
+
+    assert [track["duration"] for track in load_snapshot(path).tracks] == [0, 0]
+
+def test_rejects_other_files(tmp_path):
+    """Test that files that are not snapshots are refused."""
+    path = tmp_path / "snapshot.bin"
+    path.write_bytes(b"{\"results\": []}" * 10)
+
+    with pytest.raises(ValueError):
+        load_snapshot(str(path))
+
+def test_rejects_truncated_file(snapshot_file):
+    """Test that a partially written snapshot is refused."""
+    with open(snapshot_file, "rb") as f:
+        data = f.read()
+    with open(snapshot_file, "wb") as f:
+        f.write(data[:-4])
+
+    with pytest.raises(ValueError):
+        load_snapshot(snapshot_file)
+
+######################################################
+#
+#    Fallback
+#
+######################################################
+
+def test_build_snapshot(mocker, sample_items, sample_tracks):
+    """Test that the build step writes the current catalog and tracks."""
+    store_catalog(sample_items)
+    mocker.patch("requests.Session.get").return_value.json.return_value = {"results": sample_tracks}
+
+    build_snapshot()
+    snapshot = snapshot_model.get_snapshot()
+
+    assert [record.name for record in snapshot.records] == [record.name for record in normalize_catalog(sample_items)]
+    assert snapshot.tracks == sample_tracks
+    assert snapshot_status()["records"] == 4
+
+def test_serves_snapshot_when_unreachable(mocker, monkeypatch, snapshot_file):
+    """Test that recommendations fall back to the snapshot when nothing has been downloaded."""
+    monkeypatch.setattr(snapshot_model, "SNAPSHOT_PATH", snapshot_file)
+    mocker.patch("requests.Session.get", side_effect=requests.exceptions.ConnectionError("down"))
+    model = RecommendationsModel("user")
+
+    assert [exercise.name for exercise in model.get_exercises_by_many_muscle_groups(["arm"])] == ["Preacher Curl ü"]
+    assert model.fetch_songs_based_on_workouts(4) == ["Song B by Artist B"]
+    assert get_catalog_index().version == "cat-v1"
+
+def test_offline_only_skips_upstreams(mocker, monkeypatch, snapshot_file):
+    """Test that offline mode serves the snapshot without contacting the upstreams."""
+    monkeypatch.setattr(snapshot_model, "SNAPSHOT_PATH", snapshot_file)
+    monkeypatch.setattr(snapshot_model, "OFFLINE_ONLY", True)
+    mock_get = mocker.patch("requests.Session.get")
+    model = RecommendationsModel("user")
+
+    assert sorted(exercise.name for exercise in model.get_exercises_by_many_muscle_groups(["leg"])) == ["Barbell Squat", "Running"]
+    assert model.fetch_random_song() in ("Song A by Artist A", "Song B by Artist B")
+    mock_get.assert_not_called()
+    assert snapshot_status()["load_ms"] >= 0
+
+def test_offline_only_without_snapshot_fails(mocker, monkeypatch, tmp_path):
+    """Test that offline mode without a snapshot raises instead of calling the upstreams."""
+    monkeypatch.setattr(snapshot_model, "SNAPSHOT_PATH", str(tmp_path / "missing.bin"))
+    monkeypatch.setattr(snapshot_model, "OFFLINE_ONLY", True)
+    mock_get = mocker.patch("requests.Session.get")
+
+    with pytest.raises(requests.ConnectionError):
+        get_catalog_index()
+    assert RecommendationsModel("user").fetch_random_song().startswith("An error occurred")
+    mock_get.assert_not_called()
+
+def test_rules_change_leaves_published_index(monkeypatch, tmp_path, snapshot_file):
+    """Test that rematching the snapshot for new rules builds new records instead of changing the served ones."""
+    monkeypatch.setattr(snapshot_model, "SNAPSHOT_PATH", snapshot_file)
+    old = snapshot_model.get_snapshot_index()
+    masks = [record.group_mask for record in old.records]
+
+    rules_path = tmp_path / "rules.json"
+    rules_path.write_text(json.dumps({"leg": ["curl"]}))
+    with monkeypatch.context() as patch:
+        patch.setattr(keyword_matcher, "MUSCLE_GROUP_RULES_PATH", str(rules_path))
+        keyword_matcher.reload_rules()
+        new = snapshot_model.get_snapshot_index()
+    keyword_matcher.reload_rules()
+
+    assert new is not old
+    assert [record.group_mask for record in old.records] == masks
+    assert [new.records[entry_id].name for entry_id in new.by_group["leg"]] == ["Preacher Curl ü"]
@@ -0,0 +1,79 @@
+import random
+import threading
+
+import pytest
+
+from workout.utils.song_pool import SongPool
+
+######################################################
+#
+#    Taking songs
+#
+######################################################
+
+def test_take_fills_empty_pool():
+    """Test that the first take fills the pool on the caller's thread and returns a song from the source."""
+    songs = ["a", "b", "c"]
+    pool = SongPool(lambda: songs, capacity=10, low_water=2, rng=random.Random(0))
+
+    assert pool.take() in songs
+    assert len(pool) == 9
+    assert pool.stats()["empty"] == 1
+    assert pool.stats()["served"] == 1
+
+def test_take_is_repeatable_with_seed():
+    """Test that pools seeded alike serve the same songs."""
+    songs = [str(number) for number in range(100)]
+    first = SongPool(lambda: songs, capacity=20, low_water=0, rng=random.Random(7))
+    second = SongPool(lambda: songs, capacity=20, low_water=0, rng=random.Random(3))
+    second.seed(7)
+
+    assert [first.take() for _ in range(10)] == [second.take() for _ in range(10)]
+
+def test_refills_in_background_below_low_water():
+    """Test that dropping below the low-water mark refills the pool off the caller's thread."""
+    calls = []
+    release = threading.Event()
+
+    def source():
+        calls.append(threading.current_thread().name)
+        if len(calls) > 1:
+            release.wait(5)
+        return ["a", "b"]
+
+    pool = SongPool(source, capacity=4, low_water=3, rng=random.Random(0))
+    pool.take()
+    pool.take()
+
+    assert calls == ["MainThread", "song-pool-refill"]
+    assert len(pool) == 2
+    release.set()
+    pool.wait(5)
+    assert len(pool) == 4
+    assert pool.stats()["refills"] == 2
+
+def test_empty_source_and_errors():
+    """Test that an empty source gives None and a failing source raises only on the caller's thread."""
+    assert SongPool(lambda: []).take() is None
+
+    def failing():
+        raise RuntimeError("down")
+
+    with pytest.raises(RuntimeError):
+        SongPool(failing).take()
+
+def test_clear_discards_running_refill():
+    """Test that a refill started before clear does not fill the pool."""
+    release = threading.Event()
+
+    def source():
+        release.wait(5)
+        return ["a"]
+
+    pool = SongPool(source, capacity=3, low_water=1, rng=random.Random(0))
+    pool.refill_async()
+    pool.clear()
+    release.set()
+    pool.wait(5)
+
+    assert len(pool) == 0
@@ -0,0 +1,136 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+from urllib.parse import parse_qs, urlparse
+
+import pytest
+import requests
+
+from workout.models import track_model
+from workout.utils.track_crawler import TrackCrawler
+
+######################################################
+#
+#    Stub server
+#
+######################################################
+
+class StubTracks:
+    """Serves a Jamendo-style track listing with duration filters and records requested offsets."""
+
+    def __init__(self, total: int):
+        self.tracks = [{"id": str(i), "name": f"Song {i}", "artist_name": "Artist", "duration": 60 * (i % 10)}
+                       for i in range(total)]
+        self.requested = []
+        self.error = None
+        self.lock = threading.Lock()
+
+    def page(self, limit: int, offset: int, durationbetween: str) -> dict:
+        if self.error:
+            return {"headers": {"status": "failed", "code": 5, "error_message": self.error}, "results": []}
+        low, high = (int(bound) for bound in durationbetween.split("_")) if durationbetween else (0, 10 ** 9)
+        matching = [track for track in self.tracks if low <= track["duration"] <= high]
+        results = matching[offset:offset + limit]
+        return {"headers": {"status": "success", "code": 0, "results_count": len(results)}, "results": results}
+
+@pytest.fixture
+def stub_jamendo():
+    """Run a stub Jamendo track listing on a local port for the duration of a test."""
+    listing = StubTracks(total=95)
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            limit = int(query.get("limit", ["10"])[0])
+            offset = int(query.get("offset", ["0"])[0])
+            with listing.lock:
+                listing.requested.append(offset)
+            body = json.dumps(listing.page(limit, offset, query.get("durationbetween", [""])[0])).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    base_url = f"http://127.0.0.1:{server.server_address[1]}/v3.0/tracks/"
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield base_url, listing
+    server.shutdown()
+    server.server_close()
+
+######################################################
+#
+#    Crawling
+#
+######################################################
+
+def test_crawl_stops_at_end_of_listing(stub_jamendo):
+    """Test that pages are fetched until a wave holds a short page, with tracks in listing order."""
+    base_url, listing = stub_jamendo
+    crawler = TrackCrawler(base_url, page_size=20, max_workers=3)
+
+    tracks = crawler.crawl_tracks(1000)
+
+    assert [track["id"] for track in tracks] == [str(i) for i in range(95)]
+    # The first page alone, then waves of three; the wave holding the short page at 80 is the last
+    assert sorted(listing.requested) == [0, 20, 40, 60, 80, 100, 120]
+
+def test_crawl_stops_once_enough_tracks(stub_jamendo):
+    """Test that the crawl only requests the pages needed for the wanted tracks."""
+    base_url, listing = stub_jamendo
+    crawler = TrackCrawler(base_url, page_size=10, max_workers=4)
+
+    tracks = crawler.crawl_tracks(25)
+
+    assert len(tracks) == 30
+    assert sorted(listing.requested) == [0, 10, 20]
+
+def test_crawl_filters_durations_upstream(stub_jamendo):
+    """Test that duration bounds are sent to Jamendo so every track returned fits them."""
+    base_url, listing = stub_jamendo
+    crawler = TrackCrawler(base_url, page_size=10, min_duration=420, max_pages=2)
+
+    tracks = crawler.crawl_tracks(100)
+
+    assert len(tracks) == 20
+    assert all(track["duration"] >= 420 for track in tracks)
+    assert sorted(listing.requested) == [0, 10]
+
+def test_crawl_raises_jamendo_errors(stub_jamendo):
+    """Test that errors Jamendo reports with a 200 status fail the crawl."""
+    base_url, listing = stub_jamendo
+    listing.error = "Your credential is not authorized."
+
+    with pytest.raises(requests.RequestException):
+        TrackCrawler(base_url, retries=0).crawl_tracks(10)
+
+######################################################
+#
+#    Merging into the track list
+#
+######################################################
+
+def test_get_tracks_for_duration_merges_crawl(stub_jamendo, monkeypatch):
+    """Test that too few long tracks trigger one crawl whose tracks are merged into the cached list."""
+    base_url, listing = stub_jamendo
+    monkeypatch.setattr(track_model, "JAMENDO_BASE_URL", base_url)
+    monkeypatch.setattr(track_model, "TRACKS_PAGE_SIZE", 10)
+    monkeypatch.setattr(track_model, "TRACKS_CRAWL_LIMIT", 20)
+
+    before = track_model.get_track_index()
+    assert (len(before), before.count(480)) == (20, 4)
+
+    index = track_model.get_tracks_for_duration(480, wanted=5)
+    requests_made = len(listing.requested)
+    again = track_model.get_tracks_for_duration(480, wanted=5)
+
+    assert index.count(480) == 10
+    assert len(index) == 26
+    assert again is index
+    assert len(listing.requested) == requests_made
+    assert track_model.get_tracks().fetched_at == track_model.get_tracks(ttl=float("inf")).fetched_at
@@ -0,0 +1,41 @@
+from workout.utils.track_index import TrackIndex, song_label
+
+######################################################
+#
+#    Fixtures
+#
+######################################################
+
+TRACKS = [
+    {"id": "1", "name": "Song A", "artist_name": "Artist A", "duration": 300},
+    {"id": "2", "name": "Song B", "artist_name": "Artist B", "duration": 150},
+    {"id": "3", "name": "Song C", "artist_name": "Artist C", "duration": 500},
+    {"id": "4", "name": "Song D", "artist_name": "Artist D", "duration": 300},
+    {"id": "5", "name": "Song E"},
+]
+
+######################################################
+#
+#    Duration index
+#
+######################################################
+
+def test_tracks_sorted_by_duration():
+    """Test that tracks are sorted by duration, ties in upstream order, missing durations first."""
+    index = TrackIndex(TRACKS, "v1")
+
+    assert [track["id"] for track in index.tracks] == ["5", "2", "1", "4", "3"]
+    assert index.durations == [0, 150, 300, 300, 500]
+    assert index.labels[0] == "Song E by Unknown"
+    assert song_label({}) == "Unknown by Unknown"
+
+def test_labels_between():
+    """Test that duration bounds are inclusive and results are served one page at a time."""
+    index = TrackIndex(TRACKS, "v1")
+
+    assert index.labels_between(300) == ["Song A by Artist A", "Song D by Artist D", "Song C by Artist C"]
+    assert index.labels_between(200, 300) == ["Song A by Artist A", "Song D by Artist D"]
+    assert index.labels_between(300, limit=2, offset=1) == ["Song D by Artist D", "Song C by Artist C"]
+    assert index.labels_between(300, limit=2, offset=5) == []
+    assert index.labels_between(600) == []
+    assert (index.count(300), index.count(301, 499), index.count()) == (3, 0, 5)
@@ -0,0 +1,333 @@
+from dataclasses import dataclass
+import json
+import logging
+import os
+import sqlite3
+import time
+
+import requests
+
+from workout.models import snapshot_model
+from workout.utils.catalog_crawler import CatalogCrawler, CatalogSnapshot, catalog_version
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.http_cache import HttpCache
+from workout.utils.keyword_matcher import get_matcher
+from workout.utils.single_flight import SingleFlight, SingleFlightTimeout
+from workout.utils.sql_utils import get_db_connection
+from workout.utils.logger import configure_logger
+
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+WGER_BASE_URL = "https://wger.de/api/v2/exercisebaseinfo/"
+
+# How long a downloaded catalog is served before it is fetched again
+CATALOG_TTL_SECONDS = float(os.getenv("CATALOG_TTL_SECONDS", 24 * 60 * 60))
+
+# Crawl tuning: items per page, pages fetched at once, retries per page with their
+# initial backoff, and where an interrupted crawl is checkpointed and for how long it may be resumed
+CATALOG_PAGE_SIZE = int(os.getenv("CATALOG_PAGE_SIZE", 100))
+CATALOG_CRAWL_WORKERS = int(os.getenv("CATALOG_CRAWL_WORKERS", 4))
+CATALOG_CRAWL_RETRIES = int(os.getenv("CATALOG_CRAWL_RETRIES", 3))
+CATALOG_CRAWL_BACKOFF = float(os.getenv("CATALOG_CRAWL_BACKOFF", 0.5))
+CATALOG_CHECKPOINT_PATH = os.getenv("CATALOG_CHECKPOINT_PATH", "db/catalog_crawl.json")
+CATALOG_CHECKPOINT_MAX_AGE = float(os.getenv("CATALOG_CHECKPOINT_MAX_AGE", 6 * 60 * 60))
+
+# How long a request holding an expired catalog waits on another request's refresh
+# before it is served the expired catalog instead
+CATALOG_REFRESH_WAIT = float(os.getenv("CATALOG_REFRESH_WAIT", 5))
+
+CATALOG_NAME = "wger"
+
+@dataclass
+class Catalog:
+    items: List[dict]
+    version: str
+    fetched_at: float
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+_current: Optional[Catalog] = None
+_index: Optional[CatalogIndex] = None
+_refreshes = SingleFlight()
+
+######################################################
+#
+#    Storage
+#
+######################################################
+
+def ensure_catalog_tables() -> None:
+    """
+    Creates the catalog tables if they do not exist yet.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS exercise_catalog (
+                    position INTEGER PRIMARY KEY,
+                    base_id INTEGER,
+                    data TEXT NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS catalog_meta (
+                    name TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    fetched_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def store_catalog(items: List[dict], fetched_at: Optional[float] = None, version: Optional[str] = None) -> Catalog:
+    """
+    Replaces the stored catalog with the given items.
+
+    Args:
+        items (List[dict]): The exercisebaseinfo items, in upstream order.
+        fetched_at (float): Unix time the items were downloaded. Defaults to now.
+        version (str): Content version of the items. Computed when not given.
+
+    Returns:
+        Catalog: The stored catalog.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    catalog = Catalog(items=items, version=version or catalog_version(items), fetched_at=fetched_at or time.time())
+    ensure_catalog_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM exercise_catalog")
+            cursor.executemany(
+                "INSERT INTO exercise_catalog (position, base_id, data) VALUES (?, ?, ?)",
+                [(position, item.get("id"), json.dumps(item)) for position, item in enumerate(items)]
+            )
+            cursor.execute(
+                "INSERT OR REPLACE INTO catalog_meta (name, version, fetched_at) VALUES (?, ?, ?)",
+                (CATALOG_NAME, catalog.version, catalog.fetched_at)
+            )
+            conn.commit()
+        logger.info("Stored catalog version %s with %d items", catalog.version, len(items))
+        return catalog
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def load_catalog() -> Optional[Catalog]:
+    """
+    Loads the stored catalog.
+
+    Returns:
+        Catalog: The stored catalog, or None if nothing has been stored yet.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    ensure_catalog_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT version, fetched_at FROM catalog_meta WHERE name = ?", (CATALOG_NAME,))
+            meta = cursor.fetchone()
+            if not meta:
+                return None
+            cursor.execute("SELECT data FROM exercise_catalog ORDER BY position")
+            rows = cursor.fetchall()
+        return Catalog(items=[json.loads(row[0]) for row in rows], version=meta[0], fetched_at=meta[1])
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+######################################################
+#
+#    Fetching
+#
+######################################################
+
+def fetch_wger_catalog() -> CatalogSnapshot:
+    """
+    Downloads every page of the exercisebaseinfo catalog from wger.
+
+    Returns:
+        CatalogSnapshot: The complete, versioned catalog.
+
+    Raises:
+        requests.RequestException: If there is an error with the API request.
+    """
+    api_key = os.getenv("wger_API_KEY")
+    params = {
+        "language": 2,  # default Language: English
+        "api_key": api_key
+    }
+    crawler = CatalogCrawler(
+        WGER_BASE_URL,
+        params=params,
+        headers={"Authorization": f"Token {api_key}"},
+        page_size=CATALOG_PAGE_SIZE,
+        max_workers=CATALOG_CRAWL_WORKERS,
+        retries=CATALOG_CRAWL_RETRIES,
+        backoff=CATALOG_CRAWL_BACKOFF,
+        checkpoint_path=CATALOG_CHECKPOINT_PATH,
+        checkpoint_max_age=CATALOG_CHECKPOINT_MAX_AGE,
+    )
+    return crawler.crawl()
+
+def refresh_catalog() -> Catalog:
+    """
+    Downloads the catalog from wger and stores it.
+
+    Returns:
+        Catalog: The freshly stored catalog.
+
+    Raises:
+        requests.RequestException: If there is an error with the API request.
+        sqlite3.Error: For any database-related errors.
+    """
+    global _current, _index
+    snapshot = fetch_wger_catalog()
+    catalog = store_catalog(snapshot.items, fetched_at=snapshot.fetched_at, version=snapshot.version)
+    # Build the indexes before publishing so readers switch to the new version in one step
+    _index = CatalogIndex(catalog.items, catalog.version)
+    _current = catalog
+    return catalog
+
+def _refresh_key() -> str:
+    return HttpCache.key(WGER_BASE_URL, {"language": 2})
+
+def revalidate_catalog() -> Catalog:
+    """
+    Downloads the catalog now, joining a refresh already in progress.
+
+    Used by the background refresher, so unlike get_catalog it raises instead of
+    falling back to a stale copy.
+
+    Returns:
+        Catalog: The freshly stored catalog.
+
+    Raises:
+        requests.RequestException: If there is an error with the API request.
+        sqlite3.Error: For any database-related errors.
+    """
+    return _refreshes.do(_refresh_key(), refresh_catalog)
+
+def _load_or_refresh(ttl: float) -> Catalog:
+    global _current
+    catalog = _current
+    if catalog is not None and catalog.is_fresh(ttl):
+        return catalog
+
+    stored = load_catalog()
+    if stored is not None and (catalog is None or stored.fetched_at > catalog.fetched_at):
+        catalog = _current = stored
+    if catalog is not None and catalog.is_fresh(ttl):
+        return catalog
+
+    try:
+        return refresh_catalog()
+    except requests.RequestException as e:
+        if catalog is None:
+            raise
+        logger.warning("Serving stale catalog version %s: %s", catalog.version, str(e))
+        return catalog
+
+def get_catalog(ttl: Optional[float] = None) -> Catalog:
+    """
+    Returns the exercise catalog, refreshing it from wger once it is older than the TTL.
+
+    The in-process copy is used while fresh, then the stored copy (which another
+    worker may have refreshed), and only then wger. Concurrent callers share one
+    refresh; those already holding an expired catalog wait at most CATALOG_REFRESH_WAIT
+    for it before being served the expired one. If wger cannot be reached a stale
+    catalog is served rather than failing.
+
+    Args:
+        ttl (float): Maximum catalog age in seconds. Defaults to CATALOG_TTL_SECONDS.
+
+    Returns:
+        Catalog: The current catalog.
+
+    Raises:
+        requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+    """
+    ttl = CATALOG_TTL_SECONDS if ttl is None else ttl
+
+    catalog = _current
+    if catalog is not None and catalog.is_fresh(ttl):
+        return catalog
+
+    try:
+        return _refreshes.do(_refresh_key(), lambda: _load_or_refresh(ttl), timeout=CATALOG_REFRESH_WAIT if catalog is not None else None)
+    except SingleFlightTimeout:
+        logger.warning("Serving stale catalog version %s while it is refreshed", catalog.version)
+        return catalog
+
+def get_catalog_items(ttl: Optional[float] = None) -> List[dict]:
+    """
+    Returns the exercisebaseinfo items of the current catalog.
+
+    Args:
+        ttl (float): Maximum catalog age in seconds. Defaults to CATALOG_TTL_SECONDS.
+
+    Returns:
+        List[dict]: The exercisebaseinfo items.
+
+    Raises:
+        requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+    """
+    return get_catalog(ttl).items
+
+def get_catalog_index(ttl: Optional[float] = None) -> CatalogIndex:
+    """
+    Returns the inverted indexes for the current catalog, building them once per catalog
+    version and again whenever the muscle group rules file changes.
+
+    The bundled snapshot is served instead when running offline, or when wger cannot
+    be reached and there is no downloaded catalog to fall back to. Running offline
+    without a snapshot raises rather than calling wger.
+
+    Args:
+        ttl (float): Maximum catalog age in seconds. Defaults to CATALOG_TTL_SECONDS.
+
+    Returns:
+        CatalogIndex: Indexes over the current catalog.
+
+    Raises:
+        requests.RequestException: If the catalog must be downloaded and wger cannot be reached,
+            or when running offline without a snapshot.
+    """
+    global _index
+    if snapshot_model.OFFLINE_ONLY:
+        index = snapshot_model.get_snapshot_index()
+        if index is None:
+            raise snapshot_model.missing_snapshot_error()
+        return index
+    try:
+        catalog = get_catalog(ttl)
+    except requests.RequestException as e:
+        index = snapshot_model.get_snapshot_index()
+        if index is None:
+            raise
+        logger.warning("Serving snapshot catalog version %s: %s", index.version, str(e))
+        return index
+    matcher = get_matcher()
+    index = _index
+    if index is None or index.version != catalog.version or index.rules_version != matcher.version:
+        index = _index = CatalogIndex(catalog.items, catalog.version, matcher)
+    return index
+
+def clear_catalog_cache() -> None:
+    """
+    Forgets the in-process catalog and its indexes so the next read goes to storage.
+    """
+    global _current, _index
+    _current = None
+    _index = None
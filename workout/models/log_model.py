@@ -1,17 +1,30 @@
 from dataclasses import dataclass
+from collections import Counter
 import logging
 import os
 import sqlite3
+import threading
 
 from workout.utils.sql_utils import get_db_connection
 from workout.utils.logger import configure_logger
 
-from typing import List
-from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from datetime import date as Date, datetime
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
+# Days of each user's logs kept in memory for history-aware recommendations
+RECENT_LOG_DAYS = int(os.getenv("RECENT_LOG_DAYS", 30))
+
+# username -> date ordinal -> lowered exercise name, loaded on first use and kept up to date by every log write
+_recent: Dict[str, Dict[int, str]] = {}
+_recent_lock = threading.Lock()
+# username -> log changes made while that user's recent logs were being read, replayed
+# onto the read before it is installed; (None, None) forgets every log, (ordinal, None) one
+_pending: Dict[str, List[Tuple[Optional[int], Optional[str]]]] = {}
+_loaders: Counter = Counter()
+
 @dataclass
 class Log:
     id: int
@@ -70,6 +83,7 @@ def create_log(username: str, exercise_name: str, muscle_groups: str, date: str)
                 (username, exercise_name, muscle_groups, date)
             )
             conn.commit()
+        _remember_log(username, date_obj, exercise_name)
         return True
     except sqlite3.Error as e:
         raise sqlite3.Error(f"Database error: {str(e)}")
@@ -100,6 +114,7 @@ def clear_logs(username: str) -> bool:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM logs WHERE username = ?", (username,))
             conn.commit()
+            _forget_logs(username)
 
             if cursor.rowcount == 0:
                 raise ValueError(f"No logs found for username={username}")
@@ -132,6 +147,7 @@ def delete_log_by_date(username: str, date: str) -> bool:
             cursor = conn.cursor()
             cursor.execute("DELETE FROM logs WHERE username = ? AND date = ?", (username, date))
             conn.commit()
+            _forget_logs(username, date_obj)
 
             if cursor.rowcount == 0:
                 raise ValueError(f"No logs found for username={username} and date={date}")
@@ -279,9 +295,112 @@ def update_log(username: str, date: str, exercise_name: str, muscle_groups: str)
                 (exercise_name, muscle_groups, username, date)
             )
             conn.commit()
+            if cursor.rowcount:
+                _remember_log(username, date_obj, exercise_name)
 
             if cursor.rowcount == 0:
                 raise ValueError(f"No log found for username={username} and date={date}")
         return True
     except sqlite3.Error as e:
-        raise sqlite3.Error(f"Database error: {str(e)}")
\ No newline at end of file
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+######################################################
+#
+#    Recent Exercises
+#
+######################################################
+
+def _apply_change(recent: Dict[int, str], ordinal: Optional[int], exercise_name: Optional[str]) -> None:
+    if ordinal is None:
+        recent.clear()
+    elif exercise_name is None:
+        recent.pop(ordinal, None)
+    else:
+        recent[ordinal] = exercise_name
+
+def _record_change(username: str, ordinal: Optional[int], exercise_name: Optional[str]) -> None:
+    with _recent_lock:
+        recent = _recent.get(username)
+        if recent is not None:
+            if ordinal is None:
+                # Read again on next use
+                del _recent[username]
+            else:
+                _apply_change(recent, ordinal, exercise_name)
+        # Reads still running may install after this change, so they replay it too
+        if username in _pending:
+            _pending[username].append((ordinal, exercise_name))
+
+def _remember_log(username: str, date_obj: Date, exercise_name: str) -> None:
+    _record_change(username, date_obj.toordinal(), exercise_name.lower())
+
+def _forget_logs(username: str, date_obj: Optional[Date] = None) -> None:
+    _record_change(username, None if date_obj is None else date_obj.toordinal(), None)
+
+def _load_recent(username: str) -> Dict[int, str]:
+    cutoff = Date.fromordinal(Date.today().toordinal() - RECENT_LOG_DAYS).strftime("%Y-%m-%d")
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT exercise_name, date FROM logs WHERE username = ? AND date >= ?", (username, cutoff))
+            rows = cursor.fetchall()
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+    return {datetime.strptime(row[1], "%Y-%m-%d").date().toordinal(): row[0].lower() for row in rows}
+
+def get_recent_exercises(username: str, days: int) -> Dict[str, int]:
+    """
+    Returns the exercises a user logged in the last days, without querying every log.
+
+    Each user's last RECENT_LOG_DAYS of logs are read once and then kept up to date
+    as logs are created, updated and deleted. Changes made while the logs are being
+    read are replayed onto the read before it is kept, so none is lost.
+
+    Args:
+        username (str): The username of the user.
+        days (int): How many days back to look, today being 0. Capped at RECENT_LOG_DAYS.
+
+    Returns:
+        Dict[str, int]: Lowered exercise name -> days since it was last logged.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    today = Date.today().toordinal()
+    with _recent_lock:
+        recent = _recent.get(username)
+        if recent is None:
+            _loaders[username] += 1
+            _pending.setdefault(username, [])
+    if recent is None:
+        try:
+            loaded = _load_recent(username)
+            with _recent_lock:
+                recent = _recent.get(username)
+                if recent is None:
+                    for ordinal, exercise_name in _pending.get(username, ()):
+                        _apply_change(loaded, ordinal, exercise_name)
+                    recent = _recent[username] = loaded
+        finally:
+            with _recent_lock:
+                _loaders[username] -= 1
+                if not _loaders[username]:
+                    del _loaders[username]
+                    _pending.pop(username, None)
+
+    exercises: Dict[str, int] = {}
+    with _recent_lock:
+        for ordinal in [ordinal for ordinal in recent if today - ordinal > RECENT_LOG_DAYS]:
+            del recent[ordinal]
+        for ordinal, exercise_name in recent.items():
+            days_ago = today - ordinal
+            if 0 <= days_ago <= days and days_ago < exercises.get(exercise_name, days + 1):
+                exercises[exercise_name] = days_ago
+    return exercises
+
+def clear_recent_logs() -> None:
+    """
+    Forgets every user's recent logs so they are read from the database again.
+    """
+    with _recent_lock:
+        _recent.clear()
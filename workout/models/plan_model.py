@@ -0,0 +1,438 @@
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import asdict, dataclass, field
+from datetime import date as Date, timedelta
+import json
+import logging
+import multiprocessing
+import os
+import sqlite3
+import sys
+import time
+
+from workout.models.catalog_model import get_catalog_index
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.logger import configure_logger
+from workout.utils.plan_builder import build_week
+from workout.utils.snapshot import load_snapshot, write_snapshot
+from workout.utils.sql_utils import get_db_connection
+from workout.utils.vocabulary import EQUIPMENT
+
+from typing import Callable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Shape of the precomputed week: sessions per week and the minutes of each session
+WEEKLY_SESSIONS = int(os.getenv("WEEKLY_SESSIONS", 3))
+SESSION_MINUTES = int(os.getenv("SESSION_MINUTES", 45))
+
+# Batch tuning: worker processes (1 plans in-process), users handed to a worker at a time,
+# and where the read-only catalog snapshot shared by the workers is written
+PLAN_BATCH_WORKERS = int(os.getenv("PLAN_BATCH_WORKERS", os.cpu_count() or 1))
+PLAN_BATCH_CHUNK_SIZE = int(os.getenv("PLAN_BATCH_CHUNK_SIZE", 64))
+PLAN_SNAPSHOT_PATH = os.getenv("PLAN_SNAPSHOT_PATH", "db/plan_catalog.bin")
+
+@dataclass
+class Profile:
+    username: str
+    target_groups: List[str] = field(default_factory=list)
+    equipment: List[str] = field(default_factory=list)
+
+@dataclass
+class WeeklyPlan:
+    username: str
+    week_start: str
+    catalog_version: str
+    sessions: List[dict]
+    created_at: float
+
+@dataclass
+class PlanBatch:
+    week_start: str
+    catalog_version: str
+    users: int
+    planned: int
+    failed: int
+    workers: int
+    seconds: float
+    users_per_second: float
+    finished_at: float
+
+    @property
+    def version(self) -> str:
+        return f"{self.week_start}:{self.catalog_version}"
+
+    @property
+    def fetched_at(self) -> float:
+        return self.finished_at
+
+def week_start(day: Optional[Date] = None) -> Date:
+    """Monday of the week holding the day. Defaults to today."""
+    day = day or Date.today()
+    return day - timedelta(days=day.weekday())
+
+def next_week_start(day: Optional[Date] = None) -> Date:
+    """Monday of the week after the day. Defaults to today."""
+    return week_start(day) + timedelta(days=7)
+
+######################################################
+#
+#    Storage
+#
+######################################################
+
+def ensure_plan_tables() -> None:
+    """
+    Creates the profile and plan tables if they do not exist yet.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS profiles (
+                    username TEXT PRIMARY KEY,
+                    target_groups TEXT NOT NULL,
+                    equipment TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS weekly_plans (
+                    username TEXT NOT NULL,
+                    week_start TEXT NOT NULL,
+                    catalog_version TEXT NOT NULL,
+                    sessions TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (username, week_start)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE IF NOT EXISTS plan_batches (
+                    week_start TEXT PRIMARY KEY,
+                    catalog_version TEXT NOT NULL,
+                    users INTEGER NOT NULL,
+                    planned INTEGER NOT NULL,
+                    failed INTEGER NOT NULL,
+                    workers INTEGER NOT NULL,
+                    seconds REAL NOT NULL,
+                    finished_at REAL NOT NULL
+                )
+            """)
+            conn.commit()
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def save_profile(username: str, target_groups: List[str], equipment: List[str]) -> None:
+    """
+    Stores a user's target groups and equipment for the plan batch.
+
+    Args:
+        username (str): The username of the user.
+        target_groups (List[str]): The user's target groups.
+        equipment (List[str]): The user's equipment.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    ensure_plan_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO profiles (username, target_groups, equipment, updated_at) VALUES (?, ?, ?, ?)",
+                (username, json.dumps(target_groups), json.dumps(equipment), time.time())
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def load_profiles() -> List[Profile]:
+    """
+    Loads every stored profile.
+
+    Returns:
+        List[Profile]: The profiles in username order.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    ensure_plan_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT username, target_groups, equipment FROM profiles ORDER BY username")
+            rows = cursor.fetchall()
+        return [Profile(username, json.loads(groups), json.loads(equipment)) for username, groups, equipment in rows]
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def clear_profiles() -> None:
+    """
+    Deletes every stored profile and plan.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    ensure_plan_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("DELETE FROM profiles")
+            cursor.execute("DELETE FROM weekly_plans")
+            conn.commit()
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def store_weekly_plans(plans: List[WeeklyPlan]) -> None:
+    """
+    Stores weekly plans, replacing plans of the same users and weeks.
+
+    Args:
+        plans (List[WeeklyPlan]): The plans to store.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    ensure_plan_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.executemany(
+                "INSERT OR REPLACE INTO weekly_plans (username, week_start, catalog_version, sessions, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                [(plan.username, plan.week_start, plan.catalog_version, json.dumps(plan.sessions), plan.created_at)
+                 for plan in plans]
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def get_weekly_plan(username: str, week: Optional[str] = None) -> Optional[WeeklyPlan]:
+    """
+    Loads a user's stored plan for a week.
+
+    Args:
+        username (str): The username of the user.
+        week (str): Monday of the week, YYYY-MM-DD. Defaults to the current week.
+
+    Returns:
+        WeeklyPlan: The stored plan, or None if none was computed.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    week = week or week_start().isoformat()
+    ensure_plan_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT catalog_version, sessions, created_at FROM weekly_plans WHERE username = ? AND week_start = ?",
+                (username, week)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        return WeeklyPlan(username, week, row[0], json.loads(row[1]), row[2])
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def store_plan_batch(batch: PlanBatch) -> None:
+    """
+    Records the report of a finished plan batch.
+
+    Args:
+        batch (PlanBatch): The report.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    ensure_plan_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "INSERT OR REPLACE INTO plan_batches (week_start, catalog_version, users, planned, failed, workers, "
+                "seconds, finished_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (batch.week_start, batch.catalog_version, batch.users, batch.planned, batch.failed, batch.workers,
+                 batch.seconds, batch.finished_at)
+            )
+            conn.commit()
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+def get_last_plan_batch() -> Optional[PlanBatch]:
+    """
+    Loads the report of the most recent plan batch.
+
+    Returns:
+        PlanBatch: The report, or None if no batch has finished.
+
+    Raises:
+        sqlite3.Error: For any database-related errors.
+    """
+    ensure_plan_tables()
+    try:
+        with get_db_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT week_start, catalog_version, users, planned, failed, workers, seconds, finished_at "
+                "FROM plan_batches ORDER BY finished_at DESC LIMIT 1"
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        seconds = row[6]
+        return PlanBatch(*row[:7], users_per_second=round(row[3] / seconds, 1) if seconds else 0.0, finished_at=row[7])
+    except sqlite3.Error as e:
+        raise sqlite3.Error(f"Database error: {str(e)}")
+
+######################################################
+#
+#    Planning
+#
+######################################################
+
+def plan_profile(index: CatalogIndex, profile: Profile, week: str, sessions: int = WEEKLY_SESSIONS,
+                 minutes: int = SESSION_MINUTES) -> WeeklyPlan:
+    """
+    Builds a user's plan for a week from their profile.
+
+    Args:
+        index (CatalogIndex): The catalog to pick from.
+        profile (Profile): The user's target groups and equipment.
+        week (str): Monday of the week, YYYY-MM-DD.
+        sessions (int): Sessions in the week.
+        minutes (int): The time budget of each session.
+
+    Returns:
+        WeeklyPlan: The plan, not yet stored.
+
+    Raises:
+        ValueError: If sessions or minutes is out of range.
+    """
+    owned_mask = EQUIPMENT.known_mask(map(str.lower, profile.equipment))
+    plans = build_week(index, profile.target_groups, sessions, minutes, owned_mask)
+    return WeeklyPlan(profile.username, week, index.version, [asdict(plan) for plan in plans], time.time())
+
+# Catalog of a batch worker process, loaded once from the shared snapshot
+_worker_index: Optional[CatalogIndex] = None
+
+def _init_worker(snapshot_path: str) -> None:
+    global _worker_index
+    snapshot = load_snapshot(snapshot_path)
+    _worker_index = CatalogIndex([], snapshot.catalog_version, records=snapshot.records)
+
+def _plan_chunk(profiles: List[Profile], week: str, sessions: int, minutes: int) -> Tuple[List[WeeklyPlan], List[str]]:
+    plans, failed = [], []
+    for profile in profiles:
+        try:
+            plans.append(plan_profile(_worker_index, profile, week, sessions, minutes))
+        except Exception as e:
+            logger.error("Could not plan the week of %s: %s", profile.username, str(e))
+            failed.append(profile.username)
+    return plans, failed
+
+def _chunks(profiles: List[Profile], size: int) -> Iterable[List[Profile]]:
+    for start in range(0, len(profiles), size):
+        yield profiles[start:start + size]
+
+def precompute_weekly_plans(week: Optional[str] = None, workers: Optional[int] = None,
+                            chunk_size: Optional[int] = None, sessions: int = WEEKLY_SESSIONS,
+                            minutes: int = SESSION_MINUTES,
+                            progress: Optional[Callable[[int, int], None]] = None) -> PlanBatch:
+    """
+    Plans a week for every stored profile and stores the plans.
+
+    The current catalog is written once to a binary snapshot that every worker process
+    memory-maps read-only, so workers neither download the catalog nor receive it
+    through pickling. Profiles are handed out in chunks and each finished chunk is
+    stored right away, so memory stays flat and an interrupted batch keeps its work.
+
+    Args:
+        week (str): Monday of the week to plan, YYYY-MM-DD. Defaults to next week.
+        workers (int): Worker processes. Defaults to PLAN_BATCH_WORKERS; 1 plans in-process.
+        chunk_size (int): Profiles per task. Defaults to PLAN_BATCH_CHUNK_SIZE.
+        sessions (int): Sessions in the week.
+        minutes (int): The time budget of each session.
+        progress (Callable[[int, int], None]): Called with (users done, users total) after each chunk.
+
+    Returns:
+        PlanBatch: Counts and throughput of the batch.
+
+    Raises:
+        requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+        sqlite3.Error: For any database-related errors.
+        ValueError: If sessions or minutes is out of range.
+    """
+    if sessions < 1:
+        raise ValueError("sessions must be at least 1.")
+    week = week or next_week_start().isoformat()
+    workers = max(1, PLAN_BATCH_WORKERS if workers is None else workers)
+    chunk_size = max(1, chunk_size or PLAN_BATCH_CHUNK_SIZE)
+
+    start = time.perf_counter()
+    index = get_catalog_index()
+    write_snapshot(PLAN_SNAPSHOT_PATH, index.records, [], index.version, time.time(), "", 0.0)
+    profiles = load_profiles()
+    total = len(profiles)
+    done = planned = failed = 0
+
+    def finish_chunk(chunk_plans: List[WeeklyPlan], chunk_failed: List[str]) -> None:
+        nonlocal done, planned, failed
+        store_weekly_plans(chunk_plans)
+        planned += len(chunk_plans)
+        failed += len(chunk_failed)
+        done += len(chunk_plans) + len(chunk_failed)
+        elapsed = time.perf_counter() - start
+        logger.info("Planned %d/%d users for week %s (%.0f users/s)", done, total, week, done / elapsed if elapsed else 0.0)
+        if progress is not None:
+            progress(done, total)
+
+    chunks = list(_chunks(profiles, chunk_size))
+    workers = min(workers, len(chunks)) or 1
+    if workers == 1:
+        _init_worker(PLAN_SNAPSHOT_PATH)
+        for chunk in chunks:
+            finish_chunk(*_plan_chunk(chunk, week, sessions, minutes))
+    else:
+        # Spawned rather than forked: the web process runs background threads
+        context = multiprocessing.get_context("spawn")
+        with ProcessPoolExecutor(workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(PLAN_SNAPSHOT_PATH,)) as pool:
+            futures = [pool.submit(_plan_chunk, chunk, week, sessions, minutes) for chunk in chunks]
+            for future in as_completed(futures):
+                finish_chunk(*future.result())
+
+    seconds = round(time.perf_counter() - start, 3)
+    batch = PlanBatch(week, index.version, total, planned, failed, workers, seconds,
+                      round(planned / seconds, 1) if seconds else 0.0, time.time())
+    store_plan_batch(batch)
+    logger.info("Planned week %s for %d of %d users with %d workers in %.2fs (%.1f users/s)",
+                week, planned, total, workers, seconds, batch.users_per_second)
+    return batch
+
+def get_plan_batch() -> PlanBatch:
+    """
+    Returns the report of the last plan batch, running a batch if none has finished.
+
+    Lets the nightly batch run as a BackgroundRefresher job.
+
+    Returns:
+        PlanBatch: The report.
+
+    Raises:
+        requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+        sqlite3.Error: For any database-related errors.
+    """
+    return get_last_plan_batch() or precompute_weekly_plans()
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else None
+    batch = precompute_weekly_plans(target, progress=lambda done, total: print(f"{done}/{total} users", end="\r"))
+    print(f"Planned week {batch.week_start} for {batch.planned} of {batch.users} users "
+          f"({batch.failed} failed) with {batch.workers} workers in {batch.seconds:.2f}s "
+          f"({batch.users_per_second:.1f} users/s)")
@@ -1,17 +1,57 @@
 import requests
 import logging
+import math
 import random
-from typing import List
+from collections import Counter, OrderedDict
+from itertools import combinations
+from typing import Iterable, List, Optional, Tuple
 import os
 
+import numpy as np
+
 from dataclasses import dataclass
 from datetime import date
 
+from workout.models.catalog_model import WGER_BASE_URL, get_catalog_index
+from workout.models.log_model import get_recent_exercises
+from workout.models.track_model import JAMENDO_BASE_URL, TRACKS_MIN_CANDIDATES, get_track_index, get_tracks_for_duration, random_song
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.catalog_records import ENGLISH, ExerciseRecord
+from workout.utils.keyword_matcher import get_matcher
 from workout.utils.logger import configure_logger
+from workout.utils.plan_builder import Plan, build_plan
+from workout.utils.playlist_builder import Playlist, build_playlist
+from workout.utils.ranking import coverage_scores, fit_scores, top_k
+from workout.utils.result_cache import ResultCache
+from workout.utils.rotation import SongRotation
+from workout.utils.track_index import TrackIndex
+from workout.utils.vocabulary import EQUIPMENT, MUSCLE_GROUPS
+from workout.utils.workout import normalize_group
 
 logger = logging.getLogger(__name__)
 configure_logger(logger)
 
+# Weights of the ranking signals, each scored between 0 and 1
+COVERAGE_WEIGHT = 0.5
+EQUIPMENT_FIT_WEIGHT = 0.3
+NOVELTY_WEIGHT = 0.2
+
+# Ranked listings per user whose novelty snapshot is kept, so their later pages keep the order of the first
+RANKING_SNAPSHOTS = int(os.getenv("RANKING_SNAPSHOTS", 8))
+
+# History-aware ranking either drops exercises the user logged recently or takes up to
+# HISTORY_WEIGHT off their score, more the more recent the log
+HISTORY_MODES = ("exclude", "downweight")
+HISTORY_WEIGHT = 0.5
+HISTORY_DAYS = int(os.getenv("HISTORY_DAYS", 7))
+
+# Scored matches of recent queries, shared by every user and dropped when the catalog changes
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", 256))
+_results = ResultCache(RESULT_CACHE_SIZE)
+
+# Pooled songs drawn for a random song before falling back to a scan for an unplayed one
+ROTATION_POOL_TRIES = int(os.getenv("ROTATION_POOL_TRIES", 4))
+
 @dataclass
 class Exercise:
     name: str
@@ -23,6 +63,117 @@ class Exercise:
 class Song:
     name: str
 
+def to_exercise(record: ExerciseRecord, today_date: str) -> Exercise:
+    """
+    Builds the Exercise returned to clients from a catalog record.
+
+    Args:
+        record (ExerciseRecord): The catalog record.
+        today_date (str): The request date in the format YYYY-MM-DD.
+
+    Returns:
+        Exercise: The exercise recommendation.
+    """
+    return Exercise(name=record.name, muscle_group=record.muscles, equipment=record.equipment, date=today_date)
+
+def query_masks(groups: Iterable[str], equipment: Iterable[str]) -> Tuple[int, int]:
+    """
+    Encodes target groups and equipment as MUSCLE_GROUPS and EQUIPMENT masks.
+
+    Names are matched case-insensitively and are never interned, so names no rule or
+    catalog entry knows add no bits. Load the catalog first so its equipment is known.
+
+    Args:
+        groups (Iterable[str]): Target groups.
+        equipment (Iterable[str]): Equipment owned.
+
+    Returns:
+        tuple: (group mask, equipment mask).
+    """
+    return MUSCLE_GROUPS.known_mask(map(str.lower, groups)), EQUIPMENT.known_mask(map(str.lower, equipment))
+
+def scored_matches(kind: str, group_mask: int, owned_mask: int,
+                   language: int = ENGLISH) -> Tuple[CatalogIndex, np.ndarray, np.ndarray]:
+    """
+    Returns the catalog entries matching a query with their user-independent scores.
+
+    Results are cached by (kind, group mask, equipment mask, language) for the current
+    catalog and rules version, so users asking the same question share one evaluation.
+
+    Args:
+        kind (str): "groups" selects entries working any of the groups, "equipment"
+            entries needing only the given equipment, "both" entries doing both.
+        group_mask (int): Target groups, scored by coverage. See query_masks.
+        owned_mask (int): Equipment owned, scored by fit. See query_masks.
+        language (int): wger language id of the translations to match.
+
+    Returns:
+        tuple: (index, ids, scores) with read-only arrays of matching entry ids and
+            their weighted coverage and equipment fit.
+
+    Raises:
+        requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+    """
+    index = get_catalog_index() # served from the local catalog store
+
+    def compute() -> Tuple[np.ndarray, np.ndarray]:
+        if kind == "groups":
+            # Groups no rule knows about cannot match anything
+            selected = index.select(language, any_groups=group_mask) if group_mask else np.zeros(len(index.records), dtype=bool)
+        elif kind == "equipment":
+            selected = index.select(language, owned_equipment=owned_mask)
+        elif kind == "both":
+            selected = index.select(language, any_groups=group_mask, owned_equipment=owned_mask) if group_mask else np.zeros(len(index.records), dtype=bool)
+        else:
+            raise ValueError(f"Unknown query kind {kind}")
+        ids = np.flatnonzero(selected)
+        scores = (COVERAGE_WEIGHT * coverage_scores(index.group_masks, ids, group_mask)
+                  + EQUIPMENT_FIT_WEIGHT * fit_scores(index.equipment_masks, ids, owned_mask))
+        ids.flags.writeable = False
+        scores.flags.writeable = False
+        return ids, scores
+
+    version = (index.version, index.rules_version, len(index.records))
+    ids, scores = _results.get_or_compute(version, (kind, group_mask, owned_mask, language), compute)
+    return index, ids, scores
+
+def prewarm_results(language: int = ENGLISH) -> int:
+    """
+    Caches the matches of every combination of the standard target groups for users without equipment.
+
+    Args:
+        language (int): wger language id of the translations to match.
+
+    Returns:
+        int: Number of queries cached.
+
+    Raises:
+        requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+    """
+    groups = sorted(get_matcher().rules)
+    count = 0
+    for size in range(1, len(groups) + 1):
+        for combination in combinations(groups, size):
+            scored_matches("groups", MUSCLE_GROUPS.known_mask(combination), 0, language)
+            count += 1
+    logger.info("Prewarmed %d recommendation queries", count)
+    return count
+
+def result_cache_stats() -> dict:
+    """
+    Reports the recommendation result cache size and counters.
+
+    Returns:
+        dict: See ResultCache.stats.
+    """
+    return _results.stats()
+
+def clear_result_cache() -> None:
+    """
+    Drops every cached recommendation result.
+    """
+    _results.clear()
+
 class RecommendationsModel:
     """
     A class to manage recommending exercises to the user
@@ -36,18 +187,30 @@ class RecommendationsModel:
         username (str): username of the user
         target_groups (List[str]): muscle groups the user wants to focus on
         equipment (List[str]): equipment the user has access to
+        target_group_mask (int): target_groups encoded with the MUSCLE_GROUPS vocabulary
+        equipment_mask (int): equipment encoded with the EQUIPMENT vocabulary
+        recommended_counts (Counter): wger exercise base -> times it was recommended to the user
+        ranking_snapshots (OrderedDict): listing key -> recommended_counts as of the listing's first page
+        rotation (SongRotation): songs served to the user since the rotation last started over
     """
 
     def __init__(self, username):
-        self.wger_base_url: str = "https://wger.de/api/v2/exercisebaseinfo/"
+        self.wger_base_url: str = WGER_BASE_URL
         self.wger_api_key: str = os.getenv("wger_API_KEY")
-        self.jamendo_base_url: str = "https://api.jamendo.com/v3.0/tracks/"
+        self.jamendo_base_url: str = JAMENDO_BASE_URL
         self.jamendo_api_key: str = os.getenv("jamendo_API_KEY")
         
         self.username: str = username
         self.target_groups: List[str] = []
         self.equipment: List[str] = []
         self.target_song: List[str] = []
+        self.target_group_mask: int = 0
+        self.equipment_mask: int = 0
+        # Vocabulary sizes the masks were built at; names interned later are picked up on next use
+        self.mask_sizes: Tuple[int, int] = (0, 0)
+        self.recommended_counts: Counter = Counter()
+        self.ranking_snapshots: OrderedDict = OrderedDict()
+        self.rotation: Optional[SongRotation] = None
         
 ######################################################
 #
@@ -72,6 +235,7 @@ class RecommendationsModel:
             raise ValueError("Invalid muscle groups list provided. Muscle groups list must be non-empty.")
              
         self.target_groups = new_groups
+        self.update_masks()
         return True
 
     def add_target_group(self, new_group: str) -> bool:
@@ -92,6 +256,7 @@ class RecommendationsModel:
         
         if new_group not in self.target_groups:
             self.target_groups.append(new_group)
+            self.update_masks()
             return True
         else:
             return False
@@ -114,6 +279,7 @@ class RecommendationsModel:
         
         if group in self.target_groups:
             self.target_groups.remove(group)
+            self.update_masks()
             return True
         else:
             return False
@@ -150,6 +316,7 @@ class RecommendationsModel:
             raise ValueError("Invalid equipment list provided. Equipment list must be non-empty.")
         
         self.equipment = new_equipment
+        self.update_masks()
         return True
 
     def add_equipment(self, new_equipment: str) -> bool:
@@ -170,6 +337,7 @@ class RecommendationsModel:
         
         if new_equipment not in self.equipment:
             self.equipment.append(new_equipment)
+            self.update_masks()
             return True
         else:
             return False
@@ -192,6 +360,7 @@ class RecommendationsModel:
         
         if equipment in self.equipment:
             self.equipment.remove(equipment)
+            self.update_masks()
             return True
         else:
             return False
@@ -204,6 +373,41 @@ class RecommendationsModel:
             List[str]: The list of equipment.
         """
         return self.equipment
+
+    def update_masks(self) -> None:
+        """
+        Re-encodes the target groups and equipment as masks. See query_masks.
+        """
+        self.target_group_mask, self.equipment_mask = query_masks(self.target_groups, self.equipment)
+        self.mask_sizes = (len(MUSCLE_GROUPS), len(EQUIPMENT))
+
+    def profile_masks(self) -> Tuple[int, int]:
+        """
+        Returns the target group and equipment masks of the profile.
+
+        Names interned since the masks were built, e.g. equipment first seen when the
+        catalog loaded after the profile was restored, are added first.
+
+        Returns:
+            tuple: (target_group_mask, equipment_mask).
+        """
+        if self.mask_sizes != (len(MUSCLE_GROUPS), len(EQUIPMENT)):
+            self.update_masks()
+        return self.target_group_mask, self.equipment_mask
+
+    def fits_profile(self, record: ExerciseRecord) -> bool:
+        """
+        Checks whether a catalog record works one of the user's target groups
+        using only equipment the user has.
+
+        Args:
+            record (ExerciseRecord): The catalog record to check.
+
+        Returns:
+            bool: True if the record fits the user's profile.
+        """
+        group_mask, equipment_mask = self.profile_masks()
+        return bool(record.group_mask & group_mask) and not record.equipment_mask & ~equipment_mask
     
 ######################################################
 #
@@ -289,264 +493,443 @@ class RecommendationsModel:
 #
 ######################################################
 
-    def get_exercises_by_many_muscle_groups(self, muscle_groups: List[str]) -> List[Exercise]:
+    def rank_exercises(self, index: CatalogIndex, ids: np.ndarray, scores: np.ndarray,
+                       limit: Optional[int] = None, offset: int = 0, history: Optional[str] = None,
+                       history_days: Optional[int] = None) -> List[int]:
+        """
+        Ranks scored matches for the user and returns one page of the best.
+
+        Entries are scored on the share of the wanted groups they work and the share
+        of the equipment they need that is owned (see scored_matches), plus how rarely
+        they were recommended to the user before. Entries with the same name are listed
+        once, and the entries returned count as recommended.
+
+        Novelty is read from a snapshot of the recommended counts taken when the first
+        page (offset 0) of a listing is served, so later pages of the same matches and
+        catalog version slice the same order and every entry is listed exactly once.
+        The next first page picks up the entries recommended since.
+
+        With a history mode, exercises the user logged in the last history_days are
+        excluded or down-weighted; the logs are read from log_model's recent-exercise
+        index rather than the database.
+
+        Args:
+            index (CatalogIndex): The catalog the matches were made on.
+            ids (np.ndarray): Matching entry ids.
+            scores (np.ndarray): Coverage and equipment fit score of each match.
+            limit (int): Number of entries to return. None returns all.
+            offset (int): Number of ranked entries to skip.
+            history (str): None, "exclude" or "downweight".
+            history_days (int): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
+
+        Returns:
+            List[int]: Entry ids, best first.
+
+        Raises:
+            ValueError: If limit, offset or history_days is negative, or the history mode is unknown.
+            sqlite3.Error: If the user's logs cannot be read.
+        """
+        if (limit is not None and limit < 0) or offset < 0:
+            raise ValueError("limit and offset must be non-negative.")
+
+        penalty = None
+        if history is not None:
+            if history not in HISTORY_MODES:
+                raise ValueError(f"Invalid history mode {history}. history must be one of {', '.join(HISTORY_MODES)}.")
+            days = HISTORY_DAYS if history_days is None else history_days
+            if days < 0:
+                raise ValueError("history_days must be non-negative.")
+            recent = get_recent_exercises(self.username, days)
+            if recent:
+                def penalty(entry_id: int) -> float:
+                    days_ago = recent.get(index.records[entry_id].lowered_name)
+                    if days_ago is None:
+                        return 0.0
+                    if history == "exclude":
+                        return math.inf
+                    return HISTORY_WEIGHT * (1 - days_ago / (days + 1))
+
+        counts = self.ranking_counts((index.version, hash(ids.tobytes())), fresh=offset == 0)
+        novelty = np.ones(len(ids))
+        if counts:
+            bases = index.base_ids[ids]
+            seen = np.isin(bases, list(counts))
+            novelty[seen] = [1 / (1 + counts[base]) for base in bases[seen].tolist()]
+
+        page = top_k(ids, scores + NOVELTY_WEIGHT * novelty, lambda entry_id: index.records[entry_id].lowered_name,
+                     limit, offset, penalty)
+        for entry_id in page:
+            base_id = index.records[entry_id].base_id
+            if base_id is not None:
+                self.recommended_counts[base_id] += 1
+        return page
+
+    def ranking_counts(self, key: tuple, fresh: bool) -> Counter:
+        """
+        Returns the recommended counts a ranked listing is ordered by.
+
+        Args:
+            key (tuple): Identifies the listing: catalog version and matched ids.
+            fresh (bool): Take a new snapshot, for the first page of a listing.
+
+        Returns:
+            Counter: The snapshot. Do not modify it.
+        """
+        counts = self.ranking_snapshots.get(key)
+        if fresh or counts is None:
+            counts = self.ranking_snapshots[key] = Counter(self.recommended_counts)
+        self.ranking_snapshots.move_to_end(key)
+        while len(self.ranking_snapshots) > RANKING_SNAPSHOTS:
+            self.ranking_snapshots.popitem(last=False)
+        return counts
+
+    def get_exercises_by_many_muscle_groups(self, muscle_groups: List[str], limit: Optional[int] = None,
+                                            offset: int = 0, history: Optional[str] = None,
+                                            history_days: Optional[int] = None) -> List[Exercise]:
         """
         Fetches exercises based on the user's target muscle groups.
 
         Args:
             muscle_groups (List[str]): List of target muscle groups.
+            limit (int): Number of exercises to return. None returns all.
+            offset (int): Number of ranked exercises to skip.
+            history (str): None, "exclude" or "downweight" exercises logged in the last history_days.
+            history_days (int): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
 
         Returns:
-            List[Exercise]: List of recommended exercises targeting the provided muscle groups.
+            List[Exercise]: Exercises working any of the groups, best first, each listed once. See rank_exercises.
 
         Raises:
             requests.RequestException: If there is an error with the API request.
+            ValueError: If limit, offset or history_days is negative, or the history mode is unknown.
         """
-        params = {
-            "language": 2,  # default Language: English
-            "api_key": self.wger_api_key
-        }
-
         try:
-            #response = requests.get(f"{BASE_URL}exercise/", params=params)
-            response = requests.get(self.wger_base_url, params=params, headers={"Authorization": f"Token {self.wger_api_key}"})
-            response.raise_for_status()
-            data = response.json().get("results", []) # getting data
-
-            # Recommendation logic based on time and target muscle
-            recommendations: List[Exercise] = []
-            
-            for target in set(muscle_groups):
-                for item in data:  
-                    if "exercises" in item:  
-                        for exercise in item["exercises"]:  
-                            if exercise.get("language") == 2: 
-                                if(target == 'leg') and (("squat" in exercise.get("name", "No name available").lower()) or ("running" in exercise.get("name", "No name available").lower())):
-                                    name = exercise.get("name", "No name available")
-                                    muscles = ", ".join([muscle["name"] for muscle in item.get("muscles", [])]) or "No muscles targeted"
-                                    equipment = ", ".join([eq["name"] for eq in item.get("equipment", [])]) or "No equipment required"
-                                    today_date = date.today().strftime("%Y-%m-%d")
-                                    recommendations.append(Exercise(name=name, muscle_group=muscles, equipment=equipment, date = today_date)) # storing data
-                                if(target == 'arm') and (("curl" in exercise.get("name", "No name available").lower()) or ("tricep" in exercise.get("name", "No name available").lower())):
-                                    name = exercise.get("name", "No name available")
-                                    muscles = ", ".join([muscle["name"] for muscle in item.get("muscles", [])]) or "No muscles targeted"
-                                    equipment = ", ".join([eq["name"] for eq in item.get("equipment", [])]) or "No equipment required"
-                                    today_date = date.today().strftime("%Y-%m-%d")
-                                    recommendations.append(Exercise(name=name, muscle_group=muscles, equipment=equipment, date = today_date))
-                                if(target == 'back') and (("pull" in exercise.get("name", "No name available").lower()) or ("row" in exercise.get("name", "No name available").lower())):
-                                    name = exercise.get("name", "No name available")
-                                    muscles = ", ".join([muscle["name"] for muscle in item.get("muscles", [])]) or "No muscles targeted"
-                                    equipment = ", ".join([eq["name"] for eq in item.get("equipment", [])]) or "No equipment required"
-                                    today_date = date.today().strftime("%Y-%m-%d")
-                                    recommendations.append(Exercise(name=name, muscle_group=muscles, equipment=equipment, date = today_date))
-                                if(target == 'abs') and (("crunch" in exercise.get("name", "No name available").lower()) or ("plank" in exercise.get("name", "No name available").lower())):
-                                    name = exercise.get("name", "No name available")
-                                    muscles = ", ".join([muscle["name"] for muscle in item.get("muscles", [])]) or "No muscles targeted"
-                                    equipment = ", ".join([eq["name"] for eq in item.get("equipment", [])]) or "No equipment required"
-                                    today_date = date.today().strftime("%Y-%m-%d")
-                                    recommendations.append(Exercise(name=name, muscle_group=muscles, equipment=equipment, date = today_date))
-                                if(target == 'cardio') and (("swim" in exercise.get("name", "No name available").lower()) or ("run" in exercise.get("name", "No name available").lower())):
-                                    name = exercise.get("name", "No name available")
-                                    muscles = ", ".join([muscle["name"] for muscle in item.get("muscles", [])]) or "No muscles targeted"
-                                    equipment = ", ".join([eq["name"] for eq in item.get("equipment", [])]) or "No equipment required"
-                                    today_date = date.today().strftime("%Y-%m-%d")
-                                    recommendations.append(Exercise(name=name, muscle_group=muscles, equipment=equipment, date = today_date))
-
-                                #print(f"Exercise Name: {name}")
-                                #print(f"Muscle Group Targeted: {muscles}")
-                                #print(f"Equipment: {equipment}")
-                                #print("-" * 40)
-
-            return recommendations
+            get_catalog_index() # loads the catalog, interning its equipment, before the masks are built
+            index, ids, scores = scored_matches("groups", query_masks(muscle_groups, ())[0], self.profile_masks()[1])
+            today_date = date.today().strftime("%Y-%m-%d")
+            page = self.rank_exercises(index, ids, scores, limit, offset, history, history_days)
+            return [to_exercise(index.records[entry_id], today_date) for entry_id in page]
         except requests.RequestException as e:
             return [f"Error fetching exercises: {str(e)}"]
         
-    def get_exercises_by_many_equipment(self, equipment_list: List[str]) -> List[Exercise]: 
+    def get_exercises_by_many_equipment(self, equipment_list: List[str], limit: Optional[int] = None,
+                                        offset: int = 0, history: Optional[str] = None,
+                                        history_days: Optional[int] = None) -> List[Exercise]: 
         """
-        Fetches exercises based on the user's preferred equipment.
+        Fetches the exercises that can be done with the given equipment.
+
+        An exercise matches when every piece of equipment it needs is in the list, so
+        exercises needing no equipment always match and "none" adds nothing. Exercises
+        working the user's target groups rank first.
 
         Args:
-            equipment_list (List[str]): List of equipment preferences.
+            equipment_list (List[str]): The equipment available, matched case-insensitively.
+            limit (int): Number of exercises to return. None returns all.
+            offset (int): Number of ranked exercises to skip.
+            history (str): None, "exclude" or "downweight" exercises logged in the last history_days.
+            history_days (int): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
 
         Returns:
-            List[Exercise]: List of recommended exercises using the provided equipment.
+            List[Exercise]: Exercises doable with the equipment, best first, each listed once. See rank_exercises.
 
         Raises:
             requests.RequestException: If there is an error with the API request.
+            ValueError: If limit, offset or history_days is negative, or the history mode is unknown.
         """
-        params = {
-            "language": 2,  # default Language: English
-            "api_key": self.wger_api_key
-        }
-
         try:
-            response = requests.get(self.wger_base_url, params=params, headers={"Authorization": f"Token {self.wger_api_key}"})
-            response.raise_for_status()
-            data = response.json().get("results", []) # getting data
-
-            # Recommendation logic based on time and target muscle
-            recommendations: List[Exercise] = []
-            
-            for target in set(equipment_list):
-                for item in data:  
-                    if "exercises" in item:  
-                        for exercise in item["exercises"]:  
-                            if exercise.get("language") == 2: 
-                                name = exercise.get("name", "No name available")
-                                muscles = ", ".join([muscle["name"] for muscle in item.get("muscles", [])]) or "No muscles targeted"
-                                equipment = ", ".join([eq["name"] for eq in item.get("equipment", [])]) or "No equipment required"
-                                today_date = date.today().strftime("%Y-%m-%d")
-                                if(equipment.lower()==target):
-                                    recommendations.append(Exercise(name=name, muscle_group=muscles, equipment=equipment, date = today_date))
-                                if(target=='none') and (equipment=="No equipment required"):
-                                    recommendations.append(Exercise(name=name, muscle_group=muscles, equipment=equipment, date = today_date))
-            return recommendations
+            get_catalog_index() # loads the catalog, interning its equipment, before the masks are built
+            index, ids, scores = scored_matches("equipment", self.profile_masks()[0], query_masks((), equipment_list)[1])
+            today_date = date.today().strftime("%Y-%m-%d")
+            page = self.rank_exercises(index, ids, scores, limit, offset, history, history_days)
+            return [to_exercise(index.records[entry_id], today_date) for entry_id in page]
         except requests.RequestException as e:
             return [f"Error fetching exercises: {str(e)}"]
 
-    def update_one_exercise(self, recommendations, index, muscle):
+    def get_exercises_by_groups_and_equipment(self, muscle_groups: List[str], equipment_list: List[str],
+                                              limit: Optional[int] = None, offset: int = 0,
+                                              history: Optional[str] = None,
+                                              history_days: Optional[int] = None) -> List[Exercise]:
         """
-        Update an exercise in the recommendations list based on the specified index and muscle group.
+        Fetches the exercises working any of the groups that can be done with the given equipment.
+
+        Both conditions are evaluated together in one pass over the catalog index.
 
         Args:
-            recommendations: list of recommended exercises
-            index: index of the exercise to update
-            muscle: string of the muscle group to target
+            muscle_groups (List[str]): List of target muscle groups.
+            equipment_list (List[str]): The equipment available, matched case-insensitively.
+            limit (int): Number of exercises to return. None returns all.
+            offset (int): Number of ranked exercises to skip.
+            history (str): None, "exclude" or "downweight" exercises logged in the last history_days.
+            history_days (int): Days of logs the history mode looks at. Defaults to HISTORY_DAYS.
 
         Returns:
-            recommendations: the updated list of exercises
-        """
-        params = {
-            "language": 2,  # Language set to English
-            "api_key": self.wger_api_key
-        }
+            List[Exercise]: Matching exercises, best first, each listed once. See rank_exercises.
 
+        Raises:
+            requests.RequestException: If there is an error with the API request.
+            ValueError: If limit, offset or history_days is negative, or the history mode is unknown.
+        """
         try:
-            # Fetch exercises targeting the specified muscle group
-            response = requests.get(self.wger_base_url, params=params, headers={"Authorization": f"Token {self.wger_api_key}"})
-            response.raise_for_status()
-            data = response.json().get("results", [])
-
-            recommendations: List[Exercise] = []
-
-            # Logic to find exercises based on muscle group
-            for target in set(muscle):
-                for item in data:
-                    if "exercises" in item:
-                        for exercise in item["exercises"]:
-                            if exercise.get("language") == 2:
-                                # Check conditions for different muscle groups and add to recommendations
-                                if (target == 'leg' and 
-                                    ("squat" in exercise.get("name", "").lower() or "running" in exercise.get("name", "").lower())):
-                                    recommendations.append(self.create_exercise(exercise, target))
-
-                                if (target == 'arm' and 
-                                    ("curl" in exercise.get("name", "").lower() or "tricep" in exercise.get("name", "").lower())):
-                                    recommendations.append(self.create_exercise(exercise, target))
-
-                                if (target == 'back' and 
-                                    ("pull" in exercise.get("name", "").lower() or "row" in exercise.get("name", "").lower())):
-                                    recommendations.append(self.create_exercise(exercise, target))
-
-                                if (target == 'abs' and 
-                                    ("crunch" in exercise.get("name", "").lower() or "plank" in exercise.get("name", "").lower())):
-                                    recommendations.append(self.create_exercise(exercise, target))
-
-                                if (target == 'cardio' and 
-                                    ("swim" in exercise.get("name", "").lower() or "run" in exercise.get("name", "").lower())):
-                                    recommendations.append(self.create_exercise(exercise, target))
-
-            if not recommendations:
-                print(f"No exercises found targeting '{muscle}'.")
-                return recommendations
-
-            # Update the exercise at the specified index
-            if 0 <= index < len(recommendations):
-                old_exercise = recommendations[index]
-                new_exercise = recommendations[0]  # Can replace with any new exercise logic
-                recommendations[index] = new_exercise
-                print(f"Replaced '{old_exercise.name}' with '{new_exercise.name}'.")
-                return recommendations
-            else:
-                print("Invalid index provided.")
-                return recommendations
-
+            get_catalog_index() # loads the catalog, interning its equipment, before the masks are built
+            index, ids, scores = scored_matches("both", *query_masks(muscle_groups, equipment_list))
+            today_date = date.today().strftime("%Y-%m-%d")
+            page = self.rank_exercises(index, ids, scores, limit, offset, history, history_days)
+            return [to_exercise(index.records[entry_id], today_date) for entry_id in page]
         except requests.RequestException as e:
-            print(f"Error fetching exercises: {str(e)}")
             return [f"Error fetching exercises: {str(e)}"]
+
+    def build_workout_plan(self, minutes: int, muscle_groups: Optional[List[str]] = None,
+                           equipment_list: Optional[List[str]] = None) -> Plan:
+        """
+        Builds a workout plan filling a time budget. See plan_builder.build_plan.
+
+        Args:
+            minutes (int): The time budget in whole minutes.
+            muscle_groups (List[str]): Target groups to work. Defaults to the user's target groups.
+            equipment_list (List[str]): Equipment available, matched case-insensitively. Defaults to the user's equipment.
+
+        Returns:
+            Plan: The exercises with their sets and minutes.
+
+        Raises:
+            requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+            ValueError: If minutes is out of range.
+        """
+        groups = self.target_groups if muscle_groups is None else muscle_groups
+        index = get_catalog_index()
+        owned_mask = self.profile_masks()[1] if equipment_list is None else query_masks((), equipment_list)[1]
+        return build_plan(index, groups, minutes, owned_mask)
+
+    def replace_exercise(self, exercise_name: str, muscle: Optional[str] = None, seed: int = 0,
+                         language: int = ENGLISH) -> Optional[Exercise]:
+        """
+        Picks a different catalog exercise to swap in for one the user does not want.
+
+        The replacement works the same wger muscles with the same equipment, picked in
+        O(1) expected time from the catalog's profile index. If the exercise is not in
+        the catalog or nothing shares its profile, an exercise working the target group
+        `muscle` is picked instead, as fast once the group's ids were first listed. Picks are deterministic for a given user, exercise,
+        seed and catalog version; pass another seed for another alternative.
+
+        Args:
+            exercise_name (str): Name of the exercise to replace, matched case-insensitively.
+            muscle (str): Target group to fall back to as typed, e.g. "Legs". See workout.normalize_group.
+            seed (int): Selects among the alternatives.
+            language (int): wger language id of the translations to pick from.
+
+        Returns:
+            Exercise: The replacement, or None if there is no alternative.
+
+        Raises:
+            requests.RequestException: If the catalog must be downloaded and wger cannot be reached.
+        """
+        index = get_catalog_index() # served from the local catalog store
+        lowered = exercise_name.lower()
+        rng = random.Random(f"{self.username}:{lowered}:{seed}:{index.version}")
+
+        replacement = None
+        entry_id = index.id_for_name(exercise_name, language)
+        if entry_id is not None:
+            replacement = index.pick_alternative(index.by_profile.get(index.profile(entry_id), []), lowered, rng)
+        if replacement is None and muscle:
+            replacement = index.pick_alternative(index.group_ids(normalize_group(muscle), language), lowered, rng)
+        if replacement is None:
+            return None
+        return to_exercise(index.records[replacement], date.today().strftime("%Y-%m-%d"))
+
+    def update_one_exercise(self, recommendations: List[Exercise], index: int, muscle: Optional[str] = None,
+                            seed: int = 0) -> List[Exercise]:
+        """
+        Swaps one exercise of a recommendation list for a different one. See replace_exercise.
+
+        Args:
+            recommendations (List[Exercise]): The recommended exercises.
+            index (int): Position of the exercise to replace.
+            muscle (str): Target group to fall back to when nothing shares the exercise's profile.
+            seed (int): Selects among the alternatives.
+
+        Returns:
+            List[Exercise]: A copy of the list with the exercise replaced, or the list unchanged
+                if the index is invalid or there is no alternative.
+        """
+        if not 0 <= index < len(recommendations):
+            logger.warning("Invalid index %d for %d recommendations", index, len(recommendations))
+            return recommendations
+        try:
+            old_exercise = recommendations[index]
+            new_exercise = self.replace_exercise(old_exercise.name, muscle, seed)
         except Exception as e:
-            print(f"An error occurred while updating the exercise: {str(e)}")
+            logger.error("An error occurred while updating the exercise: %s", str(e))
+            return recommendations
+        if new_exercise is None:
+            logger.info("No alternative found for '%s'", old_exercise.name)
             return recommendations
 
+        updated = list(recommendations)
+        updated[index] = new_exercise
+        logger.info("Replaced '%s' with '%s'", old_exercise.name, new_exercise.name)
+        return updated
+
 ######################################################
 #
 #    External API Calls (jamendo music api)
 #
 ######################################################
             
-    def fetch_songs_based_on_workouts(self, workout_count):
+    def song_rotation(self, index: TrackIndex) -> SongRotation:
+        """
+        Returns the user's rotation over the given track list, following it to the list if the list changed.
+
+        Args:
+            index (TrackIndex): The current track list.
+
+        Returns:
+            SongRotation: The rotation.
+        """
+        if self.rotation is None:
+            self.rotation = SongRotation(index.version, len(index), index.lineage)
+        else:
+            self.rotation.sync(index)
+        return self.rotation
+
+    def target_song_positions(self, index: TrackIndex) -> List[int]:
+        """
+        Positions of the user's target songs in the track list, in the order they were added.
+
+        Args:
+            index (TrackIndex): The current track list.
+
+        Returns:
+            List[int]: Positions of the tracks matching a target song by label or name.
+        """
+        positions = []
+        for song in self.target_song:
+            positions.extend(index.find(song))
+        return positions
+
+    def fetch_songs_based_on_workouts(self, workout_count, limit: Optional[int] = None, offset: int = 0):
         """
         Fetch songs from the Jamendo API based on the number of workouts.
 
+        Songs come from the cached track list sorted by duration, shortest first, so
+        the duration filter is a bisect and only the requested page is built. When the
+        list holds too few long enough songs, Jamendo is crawled for more first, see
+        track_model.get_tracks_for_duration.
+
+        The page starts offset songs into the matching songs. Songs already served to
+        the user in the current rotation are skipped and the returned songs join it, so
+        repeated calls, or paging through the songs, walk through every matching song
+        before any repeats; target songs come first on the first page. Once every
+        matching song was served they are all offered again.
+
         Args:
             workout_count : integer number of workouts completed by the user. It helps in determining the intensity.
+            limit (int): Page size. None returns every matching song.
+            offset (int): Matching songs, shortest first, to skip before the page.
 
         Returns:
             songs : list of song names and their artists based on workout count.
         """
-        params = {
-            "client_id": self.jamendo_api_key,
-        }
-
         duration_min = workout_count * 100
         if duration_min > 500:
             duration_min = 500
     
         try:
-            response = requests.get(self.jamendo_base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-        
-            if "results" in data:
-                songs = []
-                for song in data["results"]:
-                    if song.get("duration", 0) >= duration_min:
-                        song_name = song.get("name", "Unknown")
-                        artist_name = song.get("artist_name", "Unknown")
-                        songs.append(f"{song_name} by {artist_name}")
-            
-                if not songs:
-                    return ["No songs found for the given criteria."]
-                return songs
-            else:
-                return ["No songs found for the given criteria."]
+            wanted = TRACKS_MIN_CANDIDATES if limit is None else max(TRACKS_MIN_CANDIDATES, offset + limit)
+            index = get_tracks_for_duration(duration_min, wanted)
+            span = index.span(duration_min)
+            if not span:
+                return [] if offset else ["No songs found for the given criteria."]
+
+            rotation = self.song_rotation(index)
+            if rotation.next_unplayed(span.start, span.stop) is None:
+                rotation.clear_range(span.start, span.stop)
+
+            picked = []
+            if not offset:
+                for position in self.target_song_positions(index):
+                    if limit is not None and len(picked) >= limit:
+                        break
+                    if position in span and position not in picked and not rotation.is_played(position):
+                        picked.append(position)
+            targets = set(picked)
+            position = span.start + offset
+            while limit is None or len(picked) < limit:
+                position = rotation.next_unplayed(position, span.stop)
+                if position is None:
+                    break
+                if position not in targets:
+                    picked.append(position)
+                position += 1
+            for position in picked:
+                rotation.mark(position)
+            return [index.labels[position] for position in picked]
     
         except requests.exceptions.RequestException as e:
             return [f"An error occurred: {e}"]
 
+    def build_playlist(self, minutes: int, seed: int = 0) -> Playlist:
+        """
+        Builds a playlist whose total length best fits a workout session. See playlist_builder.build_playlist.
+
+        Picks are deterministic for a given user, length, seed and track list version;
+        pass another seed for another playlist.
+
+        Args:
+            minutes (int): Length of the session.
+            seed (int): Selects among the playlists that fit.
+
+        Returns:
+            Playlist: The songs with their total length.
+
+        Raises:
+            requests.RequestException: If the track list must be downloaded and Jamendo cannot be reached.
+            ValueError: If minutes is out of range.
+        """
+        index = get_track_index()
+        return build_playlist(index, minutes, random.Random(f"{self.username}:{minutes}:{seed}:{index.version}"))
+
     def fetch_random_song(self):
         """
         Fetch a random song from the Jamendo API.
 
+        Songs come from a pool prefetched from the cached track list, see track_model.random_song.
+        The user's target songs are served first, and songs already served in the current
+        rotation are skipped: after ROTATION_POOL_TRIES pooled songs were all served
+        before, the next unplayed song after the last one is taken instead. Every song
+        is served once before any repeats.
+
         Returns:
             str: A random song name and its artist.
         """
-        params = {
-            "client_id": self.jamendo_api_key,
-        }
-
         try:
-            response = requests.get(self.jamendo_base_url, params=params)
-            response.raise_for_status()
-            data = response.json()
-        
-            if "results" in data and len(data["results"]) > 0:
-                song = random.choice(data["results"])
-                song_name = song.get("name", "Unknown")
-                artist_name = song.get("artist_name", "Unknown")
-                return f"{song_name} by {artist_name}"
-            else:
+            index = get_track_index()
+            if not len(index):
                 return "No songs found."
+            rotation = self.song_rotation(index)
+
+            for position in self.target_song_positions(index):
+                if not rotation.is_played(position):
+                    rotation.mark(position)
+                    return index.labels[position]
+
+            position = 0
+            for _ in range(ROTATION_POOL_TRIES):
+                song = random_song()
+                if song is None:
+                    return "No songs found."
+                positions = index.find(song)
+                if not positions:
+                    # Drawn from an older track list
+                    return song
+                position = positions[0]
+                if not rotation.is_played(position):
+                    rotation.mark(position)
+                    return song
+
+            position = rotation.next_unplayed(position)
+            rotation.mark(position)
+            return index.labels[position]
     
         except requests.exceptions.RequestException as e:
             return f"An error occurred: {e}"
@@ -0,0 +1,138 @@
+import copy
+import logging
+import os
+import sys
+import threading
+import time
+
+import requests
+
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.keyword_matcher import get_matcher
+from workout.utils.logger import configure_logger
+from workout.utils.snapshot import Snapshot, load_snapshot, write_snapshot
+
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Binary snapshot of the normalized catalog and Jamendo tracks, used when the upstreams
+# cannot be reached, or instead of them when running offline
+SNAPSHOT_PATH = os.getenv("SNAPSHOT_PATH", "db/snapshot.bin")
+OFFLINE_ONLY = os.getenv("UPSTREAM_OFFLINE", "false").lower() == "true"
+
+_snapshot: Optional[Snapshot] = None
+_snapshot_index: Optional[CatalogIndex] = None
+_load_lock = threading.Lock()
+
+def get_snapshot() -> Optional[Snapshot]:
+    """
+    Returns the snapshot, loading it on first use.
+
+    Returns:
+        Snapshot: The loaded snapshot, or None if there is no usable snapshot file.
+    """
+    global _snapshot
+    if _snapshot is not None:
+        return _snapshot
+    if not os.path.exists(SNAPSHOT_PATH):
+        return None
+    with _load_lock:
+        if _snapshot is None:
+            try:
+                _snapshot = load_snapshot(SNAPSHOT_PATH)
+            except (OSError, ValueError) as e:
+                logger.error("Could not load snapshot %s: %s", SNAPSHOT_PATH, str(e))
+                return None
+    return _snapshot
+
+def missing_snapshot_error() -> requests.ConnectionError:
+    """
+    The error raised when running offline without a snapshot, instead of calling the upstreams.
+
+    Returns:
+        requests.ConnectionError: The error to raise.
+    """
+    return requests.ConnectionError(f"UPSTREAM_OFFLINE is set but there is no usable snapshot at {SNAPSHOT_PATH}")
+
+def get_snapshot_index() -> Optional[CatalogIndex]:
+    """
+    Returns inverted indexes over the snapshot catalog, rebuilt when the muscle group rules change.
+
+    Returns:
+        CatalogIndex: Indexes over the snapshot catalog, or None if there is no snapshot.
+    """
+    global _snapshot_index
+    snapshot = get_snapshot()
+    if snapshot is None:
+        return None
+    matcher = get_matcher()
+    index = _snapshot_index
+    if index is None or index.rules_version != matcher.version:
+        # Matched into copies: the published index keeps serving its records meanwhile
+        records = []
+        for record in snapshot.records:
+            record = copy.copy(record)
+            record.group_mask = matcher.group_mask(record.lowered_name)
+            records.append(record)
+        index = _snapshot_index = CatalogIndex([], snapshot.catalog_version, matcher, records=records)
+    return index
+
+def snapshot_status() -> dict:
+    """
+    Reports whether a snapshot is loaded and how long the load took.
+
+    Returns:
+        dict: path, offline_only and loaded, plus versions, sizes and load_ms once loaded.
+    """
+    snapshot = _snapshot
+    status = {"path": SNAPSHOT_PATH, "offline_only": OFFLINE_ONLY, "loaded": snapshot is not None}
+    if snapshot is not None:
+        status.update({
+            "catalog_version": snapshot.catalog_version,
+            "records": len(snapshot.records),
+            "tracks_version": snapshot.tracks_version,
+            "tracks": len(snapshot.tracks),
+            "load_ms": round(1000 * snapshot.load_seconds, 1),
+        })
+    return status
+
+def clear_snapshot_cache() -> None:
+    """
+    Forgets the loaded snapshot so the next read loads the file again.
+    """
+    global _snapshot, _snapshot_index
+    _snapshot = None
+    _snapshot_index = None
+
+def build_snapshot(path: Optional[str] = None) -> int:
+    """
+    Writes the current catalog and Jamendo tracks to a snapshot.
+
+    Args:
+        path (str): Where to write the snapshot. Defaults to SNAPSHOT_PATH.
+
+    Returns:
+        int: Size of the snapshot in bytes.
+
+    Raises:
+        requests.RequestException: If a dataset must be downloaded and its upstream cannot be reached.
+    """
+    # Imported here because both models fall back to this module
+    from workout.models.catalog_model import get_catalog, get_catalog_index
+    from workout.models.track_model import get_tracks
+
+    catalog = get_catalog()
+    index = get_catalog_index()
+    tracks = get_tracks()
+    return write_snapshot(path or SNAPSHOT_PATH, index.records, tracks.items, catalog.version,
+                          catalog.fetched_at, tracks.version, tracks.fetched_at)
+
+if __name__ == "__main__":
+    target = sys.argv[1] if len(sys.argv) > 1 else SNAPSHOT_PATH
+    start = time.perf_counter()
+    size = build_snapshot(target)
+    print(f"Wrote {target} ({size} bytes) in {time.perf_counter() - start:.2f}s")
+    snapshot = load_snapshot(target)
+    print(f"Loaded {len(snapshot.records)} records and {len(snapshot.tracks)} tracks in {1000 * snapshot.load_seconds:.1f}ms")
@@ -0,0 +1,356 @@
+from dataclasses import dataclass
+import logging
+import os
+import random
+import threading
+import time
+
+import requests
+
+from workout.models import snapshot_model
+from workout.utils.catalog_crawler import catalog_version
+from workout.utils.http_cache import HttpCache
+from workout.utils.http_client import get_client
+from workout.utils.logger import configure_logger
+from workout.utils.single_flight import SingleFlight, SingleFlightTimeout
+from workout.utils.song_pool import SongPool
+from workout.utils.track_crawler import TrackCrawler
+from workout.utils.track_index import TrackIndex
+
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+JAMENDO_BASE_URL = "https://api.jamendo.com/v3.0/tracks/"
+
+# How long a downloaded track list is served before it is fetched again
+TRACKS_TTL_SECONDS = float(os.getenv("TRACKS_TTL_SECONDS", 6 * 60 * 60))
+
+# How long a request holding an expired track list waits on another request's refresh
+TRACKS_REFRESH_WAIT = float(os.getenv("TRACKS_REFRESH_WAIT", 5))
+
+# Crawl tuning: tracks per page (Jamendo allows 200), pages fetched at once, retries per page
+# with their initial backoff, tracks in the list downloaded on refresh, and tracks wanted for
+# a duration filter before Jamendo is crawled for more
+TRACKS_PAGE_SIZE = int(os.getenv("TRACKS_PAGE_SIZE", 200))
+TRACKS_CRAWL_WORKERS = int(os.getenv("TRACKS_CRAWL_WORKERS", 4))
+TRACKS_CRAWL_RETRIES = int(os.getenv("TRACKS_CRAWL_RETRIES", 2))
+TRACKS_CRAWL_BACKOFF = float(os.getenv("TRACKS_CRAWL_BACKOFF", 0.5))
+TRACKS_CRAWL_LIMIT = int(os.getenv("TRACKS_CRAWL_LIMIT", 1000))
+TRACKS_MIN_CANDIDATES = int(os.getenv("TRACKS_MIN_CANDIDATES", 50))
+
+# Random songs are drawn ahead of time into a pool of SONG_POOL_SIZE, refilled in the background
+# once fewer than SONG_POOL_LOW_WATER are left. SONG_POOL_SEED makes the picks repeatable.
+SONG_POOL_SIZE = int(os.getenv("SONG_POOL_SIZE", 256))
+SONG_POOL_LOW_WATER = int(os.getenv("SONG_POOL_LOW_WATER", 64))
+SONG_POOL_SEED = int(os.environ["SONG_POOL_SEED"]) if os.getenv("SONG_POOL_SEED") else None
+
+@dataclass
+class TrackList:
+    items: List[dict]
+    version: str
+    fetched_at: float
+    # Version of the downloaded list this one was merged from; merges only append to items
+    lineage: Optional[str] = None
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.fetched_at < ttl
+
+_current: Optional[TrackList] = None
+_index: Optional[TrackIndex] = None
+# Minimum durations Jamendo was crawled for since the last refresh -> unix time of the crawl
+_crawled: Dict[int, float] = {}
+_songs = SongPool(lambda: get_track_index().labels, SONG_POOL_SIZE, SONG_POOL_LOW_WATER, random.Random(SONG_POOL_SEED))
+
+def _reseed_after_fork() -> None:
+    # Worker processes forked from one parent would otherwise all draw the same songs
+    _songs.rng = random.Random(SONG_POOL_SEED)
+
+os.register_at_fork(after_in_child=_reseed_after_fork)
+_refreshes = SingleFlight()
+# Held while the track list is swapped, so a merge never overwrites a refresh
+_tracks_lock = threading.Lock()
+
+def track_crawler(min_duration: int = 0, max_duration: Optional[int] = None) -> TrackCrawler:
+    """
+    Builds a crawler over the Jamendo track listing.
+
+    Args:
+        min_duration (int): Shortest track duration requested, in seconds.
+        max_duration (int): Longest track duration requested. None for no bound.
+
+    Returns:
+        TrackCrawler: The crawler.
+    """
+    params = {
+        "client_id": os.getenv("jamendo_API_KEY"),
+    }
+    return TrackCrawler(
+        JAMENDO_BASE_URL,
+        params=params,
+        page_size=TRACKS_PAGE_SIZE,
+        max_workers=TRACKS_CRAWL_WORKERS,
+        retries=TRACKS_CRAWL_RETRIES,
+        backoff=TRACKS_CRAWL_BACKOFF,
+        max_pages=-(-TRACKS_CRAWL_LIMIT // TRACKS_PAGE_SIZE),
+        min_duration=min_duration,
+        max_duration=max_duration,
+    )
+
+def fetch_jamendo_tracks() -> List[dict]:
+    """
+    Downloads the track list from Jamendo, up to TRACKS_CRAWL_LIMIT tracks.
+
+    Returns:
+        List[dict]: The Jamendo track results.
+
+    Raises:
+        requests.RequestException: If there is an error with the API request.
+    """
+    return track_crawler().crawl_tracks(TRACKS_CRAWL_LIMIT)
+
+def _track_key(track: dict) -> tuple:
+    track_id = track.get("id")
+    if track_id is not None:
+        return ("id", str(track_id))
+    return ("track", track.get("name"), track.get("artist_name"), track.get("duration"))
+
+def merge_tracks(items: List[dict]) -> TrackList:
+    """
+    Adds tracks to the current track list, skipping tracks it already holds.
+
+    New tracks are appended, so tracks keep their positions in the list and song
+    rotations survive the merge. The merged list keeps the download time of the current
+    list, so merging does not postpone its refresh.
+
+    Args:
+        items (List[dict]): Jamendo track results.
+
+    Returns:
+        TrackList: The merged track list.
+    """
+    global _current
+    with _tracks_lock:
+        current = _current
+        merged = list(current.items) if current is not None else []
+        seen = {_track_key(track) for track in merged}
+        for track in items:
+            key = _track_key(track)
+            if key not in seen:
+                seen.add(key)
+                merged.append(track)
+        if current is not None and len(merged) == len(current.items):
+            return current
+        version = catalog_version(merged)
+        if current is None:
+            tracks = _current = TrackList(merged, version, time.time())
+        else:
+            tracks = _current = TrackList(merged, version, current.fetched_at, current.lineage or current.version)
+    logger.info("Merged %d new Jamendo tracks into version %s", len(merged) - (len(current.items) if current else 0), tracks.version)
+    return tracks
+
+def refresh_tracks() -> TrackList:
+    """
+    Downloads the track list from Jamendo and swaps it in.
+
+    Returns:
+        TrackList: The fresh track list.
+
+    Raises:
+        requests.RequestException: If there is an error with the API request.
+    """
+    global _current
+    items = fetch_jamendo_tracks()
+    tracks = TrackList(items, catalog_version(items), time.time())
+    with _tracks_lock:
+        _current = tracks
+        _crawled.clear()
+    logger.info("Refreshed Jamendo tracks version %s with %d tracks", tracks.version, len(items))
+    return tracks
+
+def revalidate_tracks() -> TrackList:
+    """
+    Downloads the track list now, joining a refresh already in progress.
+
+    Used by the background refresher, so unlike get_tracks it raises instead of
+    falling back to a stale list.
+
+    Returns:
+        TrackList: The fresh track list.
+
+    Raises:
+        requests.RequestException: If there is an error with the API request.
+    """
+    return _refreshes.do(HttpCache.key(JAMENDO_BASE_URL), refresh_tracks)
+
+def _refresh_unless_fresh(ttl: float) -> TrackList:
+    tracks = _current
+    if tracks is not None and tracks.is_fresh(ttl):
+        return tracks
+    try:
+        return refresh_tracks()
+    except requests.RequestException as e:
+        if tracks is None:
+            raise
+        logger.warning("Serving stale tracks version %s: %s", tracks.version, str(e))
+        return tracks
+
+def get_tracks(ttl: Optional[float] = None) -> TrackList:
+    """
+    Returns the Jamendo track list, refreshing it once it is older than the TTL.
+
+    Concurrent callers share one refresh; those already holding an expired list wait
+    at most TRACKS_REFRESH_WAIT for it before being served the expired one. If Jamendo
+    cannot be reached a stale list is served rather than failing, or the bundled
+    snapshot when there is no list yet. Offline, the snapshot is served directly, and
+    a missing snapshot raises rather than calling Jamendo.
+
+    Args:
+        ttl (float): Maximum track list age in seconds. Defaults to TRACKS_TTL_SECONDS.
+
+    Returns:
+        TrackList: The current track list.
+
+    Raises:
+        requests.RequestException: If the list must be downloaded and Jamendo cannot be reached.
+    """
+    ttl = TRACKS_TTL_SECONDS if ttl is None else ttl
+
+    tracks = _current
+    if tracks is not None and tracks.is_fresh(ttl):
+        return tracks
+
+    if snapshot_model.OFFLINE_ONLY:
+        snapshot = _snapshot_tracks()
+        if snapshot is None:
+            raise snapshot_model.missing_snapshot_error()
+        return snapshot
+
+    key = HttpCache.key(JAMENDO_BASE_URL)
+    try:
+        return _refreshes.do(key, lambda: _refresh_unless_fresh(ttl), timeout=TRACKS_REFRESH_WAIT if tracks is not None else None)
+    except SingleFlightTimeout:
+        logger.warning("Serving stale tracks version %s while they are refreshed", tracks.version)
+        return tracks
+    except requests.RequestException as e:
+        snapshot = _snapshot_tracks()
+        if snapshot is None:
+            raise
+        logger.warning("Serving snapshot tracks version %s: %s", snapshot.version, str(e))
+        return snapshot
+
+def _snapshot_tracks() -> Optional[TrackList]:
+    snapshot = snapshot_model.get_snapshot()
+    if snapshot is None:
+        return None
+    return TrackList(snapshot.tracks, snapshot.tracks_version, snapshot.tracks_fetched_at)
+
+def get_track_index(ttl: Optional[float] = None) -> TrackIndex:
+    """
+    Returns the current track list sorted by duration, built once per track list version.
+
+    The list is refreshed as by get_tracks, so the index follows its TTL.
+
+    Args:
+        ttl (float): Maximum track list age in seconds. Defaults to TRACKS_TTL_SECONDS.
+
+    Returns:
+        TrackIndex: The tracks sorted by duration.
+
+    Raises:
+        requests.RequestException: If the list must be downloaded and Jamendo cannot be reached.
+    """
+    global _index
+    tracks = get_tracks(ttl)
+    index = _index
+    if index is None or index.version != tracks.version:
+        index = _index = TrackIndex(tracks.items, tracks.version, tracks.lineage)
+    return index
+
+def _crawl_for(min_duration: int, wanted: int) -> None:
+    if min_duration in _crawled:
+        return
+    merge_tracks(track_crawler(min_duration).crawl_tracks(wanted))
+    _crawled[min_duration] = time.time()
+
+def get_tracks_for_duration(min_duration: int, wanted: Optional[int] = None) -> TrackIndex:
+    """
+    Returns the track index holding enough tracks of at least min_duration seconds, if Jamendo has them.
+
+    When the cached list has fewer than wanted such tracks, Jamendo is crawled with a
+    server-side duration filter until wanted are collected, and the results are merged
+    into the cached list. Each minimum duration is crawled at most once per track list
+    refresh, and concurrent requests share one crawl. If the crawl fails the cached
+    tracks are served.
+
+    Args:
+        min_duration (int): Shortest duration wanted, in seconds.
+        wanted (int): Tracks wanted. Defaults to TRACKS_MIN_CANDIDATES.
+
+    Returns:
+        TrackIndex: The tracks sorted by duration.
+
+    Raises:
+        requests.RequestException: If the list must be downloaded and Jamendo cannot be reached.
+    """
+    wanted = TRACKS_MIN_CANDIDATES if wanted is None else wanted
+    index = get_track_index()
+    if index.count(min_duration) >= wanted or min_duration in _crawled or snapshot_model.OFFLINE_ONLY:
+        return index
+    try:
+        _refreshes.do(f"{HttpCache.key(JAMENDO_BASE_URL)}:{min_duration}", lambda: _crawl_for(min_duration, wanted))
+    except requests.RequestException as e:
+        logger.warning("Serving %d cached tracks of at least %ds: %s", index.count(min_duration), min_duration, str(e))
+        return index
+    return get_track_index()
+
+def random_song() -> Optional[str]:
+    """
+    Returns a random "name by artist" song from the prefetched pool.
+
+    The pool is refilled in the background, so only the first request after startup
+    or a cache clear waits for the track list.
+
+    Returns:
+        str: The song, or None if the track list is empty.
+
+    Raises:
+        requests.RequestException: If the pool is empty and the track list must be downloaded
+            but Jamendo cannot be reached.
+    """
+    return _songs.take()
+
+def prefill_song_pool() -> None:
+    """
+    Fills the random song pool in the background.
+    """
+    _songs.refill_async()
+
+def seed_song_pool(seed: Optional[int]) -> None:
+    """
+    Reseeds the random number generator of this process's song pool.
+
+    Args:
+        seed (int): The seed. None seeds from the operating system.
+    """
+    _songs.seed(seed)
+
+def song_pool_stats() -> dict:
+    """
+    Reports the size and counters of the random song pool.
+
+    Returns:
+        dict: size, capacity, low_water, served, refills, empty and refilling.
+    """
+    return _songs.stats()
+
+def clear_track_cache() -> None:
+    """
+    Forgets the in-process track list, its index and the pooled songs so the next read downloads it again.
+    """
+    global _current, _index
+    _current = None
+    _index = None
+    _crawled.clear()
+    _songs.clear()
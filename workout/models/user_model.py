@@ -144,14 +144,15 @@ def clear_users() -> None:
     try:
         with get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.executescript("""
-                DROP TABLE IF EXISTS login;
+            # execute rather than executescript, which would commit a shared batch transaction
+            cursor.execute("DROP TABLE IF EXISTS login")
+            cursor.execute("""
                 CREATE TABLE login (
                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                     username TEXT UNIQUE NOT NULL,
                     salt TEXT NOT NULL,
                     hashed_password TEXT NOT NULL
-                );
+                )
             """)
             conn.commit()
 
@@ -0,0 +1,244 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from dataclasses import dataclass
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+
+import requests
+
+from workout.utils.http_cache import SECRET_PARAMS
+from workout.utils.http_client import RETRY_STATUSES, get_client
+from workout.utils.logger import configure_logger
+
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+@dataclass
+class CatalogSnapshot:
+    items: List[dict]
+    version: str
+    count: int
+    fetched_at: float
+
+def catalog_version(items: List[dict]) -> str:
+    """
+    Computes a content hash identifying a catalog.
+
+    Args:
+        items (List[dict]): The catalog items.
+
+    Returns:
+        str: A short hex digest that changes whenever the items change.
+    """
+    payload = json.dumps(items, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    return hashlib.sha1(payload).hexdigest()[:16]
+
+class CatalogCrawler:
+    """
+    Downloads every page of a paginated (limit/offset) API listing.
+
+    The first page gives the total count; the remaining pages are fetched on a bounded
+    thread pool. Each page is retried with exponential backoff, and the items of finished
+    pages are appended to a checkpoint file so an interrupted crawl picks up where it stopped.
+    Pages are fetched with UpstreamClient.get_json, so crawls running at the same time
+    share the requests for pages they both need. Pages may be shared, so they are never
+    modified.
+
+    Attributes:
+        base_url (str): url of the listing
+        params (dict): query parameters sent with every page
+        headers (dict): headers sent with every page
+        page_size (int): number of items requested per page
+        max_workers (int): maximum number of pages fetched at once
+        retries (int): attempts per page after the first one
+        backoff (float): seconds to wait before the first retry, doubled on each retry
+        checkpoint_path (str): JSON lines file holding finished pages, or None to disable resuming
+        checkpoint_max_age (float): seconds after which a checkpoint is discarded rather than resumed
+    """
+
+    def __init__(self, base_url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+                 page_size: int = 100, max_workers: int = 4, retries: int = 3, backoff: float = 0.5,
+                 checkpoint_path: Optional[str] = None, checkpoint_max_age: float = 24 * 60 * 60):
+        self.base_url: str = base_url
+        self.params: dict = dict(params or {})
+        self.headers: dict = dict(headers or {})
+        self.page_size: int = page_size
+        self.max_workers: int = max_workers
+        self.retries: int = retries
+        self.backoff: float = backoff
+        self.checkpoint_path: Optional[str] = checkpoint_path
+        self.checkpoint_max_age: float = checkpoint_max_age
+
+        self._pages: Dict[int, dict] = {}
+        self._checkpoint_started: bool = False
+        self._lock = threading.Lock()
+
+######################################################
+#
+#    Checkpointing
+#
+######################################################
+
+    def _checkpoint_key(self) -> str:
+        # A digest of the listing without credentials, so no secret is written to disk
+        params = {name: value for name, value in self.params.items() if name not in SECRET_PARAMS}
+        payload = json.dumps({"base_url": self.base_url, "params": params, "page_size": self.page_size},
+                             sort_keys=True, default=str)
+        return hashlib.sha1(payload.encode("utf-8")).hexdigest()
+
+    def _load_checkpoint(self) -> None:
+        self._pages = {}
+        self._checkpoint_started = False
+        if not self.checkpoint_path or not os.path.exists(self.checkpoint_path):
+            return
+        try:
+            with open(self.checkpoint_path) as f:
+                lines = f.read().splitlines()
+            header = json.loads(lines[0]) if lines else {}
+        except (OSError, ValueError) as e:
+            logger.warning("Ignoring unreadable crawl checkpoint %s: %s", self.checkpoint_path, str(e))
+            return
+        if header.get("key") != self._checkpoint_key():
+            logger.info("Ignoring crawl checkpoint for a different listing")
+            return
+        age = time.time() - float(header.get("saved_at") or 0)
+        if age > self.checkpoint_max_age:
+            logger.info("Discarding crawl checkpoint of %s saved %.0fs ago", self.base_url, age)
+            self._clear_checkpoint()
+            return
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                # A page whose write was interrupted is fetched again
+                continue
+            self._pages[int(entry["offset"])] = entry["page"]
+        self._checkpoint_started = True
+        logger.info("Resuming crawl of %s with %d pages from checkpoint", self.base_url, len(self._pages))
+
+    def _save_page(self, offset: int, page: dict) -> None:
+        # Appends one line per page, so saving stays O(page) however many pages came before
+        if not self.checkpoint_path:
+            return
+        with open(self.checkpoint_path, "a" if self._checkpoint_started else "w") as f:
+            if not self._checkpoint_started:
+                f.write(json.dumps({"key": self._checkpoint_key(), "saved_at": time.time()}) + "\n")
+            f.write(json.dumps({"offset": offset, "page": page}) + "\n")
+        self._checkpoint_started = True
+
+    def _clear_checkpoint(self) -> None:
+        self._checkpoint_started = False
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+
+######################################################
+#
+#    Fetching
+#
+######################################################
+
+    def fetch_page(self, offset: int) -> dict:
+        """
+        Fetches one page, retrying transient failures with exponential backoff.
+
+        Args:
+            offset (int): Offset of the first item of the page.
+
+        Returns:
+            dict: The decoded page with "count", "next" and "results".
+
+        Raises:
+            requests.RequestException: If the page still fails after all retries.
+        """
+        params = dict(self.params, limit=self.page_size, offset=offset)
+        attempt = 0
+        while True:
+            try:
+                # Retries are driven from here so they can be tuned per crawl; concurrent
+                # crawls asking for the same page share one request
+                return get_client().get_json(self.base_url, params=params, headers=self.headers, retries=0)
+            except (requests.ConnectionError, requests.Timeout, requests.HTTPError) as e:
+                status = getattr(e.response, "status_code", None)
+                retryable = not isinstance(e, requests.HTTPError) or status in RETRY_STATUSES
+                if not retryable or attempt >= self.retries:
+                    raise
+                delay = self.backoff * (2 ** attempt)
+                logger.warning("Retrying page at offset %d in %.2fs: %s", offset, delay, str(e))
+                time.sleep(delay)
+                attempt += 1
+
+    def _record_page(self, offset: int, page: dict) -> None:
+        # Only what the crawl reads is kept: "next" and "previous" are URLs repeating the
+        # query string, credentials included, so they are reduced to a flag
+        kept = {"results": page.get("results", []), "next": bool(page.get("next"))}
+        if offset == 0:
+            kept["count"] = page.get("count")
+        with self._lock:
+            self._pages[offset] = kept
+            self._save_page(offset, kept)
+
+    def crawl(self) -> CatalogSnapshot:
+        """
+        Downloads the complete listing.
+
+        Returns:
+            CatalogSnapshot: Every item, in listing order, with a content version.
+
+        Raises:
+            requests.RequestException: If a page cannot be fetched. Finished pages stay in
+                the checkpoint for the next attempt.
+        """
+        start = time.perf_counter()
+        self._load_checkpoint()
+
+        if 0 not in self._pages:
+            self._record_page(0, self.fetch_page(0))
+        first = self._pages[0]
+        count = first.get("count") or len(first.get("results", []))
+
+        if first.get("next"):
+            missing = [offset for offset in range(self.page_size, count, self.page_size) if offset not in self._pages]
+            errors = []
+            with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+                futures = {pool.submit(self.fetch_page, offset): offset for offset in missing}
+                for future in as_completed(futures):
+                    try:
+                        self._record_page(futures[future], future.result())
+                    except requests.RequestException as e:
+                        # Keep checkpointing the other pages so a retry only needs the failed ones
+                        errors.append(e)
+            if errors:
+                raise errors[0]
+
+            # The listing can grow while we crawl; follow "next" past the planned pages
+            offset = max(self._pages)
+            while self._pages[offset].get("next"):
+                offset += self.page_size
+                if offset not in self._pages:
+                    self._record_page(offset, self.fetch_page(offset))
+
+        items: List[dict] = []
+        seen = set()
+        for offset in sorted(self._pages):
+            for item in self._pages[offset].get("results", []):
+                item_id = item.get("id")
+                if item_id is not None:
+                    # Items shift between pages when the listing changes mid-crawl
+                    if item_id in seen:
+                        continue
+                    seen.add(item_id)
+                items.append(item)
+
+        if len(items) < count:
+            logger.warning("Crawl of %s returned %d of %d items", self.base_url, len(items), count)
+
+        snapshot = CatalogSnapshot(items=items, version=catalog_version(items), count=count, fetched_at=time.time())
+        self._clear_checkpoint()
+        logger.info("Crawled %d items from %s in %d pages (%.2fs), version %s",
+                    len(items), self.base_url, len(self._pages), time.perf_counter() - start, snapshot.version)
+        return snapshot
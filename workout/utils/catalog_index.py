@@ -0,0 +1,257 @@
+from collections import defaultdict
+import logging
+import random
+import time
+
+import numpy as np
+
+from workout.utils.catalog_records import ENGLISH, ExerciseRecord, normalize_catalog
+from workout.utils.keyword_matcher import KeywordMatcher, get_matcher
+from workout.utils.logger import configure_logger
+from workout.utils.vocabulary import MUSCLE_GROUPS, MUSCLES
+
+from typing import Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+WORD_BITS = 64
+WORD_MASK = (1 << WORD_BITS) - 1
+
+def ids_to_mask(ids: Iterable[int]) -> int:
+    mask = 0
+    for name_id in ids:
+        mask |= 1 << name_id
+    return mask
+
+def mask_matrix(masks: List[int]) -> np.ndarray:
+    """
+    Packs bitmasks into a (rows, words) uint64 array, 64 bits per word.
+
+    Args:
+        masks (List[int]): One mask per row.
+
+    Returns:
+        np.ndarray: The packed masks; wide enough for the largest mask.
+    """
+    words = max(1, (max(masks, default=0).bit_length() + WORD_BITS - 1) // WORD_BITS)
+    if words == 1:
+        return np.array(masks, dtype=np.uint64).reshape(-1, 1)
+    return np.array([[(mask >> (WORD_BITS * word)) & WORD_MASK for word in range(words)] for mask in masks],
+                    dtype=np.uint64).reshape(-1, words)
+
+def mask_words(mask: int, words: int) -> np.ndarray:
+    """
+    Splits a query mask into the words of a mask_matrix, dropping bits beyond its width.
+
+    Args:
+        mask (int): The query mask.
+        words (int): Width of the matrix the mask is compared with.
+
+    Returns:
+        np.ndarray: A uint64 array of length words.
+    """
+    return np.array([(mask >> (WORD_BITS * word)) & WORD_MASK for word in range(words)], dtype=np.uint64)
+
+def touches_any(matrix: np.ndarray, mask: int) -> np.ndarray:
+    """Selects the rows sharing at least one bit with mask."""
+    return (matrix & mask_words(mask, matrix.shape[1])).any(axis=1)
+
+def subset_of(matrix: np.ndarray, mask: int) -> np.ndarray:
+    """Selects the rows whose bits are all set in mask."""
+    return ~(matrix & ~mask_words(mask, matrix.shape[1])).any(axis=1)
+
+class CatalogIndex:
+    """
+    Indexes over one version of the exercise catalog.
+
+    Entry ids are positions in `records`, so sorting a set of ids restores catalog order.
+    Filtered queries go through select(), one vectorized pass over the bitmask columns
+    of the whole catalog; the posting lists serve the point lookups by group, muscle,
+    name and profile.
+
+    Attributes:
+        version (str): catalog version the index was built from
+        rules_version (str): version of the muscle group rules names were classified with
+        records (List[ExerciseRecord]): every exercise translation in catalog order
+        by_group (Dict[str, Set[int]]): target group -> ids matching any of its keywords
+        by_muscle (Dict[int, Set[int]]): MUSCLES id -> ids working that muscle
+        by_language (Dict[int, Set[int]]): wger language id -> ids
+        by_name (Dict[str, List[int]]): lowered name -> ids, in catalog order
+        by_profile (Dict[Tuple[int, int, int], List[int]]): (language, MUSCLES mask, EQUIPMENT mask) -> ids, in catalog order
+        languages (np.ndarray): language of each record, -1 if unknown
+        base_ids (np.ndarray): wger exercise base of each record, -1 if unknown
+        group_masks (np.ndarray): MUSCLE_GROUPS mask of each record, see mask_matrix
+        muscle_masks (np.ndarray): MUSCLES mask of each record
+        equipment_masks (np.ndarray): EQUIPMENT mask of each record
+    """
+
+    def __init__(self, items: List[dict], version: str, matcher: Optional[KeywordMatcher] = None,
+                 records: Optional[List[ExerciseRecord]] = None):
+        start = time.perf_counter()
+        matcher = matcher or get_matcher()
+        self.version: str = version
+        self.rules_version: str = matcher.version
+        # Records already normalized with this matcher (e.g. from a snapshot) are indexed as is
+        self.records: List[ExerciseRecord] = records if records is not None else normalize_catalog(items, matcher=matcher)
+
+        self.by_group: Dict[str, Set[int]] = defaultdict(set)
+        self.by_muscle: Dict[int, Set[int]] = defaultdict(set)
+        self.by_language: Dict[int, Set[int]] = defaultdict(set)
+        self.by_name: Dict[str, List[int]] = defaultdict(list)
+        self.by_profile: Dict[Tuple[int, int, int], List[int]] = defaultdict(list)
+        # (group, language) -> sorted ids, filled on first use
+        self._group_ids: Dict[Tuple[str, int], Tuple[int, ...]] = {}
+
+        group_bits = {group: MUSCLE_GROUPS.bit(group) for group in matcher.rules}
+        for entry_id, record in enumerate(self.records):
+            for group, bit in group_bits.items():
+                if record.group_mask & bit:
+                    self.by_group[group].add(entry_id)
+            for muscle_id in record.muscle_ids:
+                self.by_muscle[muscle_id].add(entry_id)
+            self.by_language[record.language].add(entry_id)
+            self.by_name[record.lowered_name].append(entry_id)
+            self.by_profile[self.profile(entry_id)].append(entry_id)
+
+        # Bitmask columns for vectorized filters, one row per record
+        self.languages: np.ndarray = np.array([-1 if record.language is None else record.language for record in self.records], dtype=np.int64)
+        self.base_ids: np.ndarray = np.array([-1 if record.base_id is None else record.base_id for record in self.records], dtype=np.int64)
+        self.group_masks: np.ndarray = mask_matrix([record.group_mask for record in self.records])
+        self.muscle_masks: np.ndarray = mask_matrix([ids_to_mask(record.muscle_ids) for record in self.records])
+        self.equipment_masks: np.ndarray = mask_matrix([record.equipment_mask for record in self.records])
+
+        logger.info("Indexed catalog version %s: %d entries in %.3fs",
+                    version, len(self.records), time.perf_counter() - start)
+
+    def select(self, language: int = ENGLISH, any_groups: int = 0, any_muscles: int = 0,
+               owned_equipment: Optional[int] = None) -> np.ndarray:
+        """
+        Evaluates every filter over the whole catalog with array operations.
+
+        Args:
+            language (int): wger language id of the translations to select.
+            any_groups (int): MUSCLE_GROUPS mask; keep records working any of these groups. 0 keeps all.
+            any_muscles (int): MUSCLES mask; keep records working any of these muscles. 0 keeps all.
+            owned_equipment (int): EQUIPMENT mask; keep records whose equipment is all owned. None keeps all.
+
+        Returns:
+            np.ndarray: A boolean selection with one entry per record.
+        """
+        selected = self.languages == language
+        if any_groups:
+            selected &= touches_any(self.group_masks, any_groups)
+        if any_muscles:
+            selected &= touches_any(self.muscle_masks, any_muscles)
+        if owned_equipment is not None:
+            selected &= subset_of(self.equipment_masks, owned_equipment)
+        return selected
+
+    def ids_matching(self, language: int = ENGLISH, any_groups: int = 0, any_muscles: int = 0,
+                     owned_equipment: Optional[int] = None) -> List[int]:
+        """
+        Returns the ids of entries passing every filter, in catalog order. See select().
+
+        Returns:
+            List[int]: Matching entry ids.
+        """
+        return np.flatnonzero(self.select(language, any_groups, any_muscles, owned_equipment)).tolist()
+
+    def profile(self, entry_id: int) -> Tuple[int, int, int]:
+        """Returns the (language, MUSCLES mask, EQUIPMENT mask) key of an entry in by_profile."""
+        record = self.records[entry_id]
+        return (record.language, ids_to_mask(record.muscle_ids), record.equipment_mask)
+
+    def id_for_name(self, name: str, language: int = ENGLISH) -> Optional[int]:
+        """
+        Returns the first entry with a name in a language.
+
+        Args:
+            name (str): Exercise name, matched case-insensitively.
+            language (int): wger language id of the translation.
+
+        Returns:
+            int: The entry id, or None if no entry has the name.
+        """
+        for entry_id in self.by_name.get(name.lower(), ()):
+            if self.records[entry_id].language == language:
+                return entry_id
+        return None
+
+    def pick_alternative(self, ids: Sequence[int], exclude_name: str, rng: random.Random, tries: int = 8) -> Optional[int]:
+        """
+        Picks a random id whose name differs from exclude_name.
+
+        Random probes take O(1) expected time unless most ids share the excluded name;
+        after `tries` failed probes the list is scanned from a random start instead.
+
+        Args:
+            ids (Sequence[int]): The ids to pick from, e.g. a by_profile list.
+            exclude_name (str): Lowered name the pick must not have.
+            rng (random.Random): Source of randomness; seed it for repeatable picks.
+            tries (int): Random probes before scanning.
+
+        Returns:
+            int: The picked id, or None if every id has the excluded name.
+        """
+        if not ids:
+            return None
+        for _ in range(tries):
+            entry_id = ids[rng.randrange(len(ids))]
+            if self.records[entry_id].lowered_name != exclude_name:
+                return entry_id
+        start = rng.randrange(len(ids))
+        for position in range(len(ids)):
+            entry_id = ids[(start + position) % len(ids)]
+            if self.records[entry_id].lowered_name != exclude_name:
+                return entry_id
+        return None
+
+    def _in_language(self, ids: Set[int], language: int) -> Set[int]:
+        return ids & self.by_language.get(language, set())
+
+    def ids_for_group(self, group: str, language: int = ENGLISH) -> List[int]:
+        """
+        Returns the ids of entries working a target group, in catalog order.
+
+        Args:
+            group (str): The target group, e.g. "leg".
+            language (int): wger language id of the translations to return.
+
+        Returns:
+            List[int]: Matching entry ids.
+        """
+        return list(self.group_ids(group, language))
+
+    def group_ids(self, group: str, language: int = ENGLISH) -> Tuple[int, ...]:
+        """
+        Returns the ids of entries working a target group, in catalog order, sorted once per index.
+
+        Args:
+            group (str): The target group, e.g. "leg".
+            language (int): wger language id of the translations to return.
+
+        Returns:
+            Tuple[int, ...]: Matching entry ids.
+        """
+        key = (group, language)
+        ids = self._group_ids.get(key)
+        if ids is None:
+            ids = self._group_ids[key] = tuple(sorted(self._in_language(self.by_group.get(group, set()), language)))
+        return ids
+
+    def ids_for_muscle(self, muscle: str, language: int = ENGLISH) -> List[int]:
+        """
+        Returns the ids of entries whose wger muscles include the given one, in catalog order.
+
+        Args:
+            muscle (str): wger muscle name, matched case-insensitively.
+            language (int): wger language id of the translations to return.
+
+        Returns:
+            List[int]: Matching entry ids.
+        """
+        muscle = muscle.lower()
+        if muscle not in MUSCLES:
+            return []
+        return sorted(self._in_language(self.by_muscle.get(MUSCLES.intern(muscle), set()), language))
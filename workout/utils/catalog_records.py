@@ -0,0 +1,107 @@
+import logging
+
+from workout.utils.keyword_matcher import KeywordMatcher, get_matcher
+from workout.utils.logger import configure_logger
+from workout.utils.vocabulary import EQUIPMENT, MUSCLES
+
+from typing import List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+ENGLISH = 2
+
+class ExerciseRecord:
+    """
+    One exercise translation from the wger catalog, normalized for matching.
+
+    Everything the recommendation code needs is computed once when the catalog is
+    loaded, so matching never touches the raw JSON again.
+
+    Attributes:
+        name (str): exercise name as shown to users
+        lowered_name (str): name in lower case, for keyword matching
+        muscles (str): comma-joined muscle names, or "No muscles targeted"
+        equipment (str): comma-joined equipment names, or "No equipment required"
+        muscle_ids (Tuple[int, ...]): MUSCLES ids of the muscles worked
+        equipment_ids (Tuple[int, ...]): EQUIPMENT ids of the equipment needed
+        group_mask (int): MUSCLE_GROUPS mask of the target groups the name matches
+        equipment_mask (int): EQUIPMENT mask of equipment_ids
+        language (int): wger language id of the translation
+        base_id (int): wger exercise base id, or None if unknown
+    """
+
+    __slots__ = ("name", "lowered_name", "muscles", "equipment", "muscle_ids", "equipment_ids",
+                 "group_mask", "equipment_mask", "language", "base_id")
+
+    def __init__(self, name: str, muscles: str, equipment: str, group_mask: int = 0, equipment_mask: int = 0,
+                 language: int = ENGLISH, muscle_ids: Tuple[int, ...] = (), equipment_ids: Tuple[int, ...] = (),
+                 base_id: Optional[int] = None):
+        self.name: str = name
+        self.lowered_name: str = name.lower()
+        self.muscles: str = muscles
+        self.equipment: str = equipment
+        self.muscle_ids: Tuple[int, ...] = muscle_ids
+        self.equipment_ids: Tuple[int, ...] = equipment_ids
+        self.group_mask: int = group_mask
+        self.equipment_mask: int = equipment_mask
+        self.language: int = language
+        self.base_id: Optional[int] = base_id
+
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, ExerciseRecord):
+            return NotImplemented
+        return all(getattr(self, slot) == getattr(other, slot) for slot in self.__slots__)
+
+    def __repr__(self) -> str:
+        return f"ExerciseRecord(name={self.name!r}, muscles={self.muscles!r}, equipment={self.equipment!r}, language={self.language})"
+
+def normalize_catalog(items: List[dict], language: Optional[int] = None,
+                      matcher: Optional[KeywordMatcher] = None) -> List[ExerciseRecord]:
+    """
+    Converts raw wger exercisebaseinfo items into ExerciseRecords.
+
+    Display strings and id tuples are built once per item and shared by all of its
+    translations.
+
+    Args:
+        items (List[dict]): The exercisebaseinfo items.
+        language (int): Only keep translations in this wger language. Keeps all when None.
+        matcher (KeywordMatcher): Classifies names into target groups. Defaults to the rules file.
+
+    Returns:
+        List[ExerciseRecord]: One record per exercise translation, in catalog order.
+    """
+    matcher = matcher or get_matcher()
+    records: List[ExerciseRecord] = []
+    for item in items:
+        if "exercises" not in item:
+            continue
+        muscle_names = [muscle["name"] for muscle in item.get("muscles", [])]
+        equipment_names = [eq["name"] for eq in item.get("equipment", [])]
+        muscles = ", ".join(muscle_names) or "No muscles targeted"
+        equipment = ", ".join(equipment_names) or "No equipment required"
+        muscle_ids = tuple(MUSCLES.intern(name.lower()) for name in muscle_names)
+        equipment_ids = tuple(EQUIPMENT.intern(name.lower()) for name in equipment_names)
+        equipment_mask = 0
+        for equipment_id in equipment_ids:
+            equipment_mask |= 1 << equipment_id
+        base_id = item.get("id")
+
+        for exercise in item["exercises"]:
+            exercise_language = exercise.get("language")
+            if language is not None and exercise_language != language:
+                continue
+            record = ExerciseRecord(
+                name=exercise.get("name", "No name available"),
+                muscles=muscles,
+                equipment=equipment,
+                equipment_mask=equipment_mask,
+                language=exercise_language,
+                muscle_ids=muscle_ids,
+                equipment_ids=equipment_ids,
+                base_id=base_id,
+            )
+            record.group_mask = matcher.group_mask(record.lowered_name)
+            records.append(record)
+    return records
@@ -0,0 +1,251 @@
+from collections import OrderedDict
+import hashlib
+import json
+import logging
+import os
+import threading
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from workout.utils.logger import configure_logger
+
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Response headers kept with a cached body
+STORED_HEADERS = ("Content-Type", "ETag", "Last-Modified")
+
+# Query parameters holding credentials, never written to disk
+SECRET_PARAMS = frozenset({"api_key", "client_id", "client_secret", "token"})
+
+def redact_url(url: str) -> str:
+    """The url without the query parameters holding credentials."""
+    parts = urlsplit(url)
+    query = [(name, value) for name, value in parse_qsl(parts.query, keep_blank_values=True) if name not in SECRET_PARAMS]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+class HttpCache:
+    """
+    On-disk cache of upstream response bodies keyed by url and query parameters.
+
+    Entries keep their ETag / Last-Modified validators so the client can revalidate with
+    a conditional request; a 304 then costs a few hundred bytes instead of the full body.
+    The total body size is capped, evicting the least recently used entries first.
+
+    Each entry is two files in the cache directory: <key>.body with the raw body and
+    <key>.json with the url (credentials removed), validators and size. The mtime of the
+    .json file records when the entry was last used.
+
+    Attributes:
+        directory (str): where entries are stored
+        max_bytes (int): cap on the total size of cached bodies
+        offline (bool): serve cached entries without contacting the upstream at all
+        hits (int): responses served from the cache without contacting the upstream
+        revalidated (int): responses served from the cache after a 304
+        misses (int): responses downloaded in full
+    """
+
+    def __init__(self, directory: str, max_bytes: int = 64 * 1024 * 1024, offline: bool = False):
+        self.directory: str = directory
+        self.max_bytes: int = max_bytes
+        self.offline: bool = offline
+        self.hits: int = 0
+        self.revalidated: int = 0
+        self.misses: int = 0
+
+        self._lru: "OrderedDict[str, int]" = OrderedDict()
+        self._total_bytes: int = 0
+        self._lock = threading.Lock()
+
+        os.makedirs(directory, exist_ok=True)
+        self._load_index()
+
+    def _load_index(self) -> None:
+        entries = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith(".json"):
+                continue
+            key = filename[:-len(".json")]
+            try:
+                with open(self._meta_path(key)) as f:
+                    meta = json.load(f)
+                entries.append((os.path.getmtime(self._meta_path(key)), key, meta["size"]))
+            except (OSError, ValueError, KeyError):
+                self._remove_files(key)
+        for _, key, size in sorted(entries):
+            self._lru[key] = size
+            self._total_bytes += size
+        logger.info("Loaded HTTP cache %s with %d entries (%d bytes)", self.directory, len(self._lru), self._total_bytes)
+
+    def _meta_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _body_path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.body")
+
+    def _remove_files(self, key: str) -> None:
+        for path in (self._meta_path(key), self._body_path(key)):
+            if os.path.exists(path):
+                os.remove(path)
+
+    @staticmethod
+    def key(url: str, params: Optional[dict] = None) -> str:
+        """
+        Builds the cache key for a request.
+
+        Args:
+            url (str): The request url.
+            params (dict): The query parameters.
+
+        Returns:
+            str: A hex digest of the url and sorted parameters.
+        """
+        query = urlencode(sorted((params or {}).items()), doseq=True)
+        return hashlib.sha1(f"{url}?{query}".encode("utf-8")).hexdigest()
+
+######################################################
+#
+#    Entries
+#
+######################################################
+
+    def lookup(self, key: str) -> Optional[dict]:
+        """
+        Returns the metadata of a cached entry and marks it recently used.
+
+        Args:
+            key (str): The cache key.
+
+        Returns:
+            dict: The entry metadata (url, headers, size), or None if not cached.
+        """
+        with self._lock:
+            if key not in self._lru:
+                return None
+            self._lru.move_to_end(key)
+        try:
+            with open(self._meta_path(key)) as f:
+                meta = json.load(f)
+            # Touching the file records the use without rewriting it
+            os.utime(self._meta_path(key))
+        except (OSError, ValueError):
+            with self._lock:
+                self._drop(key)
+            return None
+        return meta
+
+    def conditional_headers(self, meta: dict) -> Dict[str, str]:
+        """
+        Builds the validator headers for revalidating a cached entry.
+
+        Args:
+            meta (dict): Entry metadata from lookup().
+
+        Returns:
+            Dict[str, str]: If-None-Match and/or If-Modified-Since headers.
+        """
+        headers = {}
+        if meta["headers"].get("ETag"):
+            headers["If-None-Match"] = meta["headers"]["ETag"]
+        if meta["headers"].get("Last-Modified"):
+            headers["If-Modified-Since"] = meta["headers"]["Last-Modified"]
+        return headers
+
+    def response(self, key: str, meta: dict) -> Optional[requests.Response]:
+        """
+        Rebuilds a 200 response from a cached entry.
+
+        Args:
+            key (str): The cache key.
+            meta (dict): Entry metadata from lookup().
+
+        Returns:
+            requests.Response: The cached response, or None if the body is gone.
+        """
+        try:
+            with open(self._body_path(key), "rb") as f:
+                body = f.read()
+        except OSError:
+            with self._lock:
+                self._drop(key)
+            return None
+        response = requests.Response()
+        response.status_code = 200
+        response._content = body
+        response.headers = CaseInsensitiveDict(meta["headers"])
+        response.url = meta["url"]
+        response.encoding = "utf-8"
+        return response
+
+    def store(self, key: str, response: requests.Response) -> bool:
+        """
+        Stores a 200 response that carries validators.
+
+        Args:
+            key (str): The cache key.
+            response (requests.Response): The response to store.
+
+        Returns:
+            bool: True if the response was stored.
+        """
+        headers = {name: response.headers.get(name) for name in STORED_HEADERS if isinstance(response.headers.get(name), str)}
+        if "ETag" not in headers and "Last-Modified" not in headers:
+            return False
+        body = response.content
+        if len(body) > self.max_bytes:
+            return False
+
+        meta = {"url": redact_url(response.url), "headers": headers, "size": len(body)}
+        with self._lock:
+            if key in self._lru:
+                self._total_bytes -= self._lru.pop(key)
+            tmp_path = f"{self._body_path(key)}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(body)
+            os.replace(tmp_path, self._body_path(key))
+            self._write_meta(key, meta)
+            self._lru[key] = len(body)
+            self._total_bytes += len(body)
+            self._evict()
+        return True
+
+    def _write_meta(self, key: str, meta: dict) -> None:
+        tmp_path = f"{self._meta_path(key)}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(meta, f)
+        os.replace(tmp_path, self._meta_path(key))
+
+    def _drop(self, key: str) -> None:
+        if key in self._lru:
+            self._total_bytes -= self._lru.pop(key)
+        self._remove_files(key)
+
+    def _evict(self) -> None:
+        while self._total_bytes > self.max_bytes and self._lru:
+            key, _ = next(iter(self._lru.items()))
+            self._drop(key)
+            logger.info("Evicted HTTP cache entry %s", key)
+
+    def record(self, outcome: str) -> None:
+        """
+        Counts how a response was served.
+
+        Args:
+            outcome (str): "hits", "revalidated" or "misses".
+        """
+        with self._lock:
+            setattr(self, outcome, getattr(self, outcome) + 1)
+
+    def stats(self) -> dict:
+        """
+        Returns the cache counters and size.
+
+        Returns:
+            dict: hits, revalidated, misses, entries and bytes.
+        """
+        return {"hits": self.hits, "revalidated": self.revalidated, "misses": self.misses,
+                "entries": len(self._lru), "bytes": self._total_bytes}
@@ -0,0 +1,328 @@
+from collections import deque
+import logging
+import os
+import random
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from workout.utils.http_cache import HttpCache
+from workout.utils.logger import configure_logger
+from workout.utils.single_flight import SingleFlight, SingleFlightTimeout
+
+from typing import Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Responses worth retrying; anything else is returned to the caller as is
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class HostStats:
+    """
+    Request counters and recent latencies for one upstream host.
+
+    Attributes:
+        requests (int): number of requests sent, including retries
+        errors (int): number of requests that raised or returned a retryable status
+        retries (int): number of retries
+        latencies (Deque[float]): latencies in seconds of the most recent requests
+    """
+
+    def __init__(self, window: int = 512):
+        self.requests: int = 0
+        self.errors: int = 0
+        self.retries: int = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, error: bool) -> None:
+        with self._lock:
+            self.requests += 1
+            self.latencies.append(seconds)
+            if error:
+                self.errors += 1
+
+    def record_retry(self) -> None:
+        with self._lock:
+            self.retries += 1
+
+    def snapshot(self) -> dict:
+        """
+        Summarizes the counters and latency percentiles in milliseconds.
+
+        Returns:
+            dict: requests, errors, retries, and avg/p50/p95/max latency in ms.
+        """
+        with self._lock:
+            latencies = sorted(self.latencies)
+            summary = {"requests": self.requests, "errors": self.errors, "retries": self.retries}
+        if latencies:
+            summary.update({
+                "avg_ms": round(1000 * sum(latencies) / len(latencies), 1),
+                "p50_ms": round(1000 * latencies[len(latencies) // 2], 1),
+                "p95_ms": round(1000 * latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], 1),
+                "max_ms": round(1000 * latencies[-1], 1),
+            })
+        return summary
+
+class UpstreamClient:
+    """
+    Shared HTTP client for the upstream APIs (wger and Jamendo).
+
+    Keeps one pooled keep-alive session per host, applies connect/read timeouts to every
+    request, retries connection errors and retryable statuses with jittered exponential
+    backoff, and caps the number of requests in flight across all threads. With an
+    HttpCache, bodies are kept on disk and revalidated with conditional requests.
+    Concurrent get_json calls for the same url and parameters share one request.
+
+    Attributes:
+        connect_timeout (float): seconds to wait for a connection
+        read_timeout (float): seconds to wait for response data
+        retries (int): retries per request after the first attempt
+        backoff (float): base backoff in seconds, doubled on each retry
+        pool_size (int): keep-alive connections kept per host
+        max_in_flight (int): maximum concurrent upstream requests
+        cache (HttpCache): on-disk response cache, or None to always download
+        flight_wait (float): seconds a get_json call waits on an identical call in progress
+    """
+
+    def __init__(self, connect_timeout: float = 3.05, read_timeout: float = 15.0, retries: int = 2,
+                 backoff: float = 0.25, pool_size: int = 10, max_in_flight: int = 16,
+                 cache: Optional[HttpCache] = None, flight_wait: float = 30.0):
+        self.connect_timeout: float = connect_timeout
+        self.read_timeout: float = read_timeout
+        self.retries: int = retries
+        self.backoff: float = backoff
+        self.pool_size: int = pool_size
+        self.max_in_flight: int = max_in_flight
+        self.cache: Optional[HttpCache] = cache
+        self.flight_wait: float = flight_wait
+
+        self._sessions: Dict[str, requests.Session] = {}
+        self._stats: Dict[str, HostStats] = {}
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        self._flights = SingleFlight()
+
+    def _host(self, url: str) -> str:
+        return urlparse(url).netloc
+
+    def _session(self, host: str) -> requests.Session:
+        session = self._sessions.get(host)
+        if session is None:
+            with self._lock:
+                session = self._sessions.get(host)
+                if session is None:
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                    self._sessions[host] = session
+                    self._stats[host] = HostStats()
+        return session
+
+    def _send(self, session: requests.Session, url: str, params: Optional[dict], headers: Optional[dict]) -> requests.Response:
+        if not self._in_flight.acquire(timeout=self.connect_timeout + self.read_timeout):
+            raise requests.ConnectionError(f"Too many upstream requests in flight for {url}")
+        try:
+            return session.get(url, params=params, headers=headers, timeout=(self.connect_timeout, self.read_timeout))
+        finally:
+            self._in_flight.release()
+
+    def _fetch(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+               retries: Optional[int] = None) -> requests.Response:
+        """
+        Sends a GET request, retrying transient failures.
+
+        Args:
+            url (str): The url to request.
+            params (dict): Query parameters.
+            headers (dict): Request headers.
+            retries (int): Overrides the client's retry count for this request.
+
+        Returns:
+            requests.Response: The response. Retryable statuses are returned once retries run out.
+
+        Raises:
+            requests.RequestException: If the request still fails after all retries.
+        """
+        host = self._host(url)
+        session = self._session(host)
+        stats = self._stats[host]
+        retries = self.retries if retries is None else retries
+
+        attempt = 0
+        while True:
+            start = time.perf_counter()
+            try:
+                response = self._send(session, url, params, headers)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                stats.record(time.perf_counter() - start, error=True)
+                if attempt >= retries:
+                    raise
+                logger.warning("Retrying %s after error: %s", host, str(e))
+            else:
+                retryable = response.status_code in RETRY_STATUSES
+                stats.record(time.perf_counter() - start, error=retryable)
+                if not retryable or attempt >= retries:
+                    return response
+                logger.warning("Retrying %s after status %s", host, response.status_code)
+
+            stats.record_retry()
+            # Full jitter keeps retries from many workers from arriving in lockstep
+            time.sleep(random.uniform(0, self.backoff * (2 ** attempt)))
+            attempt += 1
+
+    def get(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+            retries: Optional[int] = None) -> requests.Response:
+        """
+        Sends a GET request, revalidating a cached copy when there is one.
+
+        When the upstream answers 304 the cached body is returned as a 200. If the
+        upstream cannot be reached, or the cache is offline, a cached copy is served
+        as is.
+
+        Args:
+            url (str): The url to request.
+            params (dict): Query parameters.
+            headers (dict): Request headers.
+            retries (int): Overrides the client's retry count for this request.
+
+        Returns:
+            requests.Response: The response. Retryable statuses are returned once retries run out.
+
+        Raises:
+            requests.RequestException: If the request still fails after all retries and nothing is cached.
+        """
+        cache = self.cache
+        if cache is None:
+            return self._fetch(url, params, headers, retries)
+
+        key = cache.key(url, params)
+        meta = cache.lookup(key)
+        if cache.offline:
+            cached = cache.response(key, meta) if meta is not None else None
+            if cached is None:
+                raise requests.ConnectionError(f"Offline and {url} is not cached")
+            cache.record("hits")
+            return cached
+
+        request_headers = dict(headers or {})
+        if meta is not None:
+            request_headers.update(cache.conditional_headers(meta))
+        try:
+            response = self._fetch(url, params, request_headers, retries)
+        except (requests.ConnectionError, requests.Timeout) as e:
+            cached = cache.response(key, meta) if meta is not None else None
+            if cached is None:
+                raise
+            logger.warning("Serving cached %s after error: %s", url, str(e))
+            cache.record("hits")
+            return cached
+
+        if response.status_code == 304:
+            cached = cache.response(key, meta) if meta is not None else None
+            if cached is not None:
+                cache.record("revalidated")
+                return cached
+            # The cached body disappeared under us; ask again without validators
+            response = self._fetch(url, params, headers, retries)
+
+        if response.status_code == 200:
+            cache.record("misses")
+            cache.store(key, response)
+        return response
+
+    def get_json(self, url: str, params: Optional[dict] = None, headers: Optional[dict] = None,
+                 retries: Optional[int] = None) -> dict:
+        """
+        Sends a GET request and decodes the JSON body.
+
+        Callers asking for the same url and parameters while a request is in progress
+        wait for it and share the decoded body. A caller that waits longer than
+        flight_wait is served the cached copy if there is one.
+
+        Args:
+            url (str): The url to request.
+            params (dict): Query parameters.
+            headers (dict): Request headers.
+            retries (int): Overrides the client's retry count for this request.
+
+        Returns:
+            dict: The decoded body. It may be shared with other callers, so do not modify it.
+
+        Raises:
+            requests.RequestException: If the request fails or returns an error status.
+        """
+        def fetch() -> dict:
+            response = self.get(url, params=params, headers=headers, retries=retries)
+            response.raise_for_status()
+            return response.json()
+
+        key = HttpCache.key(url, params)
+        try:
+            return self._flights.do(key, fetch, timeout=self.flight_wait)
+        except SingleFlightTimeout:
+            meta = self.cache.lookup(key) if self.cache is not None else None
+            cached = self.cache.response(key, meta) if meta is not None else None
+            if cached is None:
+                raise
+            logger.warning("Serving cached %s while another request is still in flight", url)
+            self.cache.record("hits")
+            return cached.json()
+
+    def stats(self) -> Dict[str, dict]:
+        """
+        Returns request counters and latency percentiles per upstream host.
+
+        Returns:
+            Dict[str, dict]: Host -> HostStats.snapshot().
+        """
+        return {host: stats.snapshot() for host, stats in list(self._stats.items())}
+
+    def flight_stats(self) -> dict:
+        """
+        Returns how many get_json calls were coalesced.
+
+        Returns:
+            dict: SingleFlight.stats().
+        """
+        return self._flights.stats()
+
+_client: Optional[UpstreamClient] = None
+_client_lock = threading.Lock()
+
+def get_client() -> UpstreamClient:
+    """
+    Returns the process-wide upstream client, configured from the environment on first use.
+
+    Returns:
+        UpstreamClient: The shared client.
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                cache_dir = os.getenv("UPSTREAM_CACHE_DIR", "db/http_cache")
+                cache = None
+                if cache_dir:
+                    cache = HttpCache(
+                        cache_dir,
+                        max_bytes=int(os.getenv("UPSTREAM_CACHE_MAX_BYTES", 64 * 1024 * 1024)),
+                        offline=os.getenv("UPSTREAM_OFFLINE", "false").lower() == "true",
+                    )
+                _client = UpstreamClient(
+                    connect_timeout=float(os.getenv("UPSTREAM_CONNECT_TIMEOUT", 3.05)),
+                    read_timeout=float(os.getenv("UPSTREAM_READ_TIMEOUT", 15)),
+                    retries=int(os.getenv("UPSTREAM_RETRIES", 2)),
+                    backoff=float(os.getenv("UPSTREAM_BACKOFF", 0.25)),
+                    pool_size=int(os.getenv("UPSTREAM_POOL_SIZE", 10)),
+                    max_in_flight=int(os.getenv("UPSTREAM_MAX_IN_FLIGHT", 16)),
+                    cache=cache,
+                    flight_wait=float(os.getenv("UPSTREAM_FLIGHT_WAIT", 30)),
+                )
+    return _client
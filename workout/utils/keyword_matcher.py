@@ -0,0 +1,167 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+from workout.utils.logger import configure_logger
+from workout.utils.vocabulary import MUSCLE_GROUPS
+
+from typing import Dict, FrozenSet, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Target group -> keywords in an exercise name that mark it as working that group
+MUSCLE_GROUP_RULES_PATH = os.getenv(
+    "MUSCLE_GROUP_RULES_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "rules", "muscle_group_keywords.json"),
+)
+
+class KeywordMatcher:
+    """
+    Classifies exercise names into target groups with one regex scan.
+
+    All keywords are compiled into a single alternation inside a lookahead, so the
+    scan reports a match at every position instead of consuming the text; keywords
+    overlapping each other ("run" inside "running") are all found. At each position
+    the longest keyword wins, and every keyword contained in it is added back from a
+    precomputed substring closure.
+
+    Attributes:
+        rules (Dict[str, Tuple[str, ...]]): target group -> keywords
+        version (str): content hash of the rules
+    """
+
+    def __init__(self, rules: Dict[str, Sequence[str]]):
+        self.rules: Dict[str, tuple] = {group: tuple(keyword.lower() for keyword in keywords) for group, keywords in rules.items()}
+        self.version: str = hashlib.sha1(json.dumps(self.rules, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+        keyword_groups: Dict[str, int] = {}
+        for group, keywords in self.rules.items():
+            bit = 1 << MUSCLE_GROUPS.intern(group)
+            for keyword in keywords:
+                keyword_groups[keyword] = keyword_groups.get(keyword, 0) | bit
+
+        keywords = sorted(keyword_groups, key=lambda keyword: (-len(keyword), keyword))
+        self._contained: Dict[str, FrozenSet[str]] = {
+            keyword: frozenset(other for other in keywords if other in keyword) for keyword in keywords
+        }
+        self._masks: Dict[str, int] = {}
+        for keyword, contained in self._contained.items():
+            mask = 0
+            for other in contained:
+                mask |= keyword_groups[other]
+            self._masks[keyword] = mask
+
+        self._pattern: Optional[re.Pattern] = None
+        if keywords:
+            self._pattern = re.compile("(?=(" + "|".join(re.escape(keyword) for keyword in keywords) + "))")
+
+    def keywords(self, lowered_name: str) -> FrozenSet[str]:
+        """
+        Returns every keyword that appears in a name.
+
+        Args:
+            lowered_name (str): The exercise name in lower case.
+
+        Returns:
+            FrozenSet[str]: The keywords found.
+        """
+        if self._pattern is None:
+            return frozenset()
+        found = set()
+        for match in self._pattern.finditer(lowered_name):
+            found |= self._contained[match.group(1)]
+        return frozenset(found)
+
+    def group_mask(self, lowered_name: str) -> int:
+        """
+        Classifies a name against every target group at once.
+
+        Args:
+            lowered_name (str): The exercise name in lower case.
+
+        Returns:
+            int: MUSCLE_GROUPS mask of every group whose keywords appear in the name.
+        """
+        if self._pattern is None:
+            return 0
+        mask = 0
+        for match in self._pattern.finditer(lowered_name):
+            mask |= self._masks[match.group(1)]
+        return mask
+
+def load_rules(path: str) -> Dict[str, Sequence[str]]:
+    """
+    Reads target group keyword rules from a JSON file.
+
+    Args:
+        path (str): Path to a JSON object mapping each group to a list of keywords.
+
+    Returns:
+        Dict[str, Sequence[str]]: The rules.
+
+    Raises:
+        ValueError: If the file is not a mapping of groups to keyword lists.
+        OSError: If the file cannot be read.
+    """
+    with open(path) as f:
+        rules = json.load(f)
+    if not isinstance(rules, dict) or not all(
+            isinstance(keywords, list) and all(isinstance(keyword, str) and keyword for keyword in keywords)
+            for keywords in rules.values()):
+        raise ValueError(f"{path} must map each muscle group to a list of keywords")
+    return rules
+
+_matcher: Optional[KeywordMatcher] = None
+_matcher_mtime: Optional[float] = None
+_matcher_lock = threading.Lock()
+
+def get_matcher() -> KeywordMatcher:
+    """
+    Returns the matcher for the rules file, recompiling it when the file changes.
+
+    A rules file that fails to load is logged and the previous rules are kept.
+
+    Returns:
+        KeywordMatcher: The current matcher.
+
+    Raises:
+        OSError, ValueError: If the rules file cannot be loaded and no rules were loaded before.
+    """
+    global _matcher, _matcher_mtime
+    try:
+        mtime = os.path.getmtime(MUSCLE_GROUP_RULES_PATH)
+    except OSError:
+        if _matcher is not None:
+            return _matcher
+        raise
+    if _matcher is not None and mtime == _matcher_mtime:
+        return _matcher
+
+    with _matcher_lock:
+        if _matcher is None or mtime != _matcher_mtime:
+            try:
+                matcher = KeywordMatcher(load_rules(MUSCLE_GROUP_RULES_PATH))
+            except (OSError, ValueError) as e:
+                if _matcher is None:
+                    raise
+                logger.error("Keeping muscle group rules version %s: %s", _matcher.version, str(e))
+                _matcher_mtime = mtime
+                return _matcher
+            _matcher, _matcher_mtime = matcher, mtime
+            logger.info("Loaded muscle group rules version %s from %s", matcher.version, MUSCLE_GROUP_RULES_PATH)
+    return _matcher
+
+def reload_rules() -> KeywordMatcher:
+    """
+    Forces the rules file to be read again.
+
+    Returns:
+        KeywordMatcher: The recompiled matcher.
+    """
+    global _matcher_mtime
+    _matcher_mtime = None
+    return get_matcher()
@@ -0,0 +1,199 @@
+from dataclasses import dataclass, field
+import logging
+import time
+
+import numpy as np
+
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.catalog_records import ENGLISH, ExerciseRecord
+from workout.utils.logger import configure_logger
+from workout.utils.ranking import popcount
+from workout.utils.vocabulary import MUSCLE_GROUPS
+
+from typing import Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Minutes one set takes, including rest: plain, with equipment to set up, working
+# several muscles, and cardio, which is done as one longer block
+SET_MINUTES = 3
+EQUIPMENT_MINUTES = 1
+COMPOUND_MINUTES = 1
+CARDIO_SET_MINUTES = 10
+
+# Value of a set per wanted target group the exercise works; every wger muscle worked adds one
+GROUP_VALUE = 10
+
+MAX_SETS = 3
+MAX_PLAN_MINUTES = 600
+# Best candidates kept for the knapsack, so plans stay fast on large catalogs
+MAX_CANDIDATES = 300
+
+@dataclass
+class PlanItem:
+    name: str
+    sets: int
+    minutes: int
+    muscle_group: str
+    equipment: str
+
+@dataclass
+class Plan:
+    items: List[PlanItem] = field(default_factory=list)
+    total_minutes: int = 0
+    budget_minutes: int = 0
+    value: int = 0
+
+def set_minutes(record: ExerciseRecord) -> int:
+    """
+    Estimates how long one set of an exercise takes, rest included.
+
+    Args:
+        record (ExerciseRecord): The catalog record.
+
+    Returns:
+        int: Whole minutes.
+    """
+    if "cardio" in MUSCLE_GROUPS and record.group_mask & MUSCLE_GROUPS.bit("cardio"):
+        return CARDIO_SET_MINUTES
+    minutes = SET_MINUTES
+    if record.equipment_mask:
+        minutes += EQUIPMENT_MINUTES
+    if len(record.muscle_ids) > 1:
+        minutes += COMPOUND_MINUTES
+    return minutes
+
+def set_value(record: ExerciseRecord, group_mask: int) -> int:
+    """Value of one set: GROUP_VALUE per wanted group worked, plus one per wger muscle."""
+    return GROUP_VALUE * popcount(record.group_mask & group_mask) + len(record.muscle_ids)
+
+def build_plan(index: CatalogIndex, groups: Iterable[str], minutes: int, equipment_mask: Optional[int] = None,
+               max_sets: int = MAX_SETS, language: int = ENGLISH) -> Plan:
+    """
+    Fills a time budget with exercises working the wanted groups.
+
+    The fill is solved as a bounded knapsack: every distinct exercise may be done up
+    to max_sets times, each set costing set_minutes and earning set_value. Copies are
+    split in powers of two, turning it into a 0/1 knapsack that is solved with one
+    vectorized pass over the minute budget per split item.
+
+    Args:
+        index (CatalogIndex): The catalog to pick from.
+        groups (Iterable[str]): Target groups to work. Unknown groups are ignored.
+        minutes (int): The time budget in whole minutes.
+        equipment_mask (int): EQUIPMENT mask of the equipment owned. None allows any equipment.
+        max_sets (int): Most sets of one exercise.
+        language (int): wger language id of the translations to pick from.
+
+    Returns:
+        Plan: The exercises in catalog order with their sets and minutes.
+
+    Raises:
+        ValueError: If minutes is negative or above MAX_PLAN_MINUTES, or max_sets is below 1.
+    """
+    if not 0 <= minutes <= MAX_PLAN_MINUTES:
+        raise ValueError(f"Invalid workout time {minutes}. Minutes must be between 0 and {MAX_PLAN_MINUTES}.")
+    if max_sets < 1:
+        raise ValueError("max_sets must be at least 1.")
+
+    start = time.perf_counter()
+    group_mask = MUSCLE_GROUPS.known_mask(map(str.lower, groups))
+    plan = Plan(budget_minutes=minutes)
+    if not group_mask or not minutes:
+        return plan
+
+    # One candidate per distinct name, the best valued per minute first
+    candidates = []
+    seen = set()
+    for entry_id in index.ids_matching(language, any_groups=group_mask, owned_equipment=equipment_mask):
+        record = index.records[entry_id]
+        if record.lowered_name in seen:
+            continue
+        seen.add(record.lowered_name)
+        cost = set_minutes(record)
+        if cost <= minutes:
+            candidates.append((entry_id, cost, set_value(record, group_mask)))
+    candidates.sort(key=lambda candidate: (-candidate[2] / candidate[1], candidate[0]))
+    candidates = candidates[:MAX_CANDIDATES]
+
+    # Binary splitting: copies of 1, 2, 4, ... sets and a remainder cover every count up to max_sets
+    split = []
+    for candidate, (entry_id, cost, value) in enumerate(candidates):
+        left, copies = max_sets, 1
+        while left > 0:
+            take = min(copies, left)
+            if cost * take <= minutes:
+                split.append((candidate, take, cost * take, value * take))
+            left -= take
+            copies *= 2
+
+    best = np.zeros(minutes + 1, dtype=np.int64)
+    taken = np.zeros((len(split), minutes + 1), dtype=bool)
+    for row, (_, _, cost, value) in enumerate(split):
+        with_item = best[:-cost] + value
+        improves = with_item > best[cost:]
+        taken[row, cost:] = improves
+        best[cost:] = np.where(improves, with_item, best[cost:])
+
+    sets = [0] * len(candidates)
+    budget = int(np.argmax(best))
+    plan.value = int(best[budget])
+    for row in range(len(split) - 1, -1, -1):
+        if taken[row, budget]:
+            candidate, take, cost, _ = split[row]
+            sets[candidate] += take
+            budget -= cost
+
+    chosen = sorted((entry_id, sets[candidate], cost) for candidate, (entry_id, cost, _) in enumerate(candidates) if sets[candidate])
+    for entry_id, count, cost in chosen:
+        record = index.records[entry_id]
+        plan.items.append(PlanItem(record.name, count, count * cost, record.muscles, record.equipment))
+    plan.total_minutes = sum(item.minutes for item in plan.items)
+    logger.info("Built a %d minute plan with %d exercises from %d candidates in %.1fms",
+                plan.total_minutes, len(plan.items), len(candidates), 1000 * (time.perf_counter() - start))
+    return plan
+
+def split_groups(groups: List[str], sessions: int) -> List[List[str]]:
+    """
+    Spreads target groups over the sessions of a week, round robin.
+
+    With fewer groups than sessions the groups are cycled, one per session, so
+    consecutive sessions work different groups.
+
+    Args:
+        groups (List[str]): The target groups.
+        sessions (int): Sessions in the week.
+
+    Returns:
+        List[List[str]]: The groups of each session; empty lists when there are no groups.
+    """
+    if not groups:
+        return [[] for _ in range(sessions)]
+    if len(groups) < sessions:
+        return [[groups[session % len(groups)]] for session in range(sessions)]
+    return [groups[session::sessions] for session in range(sessions)]
+
+def build_week(index: CatalogIndex, groups: List[str], sessions: int, minutes: int,
+               equipment_mask: Optional[int] = None, language: int = ENGLISH) -> List[Plan]:
+    """
+    Builds one plan per session of a week, each filling the same time budget.
+
+    Args:
+        index (CatalogIndex): The catalog to pick from.
+        groups (List[str]): Target groups, spread over the sessions with split_groups.
+        sessions (int): Sessions in the week.
+        minutes (int): The time budget of each session.
+        equipment_mask (int): EQUIPMENT mask of the equipment owned. None allows any equipment.
+        language (int): wger language id of the translations to pick from.
+
+    Returns:
+        List[Plan]: The plan of each session.
+
+    Raises:
+        ValueError: If sessions is below 1 or minutes is out of range.
+    """
+    if sessions < 1:
+        raise ValueError("sessions must be at least 1.")
+    return [build_plan(index, session_groups, minutes, equipment_mask, language=language)
+            for session_groups in split_groups(groups, sessions)]
@@ -0,0 +1,99 @@
+from dataclasses import dataclass, field
+import logging
+import random
+import time
+
+import numpy as np
+
+from workout.utils.logger import configure_logger
+from workout.utils.track_index import TrackIndex
+
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+MAX_PLAYLIST_MINUTES = 600
+# Seconds a playlist may run past the session, so a session can be covered rather than cut short
+MAX_OVERRUN_SECONDS = 120
+# Tracks considered per playlist and wall time the search may take
+MAX_PLAYLIST_CANDIDATES = 2000
+PLAYLIST_TIME_BUDGET = 0.2
+
+@dataclass
+class Playlist:
+    songs: List[str] = field(default_factory=list)
+    total_seconds: int = 0
+    target_seconds: int = 0
+    complete: bool = True
+
+def build_playlist(index: TrackIndex, minutes: int, rng: Optional[random.Random] = None,
+                   max_overrun: int = MAX_OVERRUN_SECONDS, time_budget: float = PLAYLIST_TIME_BUDGET) -> Playlist:
+    """
+    Picks tracks whose total duration best fits a session, as a subset sum over durations.
+
+    Durations are whole seconds, so the sums reachable with the tracks seen so far fit
+    in one boolean array of target + max_overrun entries, updated with one vectorized
+    shift per track; each sum remembers the track that first reached it, which is
+    enough to rebuild the playlist. The total closest to the target wins, ties going
+    to the longer playlist so the session is covered. Tracks are visited in an order
+    drawn from rng, so different seeds give different playlists of the same fit. Once
+    time_budget seconds have passed the best playlist of the tracks seen so far is
+    returned, marked incomplete.
+
+    Args:
+        index (TrackIndex): The tracks to pick from.
+        minutes (int): Length of the session.
+        rng (random.Random): Orders the tracks. Defaults to catalog order.
+        max_overrun (int): Seconds the playlist may run past the session.
+        time_budget (float): Seconds the search may take.
+
+    Returns:
+        Playlist: The songs in playing order with their total length.
+
+    Raises:
+        ValueError: If minutes is not between 1 and MAX_PLAYLIST_MINUTES.
+    """
+    if not 1 <= minutes <= MAX_PLAYLIST_MINUTES:
+        raise ValueError(f"Invalid session length {minutes}. Minutes must be between 1 and {MAX_PLAYLIST_MINUTES}.")
+
+    start = time.perf_counter()
+    target = minutes * 60
+    capacity = target + max(0, max_overrun)
+    candidates = list(index.span(1, capacity))
+    if rng is not None:
+        rng.shuffle(candidates)
+    candidates = candidates[:MAX_PLAYLIST_CANDIDATES]
+
+    reachable = np.zeros(capacity + 1, dtype=bool)
+    reachable[0] = True
+    via = np.full(capacity + 1, -1, dtype=np.int64)
+    complete = True
+    for visited, position in enumerate(candidates):
+        if time.perf_counter() - start > time_budget:
+            complete = False
+            break
+        duration = index.durations[position]
+        shifted = reachable[:-duration].copy()
+        new = shifted & ~reachable[duration:]
+        via[duration:][new] = visited
+        reachable[duration:] |= shifted
+        if reachable[target]:
+            break
+
+    sums = np.flatnonzero(reachable)
+    # Closest to the target, then longest
+    total = int(sums[np.lexsort((-sums, np.abs(sums - target)))[0]])
+    picked = []
+    remaining = total
+    while remaining:
+        visited = int(via[remaining])
+        picked.append(candidates[visited])
+        remaining -= index.durations[candidates[visited]]
+    picked.reverse()
+
+    playlist = Playlist([index.labels[position] for position in picked], total, target, complete)
+    logger.info("Built a %ds playlist of %d songs for a %ds session from %d candidates in %.1fms%s",
+                total, len(picked), target, len(candidates), 1000 * (time.perf_counter() - start),
+                "" if complete else " (time budget reached)")
+    return playlist
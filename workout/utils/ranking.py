@@ -0,0 +1,94 @@
+import heapq
+import math
+
+import numpy as np
+
+from workout.utils.catalog_index import WORD_BITS
+
+from typing import Callable, Hashable, List, Optional
+
+def popcount(mask: int) -> int:
+    return bin(mask).count("1")
+
+def row_to_mask(row: np.ndarray) -> int:
+    """Joins one row of a mask_matrix back into a single mask."""
+    mask = 0
+    for word, value in enumerate(row.tolist()):
+        mask |= int(value) << (WORD_BITS * word)
+    return mask
+
+def score_by_mask(matrix: np.ndarray, ids: np.ndarray, score: Callable[[int], float]) -> np.ndarray:
+    """
+    Scores rows of a mask_matrix with a function of their mask.
+
+    The function runs once per distinct mask rather than once per row; catalogs hold
+    few distinct group and equipment combinations.
+
+    Args:
+        matrix (np.ndarray): The packed masks, see mask_matrix.
+        ids (np.ndarray): The rows to score.
+        score (Callable[[int], float]): Scores one mask.
+
+    Returns:
+        np.ndarray: One float per id.
+    """
+    if len(ids) == 0:
+        return np.zeros(0)
+    unique, inverse = np.unique(matrix[ids], axis=0, return_inverse=True)
+    values = np.array([score(row_to_mask(row)) for row in unique], dtype=float)
+    return values[inverse.reshape(-1)]
+
+def coverage_scores(matrix: np.ndarray, ids: np.ndarray, wanted: int) -> np.ndarray:
+    """Fraction of the wanted bits each row has; 0 for every row when nothing is wanted."""
+    wanted_count = popcount(wanted)
+    if not wanted_count:
+        return np.zeros(len(ids))
+    return score_by_mask(matrix, ids, lambda mask: popcount(mask & wanted) / wanted_count)
+
+def fit_scores(matrix: np.ndarray, ids: np.ndarray, owned: int) -> np.ndarray:
+    """Fraction of each row's bits that are owned; 1 for rows with no bits."""
+    return score_by_mask(matrix, ids, lambda mask: popcount(mask & owned) / popcount(mask) if mask else 1.0)
+
+def top_k(ids: np.ndarray, scores: np.ndarray, key: Callable[[int], Hashable], limit: Optional[int],
+          offset: int = 0, penalty: Optional[Callable[[int], float]] = None) -> List[int]:
+    """
+    Selects the best scoring ids, skipping ids whose key was already selected.
+
+    The candidates are heapified once and only popped until the page is full, so the
+    cost is linear in the candidates plus log-linear in the page. Ties keep id order.
+    Penalties are applied lazily: a penalized id reaching the top is pushed back with
+    its lowered score, so only ids that would otherwise be selected are checked.
+
+    Args:
+        ids (np.ndarray): The candidate ids.
+        scores (np.ndarray): Score of each candidate; higher is better.
+        key (Callable[[int], Hashable]): Candidates with equal keys are duplicates.
+        limit (int): Page size. None returns every distinct candidate.
+        offset (int): Distinct candidates to skip before the page.
+        penalty (Callable[[int], float]): Non-negative amount taken off a candidate's
+            score; math.inf drops the candidate.
+
+    Returns:
+        List[int]: The ids on the page, best first.
+    """
+    heap = list(zip((-scores).tolist(), ids.tolist()))
+    heapq.heapify(heap)
+    wanted = None if limit is None else offset + limit
+    seen = set()
+    penalized = set()
+    ranked: List[int] = []
+    while heap and (wanted is None or len(ranked) < wanted):
+        negative_score, entry_id = heapq.heappop(heap)
+        entry_key = key(entry_id)
+        if entry_key in seen:
+            continue
+        if penalty is not None and entry_id not in penalized:
+            cost = penalty(entry_id)
+            if cost:
+                penalized.add(entry_id)
+                if cost != math.inf:
+                    heapq.heappush(heap, (negative_score + cost, entry_id))
+                continue
+        seen.add(entry_key)
+        ranked.append(entry_id)
+    return ranked[offset:]
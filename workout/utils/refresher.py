@@ -0,0 +1,172 @@
+import logging
+import random
+import threading
+import time
+
+from workout.utils.logger import configure_logger
+
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+class RefreshJob:
+    """
+    One dataset kept fresh by the BackgroundRefresher.
+
+    Both callables return the dataset, which must have `version` and `fetched_at`
+    attributes. `current` returns the copy being served (downloading only if there is
+    none); `refresh` downloads a new copy, swaps it in and raises on failure.
+
+    Attributes:
+        name (str): name reported in the status
+        current (Callable): returns the copy being served
+        refresh (Callable): downloads and swaps in a new copy
+        ttl (float): seconds a copy is served before requests refresh it themselves
+        ahead (float): fraction of the TTL after which the refresher replaces a copy
+        jitter (float): fraction of the refresh delay randomized away
+        failures (int): consecutive failed refreshes
+        last_error (str): message of the last failed refresh
+        next_run (float): unix time of the next refresh
+    """
+
+    def __init__(self, name: str, current: Callable[[], Any], refresh: Callable[[], Any], ttl: float,
+                 ahead: float = 0.8, jitter: float = 0.1):
+        self.name: str = name
+        self.current: Callable[[], Any] = current
+        self.refresh: Callable[[], Any] = refresh
+        self.ttl: float = ttl
+        self.ahead: float = ahead
+        self.jitter: float = jitter
+
+        self.version: Optional[str] = None
+        self.fetched_at: Optional[float] = None
+        self.last_success: Optional[float] = None
+        self.failures: int = 0
+        self.last_error: Optional[str] = None
+        self.next_run: float = 0.0
+
+    def schedule(self, dataset: Any) -> None:
+        # Replace the copy before it expires, spreading workers so they do not refresh in lockstep
+        version, fetched_at = dataset.version, float(dataset.fetched_at)
+        delay = self.ttl * self.ahead
+        self.next_run = fetched_at + delay - random.uniform(0, delay * self.jitter)
+        self.version, self.fetched_at = version, fetched_at
+
+    def status(self, now: float) -> dict:
+        return {
+            "version": self.version,
+            "age_s": None if self.fetched_at is None else round(now - self.fetched_at, 1),
+            "last_success": self.last_success,
+            "failures": self.failures,
+            "last_error": self.last_error,
+            "next_refresh_in_s": round(max(0.0, self.next_run - now), 1),
+        }
+
+class BackgroundRefresher:
+    """
+    Daemon thread that refreshes datasets before their TTL lapses.
+
+    Requests keep being served the previous copy while a refresh runs; each job's
+    refresh swaps the new copy in with a single assignment. Failed refreshes are
+    retried with jittered exponential backoff capped at max_backoff.
+
+    Attributes:
+        jobs (List[RefreshJob]): the datasets kept fresh
+        base_backoff (float): seconds before the first retry of a failed refresh
+        max_backoff (float): cap on the retry delay
+    """
+
+    def __init__(self, base_backoff: float = 30.0, max_backoff: float = 3600.0):
+        self.jobs: List[RefreshJob] = []
+        self.base_backoff: float = base_backoff
+        self.max_backoff: float = max_backoff
+
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def add(self, job: RefreshJob) -> None:
+        with self._lock:
+            self.jobs.append(job)
+
+    def _run(self, job: RefreshJob, initial: bool) -> None:
+        try:
+            dataset = job.current() if initial else job.refresh()
+            # A dataset without version or fetched_at fails here like a failed refresh,
+            # so one broken job cannot stop the thread refreshing the others
+            job.schedule(dataset)
+        except Exception as e:
+            job.failures += 1
+            job.last_error = str(e)
+            delay = min(self.max_backoff, self.base_backoff * (2 ** (job.failures - 1)))
+            job.next_run = time.time() + random.uniform(delay / 2, delay)
+            logger.warning("Refreshing %s failed %d times, retrying in %.0fs: %s", job.name, job.failures, job.next_run - time.time(), str(e))
+            return
+        if not initial:
+            job.last_success = time.time()
+            logger.info("Refreshed %s to version %s", job.name, job.version)
+        job.failures = 0
+        job.last_error = None
+
+    def run_pending(self) -> float:
+        """
+        Runs every job that is due.
+
+        Jobs that have never run first pick up the copy being served, so a fresh
+        stored copy is not downloaded again at startup.
+
+        Returns:
+            float: Seconds until the next job is due.
+        """
+        with self._lock:
+            jobs = list(self.jobs)
+        for job in jobs:
+            if time.time() >= job.next_run:
+                self._run(job, initial=job.fetched_at is None and job.failures == 0)
+                if job.fetched_at is not None and time.time() >= job.next_run:
+                    self._run(job, initial=False)
+        if not jobs:
+            return self.max_backoff
+        return max(0.0, min(job.next_run for job in jobs) - time.time())
+
+    def _loop(self) -> None:
+        while not self._stop.is_set():
+            self._stop.wait(self.run_pending())
+
+    def start(self) -> None:
+        """
+        Starts the refresher thread if it is not running.
+        """
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._loop, name="background-refresher", daemon=True)
+            self._thread.start()
+            logger.info("Started background refresher for %s", ", ".join(job.name for job in self.jobs))
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """
+        Stops the refresher thread after the refresh in progress, if any.
+
+        Args:
+            timeout (float): Seconds to wait for the thread to exit.
+        """
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def status(self) -> Dict[str, Any]:
+        """
+        Reports whether the refresher is running and the state of each job.
+
+        Returns:
+            dict: running, plus name -> version, age, last success, failures, last error and next refresh.
+        """
+        now = time.time()
+        with self._lock:
+            jobs = list(self.jobs)
+        return {
+            "running": self._thread is not None and self._thread.is_alive(),
+            "jobs": {job.name: job.status(now) for job in jobs},
+        }
@@ -0,0 +1,96 @@
+from collections import OrderedDict
+import logging
+import threading
+
+from workout.utils.logger import configure_logger
+
+from typing import Any, Callable, Hashable, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+class ResultCache:
+    """
+    In-memory LRU cache of computed results that depend on one version of a dataset.
+
+    Every lookup names the version it was computed against; the first lookup with a
+    different version drops all entries, so results never outlive the data they were
+    computed from. Results are computed outside the lock, so two requests missing the
+    same key at once may both compute it.
+
+    Attributes:
+        max_entries (int): cap on the number of cached results
+        version (Hashable): dataset version the cached results belong to
+        hits (int): lookups served from the cache
+        misses (int): lookups that computed the result
+        invalidations (int): times the cache was dropped for a new version
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries: int = max_entries
+        self.version: Optional[Hashable] = None
+        self.hits: int = 0
+        self.misses: int = 0
+        self.invalidations: int = 0
+
+        self._entries: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_compute(self, version: Hashable, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """
+        Returns the cached result for a key, computing and storing it on a miss.
+
+        Args:
+            version (Hashable): Version of the data the result is computed from.
+            key (Hashable): The normalized query.
+            compute (Callable[[], Any]): Computes the result.
+
+        Returns:
+            Any: The result.
+        """
+        with self._lock:
+            if version != self.version:
+                if self._entries:
+                    self.invalidations += 1
+                    logger.info("Dropping %d cached results for version %s", len(self._entries), self.version)
+                self._entries.clear()
+                self.version = version
+            if key in self._entries:
+                self.hits += 1
+                self._entries.move_to_end(key)
+                return self._entries[key]
+            self.misses += 1
+
+        result = compute()
+        with self._lock:
+            if version == self.version and self.max_entries > 0:
+                self._entries[key] = result
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return result
+
+    def clear(self) -> None:
+        """
+        Drops every cached result and resets the counters.
+        """
+        with self._lock:
+            self._entries.clear()
+            self.version = None
+            self.hits = self.misses = self.invalidations = 0
+
+    def stats(self) -> dict:
+        """
+        Reports the cache size and counters.
+
+        Returns:
+            dict: entries, max_entries, hits, misses and invalidations.
+        """
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+            }
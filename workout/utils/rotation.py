@@ -0,0 +1,153 @@
+import logging
+
+from workout.utils.logger import configure_logger
+from workout.utils.track_index import TrackIndex
+
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Maps every byte to 0 when all eight of its tracks were played, to 1 otherwise
+_HAS_UNPLAYED = bytes(0 if value == 0xFF else 1 for value in range(256))
+
+class SongRotation:
+    """
+    One user's played tracks in the current rotation, one bit per track of a TrackIndex.
+
+    The state is a bytearray of len(index) / 8 bytes plus a counter, about 250 bytes per
+    user for a thousand tracks, so 100k users take about 25 MB. Checking and
+    marking a track is O(1); finding the next unplayed track scans the bytes in C. The
+    rotation starts over once every track was played, and when the track list is
+    downloaded again, since positions then refer to other tracks. Tracks merged into the
+    list keep the rotation: the played bits move to the tracks' new positions.
+
+    Attributes:
+        version (str): version of the TrackIndex the positions refer to
+        lineage (str): lineage of that TrackIndex
+        size (int): tracks in the rotation
+        played (int): tracks played in the rotation so far
+        bits (bytearray): bit i of byte i // 8 is set once track i was played
+    """
+
+    __slots__ = ("version", "lineage", "size", "played", "bits")
+
+    def __init__(self, version: str, size: int, lineage: Optional[str] = None):
+        self.version: str = version
+        self.lineage: str = version if lineage is None else lineage
+        self.size: int = size
+        self.played: int = 0
+        self.bits: bytearray = bytearray((size + 7) // 8)
+        self._pad()
+
+    def _pad(self) -> None:
+        # Bits past the last track count as played so scans never return them
+        if self.size % 8:
+            self.bits[-1] |= 0xFF & ~((1 << (self.size % 8)) - 1)
+
+    def sync(self, index: TrackIndex) -> None:
+        """
+        Follows the rotation to the given track list.
+
+        A list merged from the one the rotation refers to keeps the played tracks, moved
+        to their positions in the new list; any other list starts a new rotation.
+
+        Args:
+            index (TrackIndex): The current track list.
+        """
+        if index.version == self.version and len(index) == self.size:
+            return
+        size = self.size
+        self.version = index.version
+        self.size = len(index)
+        if index.lineage != self.lineage or self.size < size:
+            self.lineage = index.lineage
+            self.reset()
+            return
+        bits = self.bits
+        self.bits = bytearray((self.size + 7) // 8)
+        if self.played:
+            # Merging only appends to the upstream list and the index sort is stable, so the
+            # tracks the rotation knows keep their order: the n-th of them was at position n
+            previous = 0
+            for position, slot in enumerate(index.slots):
+                if slot < size:
+                    if bits[previous >> 3] & (1 << (previous & 7)):
+                        self.bits[position >> 3] |= 1 << (position & 7)
+                    previous += 1
+        self._pad()
+
+    def reset(self) -> None:
+        """
+        Starts a new rotation with no track played.
+        """
+        self.played = 0
+        self.bits = bytearray((self.size + 7) // 8)
+        self._pad()
+
+    def is_played(self, position: int) -> bool:
+        return bool(self.bits[position >> 3] & (1 << (position & 7)))
+
+    def mark(self, position: int) -> None:
+        """
+        Marks a track played, starting a new rotation once every track was played.
+
+        Args:
+            position (int): Position of the track in the TrackIndex.
+        """
+        bit = 1 << (position & 7)
+        if self.bits[position >> 3] & bit:
+            return
+        self.bits[position >> 3] |= bit
+        self.played += 1
+        if self.played >= self.size:
+            logger.info("Song rotation of %d tracks exhausted, starting over", self.size)
+            self.reset()
+
+    def next_unplayed(self, start: int = 0, stop: Optional[int] = None) -> Optional[int]:
+        """
+        Finds the first unplayed track at or after start and before stop, wrapping around to start.
+
+        Args:
+            start (int): Position to start from.
+            stop (int): Position to stop before. Defaults to the end of the rotation; the
+                search then wraps around to the beginning.
+
+        Returns:
+            int: The position, or None if every track in the range was played.
+        """
+        wrap = stop is None
+        stop = self.size if stop is None else min(stop, self.size)
+        ranges = [(start, stop), (0, start)] if wrap else [(start, stop)]
+        has_unplayed = None
+        for first, last in ranges:
+            position = first
+            while position < last:
+                if position & 7 == 0:
+                    # Skip whole bytes of played tracks in C
+                    if has_unplayed is None:
+                        has_unplayed = self.bits.translate(_HAS_UNPLAYED)
+                    found = has_unplayed.find(1, position >> 3, (last + 7) >> 3)
+                    if found < 0:
+                        break
+                    position = max(position, found << 3)
+                    if position >= last:
+                        break
+                if not self.is_played(position):
+                    return position
+                position += 1
+        return None
+
+    def clear_range(self, start: int, stop: int) -> None:
+        """
+        Marks the tracks from start to stop unplayed again.
+
+        Args:
+            start (int): First position.
+            stop (int): Position after the last one.
+        """
+        for position in range(start, min(stop, self.size)):
+            bit = 1 << (position & 7)
+            if self.bits[position >> 3] & bit:
+                self.bits[position >> 3] &= ~bit
+                self.played -= 1
@@ -0,0 +1,98 @@
+import logging
+import threading
+
+import requests
+
+from workout.utils.logger import configure_logger
+
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+class SingleFlightTimeout(requests.Timeout):
+    """Raised when a caller gives up waiting on another caller's fetch."""
+
+class _Flight:
+    __slots__ = ("done", "result", "error", "waiters")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters: int = 0
+
+class SingleFlight:
+    """
+    Coalesces concurrent calls for the same key into one call.
+
+    The first caller for a key runs the function; callers arriving while it is in
+    progress wait for it and share its result or exception instead of repeating the
+    work. Results are not kept once the call finishes, so this is not a cache.
+
+    Attributes:
+        calls (int): number of calls that ran the function
+        shared (int): number of calls served by another caller's result
+    """
+
+    def __init__(self):
+        self.calls: int = 0
+        self.shared: int = 0
+        self._flights: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Any:
+        """
+        Runs fn for key, or waits for the call already in progress.
+
+        Args:
+            key (str): Identifies the work, e.g. an upstream url and its parameters.
+            fn (Callable): The work to run when no call for key is in progress.
+            timeout (float): Seconds to wait on a call in progress, or None to wait until it finishes.
+
+        Returns:
+            Any: The value returned by fn. Callers share the same object, so treat it as read-only.
+
+        Raises:
+            SingleFlightTimeout: If the call in progress did not finish within timeout.
+            Exception: Whatever fn raised.
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = _Flight()
+                self.calls += 1
+            else:
+                flight.waiters += 1
+                self.shared += 1
+
+        if not leader:
+            if not flight.done.wait(timeout):
+                raise SingleFlightTimeout(f"Timed out after {timeout}s waiting on {key}")
+            if flight.error is not None:
+                raise flight.error
+            return flight.result
+
+        try:
+            flight.result = fn()
+            return flight.result
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            if flight.waiters:
+                logger.debug("Shared %s with %d waiting callers", key, flight.waiters)
+            flight.done.set()
+
+    def stats(self) -> dict:
+        """
+        Returns the call counters.
+
+        Returns:
+            dict: calls, shared and in_flight.
+        """
+        with self._lock:
+            return {"calls": self.calls, "shared": self.shared, "in_flight": len(self._flights)}
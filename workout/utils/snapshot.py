@@ -0,0 +1,231 @@
+from dataclasses import dataclass
+import logging
+import mmap
+import os
+import struct
+import time
+
+from workout.utils.catalog_records import ExerciseRecord
+from workout.utils.keyword_matcher import KeywordMatcher, get_matcher
+from workout.utils.logger import configure_logger
+from workout.utils.track_index import track_duration
+from workout.utils.vocabulary import EQUIPMENT, MUSCLE_GROUPS, MUSCLES
+
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+######################################################
+#
+#    Format
+#
+######################################################
+#
+# All integers are little-endian. Every string is stored once in a string table at
+# the end of the file and referenced by its index everywhere else.
+#
+#   header    magic, section counts, version string ids, fetch times
+#   bases     one row per wger exercise base: display strings and muscle/equipment names
+#   records   one row per exercise translation, pointing at its base
+#   ids       string ids of muscle and equipment names, referenced by the bases
+#   tracks    one row per Jamendo track
+#   offsets   character offset of each string in the text, plus the end offset
+#   text      every string concatenated, UTF-8 encoded
+
+MAGIC = b"WKSNAP02"
+# magic, strings, bases, records, ids, tracks, catalog version, tracks version, rules version,
+# catalog fetched_at, tracks fetched_at
+HEADER = struct.Struct("<8sIIIIIIIIdd")
+# muscles, equipment, base_id (-1 if unknown), first id, muscle count, equipment count
+BASE = struct.Struct("<IIiIHH")
+# name, base, language (-1 if unknown), comma-joined target groups
+RECORD = struct.Struct("<IIiI")
+ID = struct.Struct("<I")
+# id, name, artist_name, duration
+TRACK = struct.Struct("<IIIi")
+
+@dataclass
+class Snapshot:
+    records: List[ExerciseRecord]
+    tracks: List[dict]
+    catalog_version: str
+    catalog_fetched_at: float
+    tracks_version: str
+    tracks_fetched_at: float
+    load_seconds: float
+
+class _Strings:
+    def __init__(self):
+        self.ids: Dict[str, int] = {}
+        self.values: List[str] = []
+
+    def add(self, value: str) -> int:
+        string_id = self.ids.get(value)
+        if string_id is None:
+            string_id = self.ids[value] = len(self.values)
+            self.values.append(value)
+        return string_id
+
+def write_snapshot(path: str, records: List[ExerciseRecord], tracks: List[dict], catalog_version: str,
+                   catalog_fetched_at: float, tracks_version: str, tracks_fetched_at: float,
+                   matcher: Optional[KeywordMatcher] = None) -> int:
+    """
+    Writes normalized catalog records and Jamendo tracks to a binary snapshot.
+
+    Muscle, equipment and target group names are stored by name, so the vocabulary
+    ids of the loading process do not need to match the writing one. Group
+    memberships are only reused when the loader has the same rules.
+
+    Args:
+        path (str): Where to write the snapshot. Replaced atomically.
+        records (List[ExerciseRecord]): The normalized catalog.
+        tracks (List[dict]): Jamendo track results.
+        catalog_version (str): Version of the catalog the records come from.
+        catalog_fetched_at (float): Unix time the catalog was downloaded.
+        tracks_version (str): Version of the track list.
+        tracks_fetched_at (float): Unix time the tracks were downloaded.
+        matcher (KeywordMatcher): The rules the records were classified with. Defaults to the rules file.
+
+    Returns:
+        int: Size of the snapshot in bytes.
+    """
+    matcher = matcher or get_matcher()
+    strings = _Strings()
+    header_ids = (strings.add(catalog_version), strings.add(tracks_version), strings.add(matcher.version))
+
+    bases: Dict[tuple, int] = {}
+    base_rows = bytearray()
+    record_rows = bytearray()
+    id_rows = bytearray()
+    id_count = 0
+    for record in records:
+        key = (record.base_id, record.muscles, record.equipment, record.muscle_ids, record.equipment_ids)
+        base = bases.get(key)
+        if base is None:
+            base = bases[key] = len(bases)
+            names = [MUSCLES.name(muscle_id) for muscle_id in record.muscle_ids]
+            names += [EQUIPMENT.name(equipment_id) for equipment_id in record.equipment_ids]
+            for name in names:
+                id_rows += ID.pack(strings.add(name))
+            base_rows += BASE.pack(
+                strings.add(record.muscles), strings.add(record.equipment),
+                record.base_id if record.base_id is not None else -1,
+                id_count, len(record.muscle_ids), len(record.equipment_ids),
+            )
+            id_count += len(names)
+        record_rows += RECORD.pack(
+            strings.add(record.name), base,
+            record.language if record.language is not None else -1,
+            strings.add(",".join(MUSCLE_GROUPS.names(record.group_mask))),
+        )
+
+    track_rows = bytearray()
+    for track in tracks:
+        track_rows += TRACK.pack(
+            strings.add(str(track.get("id", ""))), strings.add(track.get("name", "Unknown")),
+            strings.add(track.get("artist_name", "Unknown")), track_duration(track),
+        )
+
+    offsets = [0]
+    for value in strings.values:
+        offsets.append(offsets[-1] + len(value))
+    header = HEADER.pack(MAGIC, len(strings.values), len(bases), len(records), id_count, len(tracks),
+                         *header_ids, catalog_fetched_at, tracks_fetched_at)
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(header)
+        f.write(base_rows)
+        f.write(record_rows)
+        f.write(id_rows)
+        f.write(track_rows)
+        f.write(struct.pack(f"<{len(offsets)}I", *offsets))
+        f.write("".join(strings.values).encode("utf-8"))
+        size = f.tell()
+    os.replace(tmp_path, path)
+    logger.info("Wrote snapshot %s: %d records, %d tracks, %d bytes", path, len(records), len(tracks), size)
+    return size
+
+def load_snapshot(path: str, matcher: Optional[KeywordMatcher] = None) -> Snapshot:
+    """
+    Memory-maps a snapshot and rebuilds its records and tracks.
+
+    The string table is decoded in one call and per-base values are built once and
+    shared by every translation of the base. Names are only reclassified when the
+    rules differ from those the snapshot was written with.
+
+    Args:
+        path (str): The snapshot written by write_snapshot.
+        matcher (KeywordMatcher): Classifies names into target groups. Defaults to the rules file.
+
+    Returns:
+        Snapshot: The records, tracks and versions, with the time the load took.
+
+    Raises:
+        OSError: If the file cannot be read.
+        ValueError: If the file is not a snapshot.
+    """
+    start = time.perf_counter()
+    matcher = matcher or get_matcher()
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        if len(mm) < HEADER.size or mm[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a workout snapshot")
+        (_, string_count, base_count, record_count, id_count, track_count, catalog_version_id, tracks_version_id,
+         rules_version_id, catalog_fetched_at, tracks_fetched_at) = HEADER.unpack_from(mm, 0)
+
+        bases_at = HEADER.size
+        records_at = bases_at + base_count * BASE.size
+        ids_at = records_at + record_count * RECORD.size
+        tracks_at = ids_at + id_count * ID.size
+        offsets_at = tracks_at + track_count * TRACK.size
+        text_at = offsets_at + (string_count + 1) * 4
+        if text_at > len(mm):
+            raise ValueError(f"{path} is truncated")
+
+        offsets = struct.unpack_from(f"<{string_count + 1}I", mm, offsets_at)
+        text = mm[text_at:].decode("utf-8")
+        if len(text) != offsets[-1]:
+            raise ValueError(f"{path} is truncated")
+        strings = [text[offsets[i]:offsets[i + 1]] for i in range(string_count)]
+        name_ids = [string_id for (string_id,) in ID.iter_unpack(mm[ids_at:tracks_at])]
+
+        bases: List[Tuple[str, str, Optional[int], Tuple[int, ...], Tuple[int, ...], int]] = []
+        for muscles, equipment, base_id, first, muscle_count, equipment_count in BASE.iter_unpack(mm[bases_at:records_at]):
+            middle = first + muscle_count
+            muscle_ids = tuple(MUSCLES.intern(strings[string_id]) for string_id in name_ids[first:middle])
+            equipment_ids = tuple(EQUIPMENT.intern(strings[string_id]) for string_id in name_ids[middle:middle + equipment_count])
+            equipment_mask = 0
+            for equipment_id in equipment_ids:
+                equipment_mask |= 1 << equipment_id
+            bases.append((strings[muscles], strings[equipment], None if base_id == -1 else base_id,
+                          muscle_ids, equipment_ids, equipment_mask))
+
+        same_rules = strings[rules_version_id] == matcher.version
+        group_masks: Dict[int, int] = {}
+        records: List[ExerciseRecord] = []
+        for name, base, language, groups in RECORD.iter_unpack(mm[records_at:ids_at]):
+            muscles, equipment, base_id, muscle_ids, equipment_ids, equipment_mask = bases[base]
+            record = ExerciseRecord(strings[name], muscles, equipment, 0, equipment_mask,
+                                    None if language == -1 else language, muscle_ids, equipment_ids, base_id)
+            if same_rules:
+                group_mask = group_masks.get(groups)
+                if group_mask is None:
+                    group_mask = group_masks[groups] = MUSCLE_GROUPS.mask(filter(None, strings[groups].split(",")))
+                record.group_mask = group_mask
+            else:
+                record.group_mask = matcher.group_mask(record.lowered_name)
+            records.append(record)
+
+        tracks = [
+            {"id": strings[track_id], "name": strings[name], "artist_name": strings[artist], "duration": duration}
+            for track_id, name, artist, duration in TRACK.iter_unpack(mm[tracks_at:offsets_at])
+        ]
+
+    load_seconds = time.perf_counter() - start
+    logger.info("Loaded snapshot %s: %d records, %d tracks in %.1fms", path, len(records), len(tracks), 1000 * load_seconds)
+    return Snapshot(records, tracks, strings[catalog_version_id], catalog_fetched_at,
+                    strings[tracks_version_id], tracks_fetched_at, load_seconds)
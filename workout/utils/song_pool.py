@@ -0,0 +1,158 @@
+import logging
+import random
+import threading
+
+from workout.utils.logger import configure_logger
+
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+class SongPool:
+    """
+    Pool of songs drawn ahead of time so a random song is served without touching the source.
+
+    Taking a song swaps a random entry with the last one and pops it, which is O(1).
+    Once the pool drops below the low-water mark a background thread tops it up to
+    capacity with songs drawn uniformly from the source; only a pool that is completely
+    empty, e.g. on the first request, is filled on the caller's thread. A refill that
+    was started before clear() is discarded.
+
+    Attributes:
+        source (Callable[[], List[str]]): returns every song the pool draws from
+        capacity (int): songs held after a refill
+        low_water (int): pool size below which a refill is started
+        rng (random.Random): draws the songs; seed it for repeatable picks
+        served (int): songs taken from the pool
+        refills (int): completed refills
+        empty (int): takes that found the pool empty and filled it on the caller's thread
+    """
+
+    def __init__(self, source: Callable[[], List[str]], capacity: int = 256, low_water: int = 64,
+                 rng: Optional[random.Random] = None):
+        self.source: Callable[[], List[str]] = source
+        self.capacity: int = max(1, capacity)
+        self.low_water: int = min(low_water, self.capacity)
+        self.rng: random.Random = rng or random.Random()
+        self.served: int = 0
+        self.refills: int = 0
+        self.empty: int = 0
+
+        self._songs: List[str] = []
+        self._generation: int = 0
+        self._refilling: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._songs)
+
+    def _draw(self, generation: int) -> None:
+        songs = self.source()
+        with self._lock:
+            if generation != self._generation or not songs:
+                return
+            need = self.capacity - len(self._songs)
+            if need > 0:
+                self._songs.extend(self.rng.choices(songs, k=need))
+            self.refills += 1
+
+    def _refill(self, generation: int) -> None:
+        try:
+            self._draw(generation)
+        except Exception as e:
+            logger.warning("Refilling the song pool failed: %s", str(e))
+        finally:
+            with self._lock:
+                self._refilling = None
+
+    def refill_async(self) -> Optional[threading.Thread]:
+        """
+        Starts a background refill unless one is running.
+
+        Returns:
+            threading.Thread: The refill thread, or None if one was already running.
+        """
+        with self._lock:
+            if self._refilling is not None:
+                return None
+            thread = self._refilling = threading.Thread(target=self._refill, args=(self._generation,),
+                                                        name="song-pool-refill", daemon=True)
+        thread.start()
+        return thread
+
+    def wait(self, timeout: Optional[float] = None) -> None:
+        """
+        Waits for a running refill to finish.
+
+        Args:
+            timeout (float): Seconds to wait at most.
+        """
+        thread = self._refilling
+        if thread is not None:
+            thread.join(timeout)
+
+    def take(self) -> Optional[str]:
+        """
+        Takes a random song from the pool.
+
+        Returns:
+            str: The song, or None if the source has no songs.
+
+        Raises:
+            Exception: Whatever the source raises when an empty pool is filled on the caller's thread.
+        """
+        with self._lock:
+            generation = self._generation
+            cold = not self._songs
+        if cold:
+            self.empty += 1
+            self._draw(generation)
+        with self._lock:
+            if not self._songs:
+                return None
+            position = self.rng.randrange(len(self._songs))
+            self._songs[position], self._songs[-1] = self._songs[-1], self._songs[position]
+            song = self._songs.pop()
+            self.served += 1
+            low = len(self._songs) < self.low_water
+        if low:
+            self.refill_async()
+        return song
+
+    def seed(self, seed: Optional[int]) -> None:
+        """
+        Reseeds the pool's random number generator.
+
+        Args:
+            seed (int): The seed. None seeds from the operating system.
+        """
+        with self._lock:
+            self.rng.seed(seed)
+
+    def clear(self) -> None:
+        """
+        Drops every pooled song and resets the counters.
+        """
+        with self._lock:
+            self._songs.clear()
+            self._generation += 1
+            self.served = self.refills = self.empty = 0
+
+    def stats(self) -> dict:
+        """
+        Reports the pool size and counters.
+
+        Returns:
+            dict: size, capacity, low_water, served, refills, empty and refilling.
+        """
+        with self._lock:
+            return {
+                "size": len(self._songs),
+                "capacity": self.capacity,
+                "low_water": self.low_water,
+                "served": self.served,
+                "refills": self.refills,
+                "empty": self.empty,
+                "refilling": self._refilling is not None,
+            }
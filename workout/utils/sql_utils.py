@@ -2,6 +2,7 @@ from contextlib import contextmanager
 import logging
 import os
 import sqlite3
+import threading
 
 from workout.utils.logger import configure_logger
 
@@ -36,6 +37,52 @@ def check_table_exists(tablename: str):
         logger.error(error_message)
         raise Exception(error_message) from e
 
+# Connection shared by every get_db_connection() call on this thread while a
+# shared_db_connection() block is open
+_shared = threading.local()
+
+class SharedConnection:
+    """
+    Wraps a connection handed out to several callers inside one transaction.
+
+    Per-call commits are ignored; the owning shared_db_connection() block
+    commits or rolls back once at the end.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def commit(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+@contextmanager
+def shared_db_connection():
+    """
+    Opens one connection and transaction reused by all get_db_connection() calls on this thread.
+
+    The transaction is committed when the block exits normally and rolled back if it raises.
+
+    Yields:
+        SharedConnection: The shared connection.
+    """
+    conn = sqlite3.connect(DB_PATH)
+    shared = SharedConnection(conn)
+    _shared.conn = shared
+    logger.info("Shared database connection opened.")
+    try:
+        yield shared
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        _shared.conn = None
+        conn.close()
+        logger.info("Shared database connection closed.")
+
 ###################################################
 #
 # This one yields rather than returns.
@@ -44,6 +91,11 @@ def check_table_exists(tablename: str):
 ###################################################
 @contextmanager
 def get_db_connection():
+    shared = getattr(_shared, "conn", None)
+    if shared is not None:
+        yield shared
+        return
+
     conn = None
     try:
         conn = sqlite3.connect(DB_PATH)
@@ -0,0 +1,108 @@
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import time
+
+import requests
+
+from workout.utils.catalog_crawler import CatalogCrawler
+from workout.utils.logger import configure_logger
+
+from typing import List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+# Jamendo serves at most 200 tracks per page and filters durations between two bounds
+MAX_PAGE_SIZE = 200
+MAX_DURATION = 24 * 60 * 60
+
+class TrackCrawler(CatalogCrawler):
+    """
+    Downloads pages of the Jamendo track listing until enough tracks are collected.
+
+    Jamendo does not report a total count, so after the first page the next pages are
+    requested in waves of consecutive offsets fetched at once, each wave no larger than
+    max_workers or the pages still needed for the wanted tracks. The crawl stops after
+    the wave that collects the wanted number of tracks, reaches a short page (the end
+    of the listing) or reaches max_pages. Durations are filtered by Jamendo, so every
+    downloaded track is a candidate. Pages are retried like CatalogCrawler pages.
+
+    Attributes:
+        max_pages (int): most pages fetched by one crawl
+        min_duration (int): shortest track duration requested, in seconds
+        max_duration (int): longest track duration requested, None for no bound
+    """
+
+    def __init__(self, base_url: str, params: Optional[dict] = None, page_size: int = MAX_PAGE_SIZE,
+                 max_workers: int = 4, retries: int = 2, backoff: float = 0.5, max_pages: int = 25,
+                 min_duration: int = 0, max_duration: Optional[int] = None):
+        params = dict(params or {})
+        if min_duration > 0 or max_duration is not None:
+            params["durationbetween"] = f"{max(0, min_duration)}_{max_duration or MAX_DURATION}"
+        super().__init__(base_url, params=params, page_size=min(page_size, MAX_PAGE_SIZE),
+                         max_workers=max_workers, retries=retries, backoff=backoff)
+        self.max_pages: int = max_pages
+        self.min_duration: int = min_duration
+        self.max_duration: Optional[int] = max_duration
+
+    def fetch_page(self, offset: int) -> dict:
+        """
+        Fetches one page, raising on the errors Jamendo reports with a 200 status.
+
+        Args:
+            offset (int): Offset of the first track of the page.
+
+        Returns:
+            dict: The decoded page with "headers" and "results".
+
+        Raises:
+            requests.RequestException: If the page still fails after all retries or Jamendo reports an error.
+        """
+        page = super().fetch_page(offset)
+        headers = page.get("headers") or {}
+        if headers.get("status") == "failed":
+            raise requests.RequestException(f"Jamendo error {headers.get('code')}: {headers.get('error_message')}")
+        return page
+
+    def crawl_tracks(self, wanted: int) -> List[dict]:
+        """
+        Downloads tracks lasting between min_duration and max_duration seconds.
+
+        Args:
+            wanted (int): Tracks to collect before stopping. Up to one wave more may be returned.
+
+        Returns:
+            List[dict]: The tracks in listing order, without duplicates.
+
+        Raises:
+            requests.RequestException: If a page cannot be fetched.
+        """
+        start = time.perf_counter()
+        tracks: List[dict] = []
+        seen = set()
+        pages = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            while len(tracks) < wanted and pages < self.max_pages:
+                needed = -(-(wanted - len(tracks)) // self.page_size)
+                wave = 1 if pages == 0 else min(self.max_workers, self.max_pages - pages, needed)
+                offsets = [(pages + number) * self.page_size for number in range(wave)]
+                results = list(pool.map(self.fetch_page, offsets))
+                pages += wave
+                end = False
+                for page in results:
+                    page_tracks = page.get("results", [])
+                    for track in page_tracks:
+                        track_id = track.get("id")
+                        # Tracks shift between pages when the listing changes mid-crawl
+                        if track_id is not None and track_id in seen:
+                            continue
+                        seen.add(track_id)
+                        tracks.append(track)
+                    if len(page_tracks) < self.page_size:
+                        end = True
+                        break
+                if end:
+                    break
+        logger.info("Crawled %d tracks of %s-%s seconds from %s in %d pages (%.2fs)", len(tracks), self.min_duration,
+                    self.max_duration or "", self.base_url, pages, time.perf_counter() - start)
+        return tracks
@@ -0,0 +1,99 @@
+from bisect import bisect_left, bisect_right
+import logging
+import time
+
+from workout.utils.logger import configure_logger
+
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+def song_label(track: dict) -> str:
+    """The "name by artist" label songs are returned as."""
+    return f"{track.get('name', 'Unknown')} by {track.get('artist_name', 'Unknown')}"
+
+def track_duration(track: dict) -> int:
+    """Duration of a track in whole seconds; 0 when missing or malformed."""
+    try:
+        return int(track.get("duration") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+class TrackIndex:
+    """
+    One version of the Jamendo track list, sorted by duration.
+
+    Duration filters bisect into the sorted durations instead of scanning every track,
+    so a query costs O(log n) plus the size of the page it returns. Tracks of equal
+    duration keep their upstream order.
+
+    Attributes:
+        version (str): track list version the index was built from
+        lineage (str): version of the downloaded list this one was merged from, see track_model.merge_tracks
+        tracks (List[dict]): the tracks, shortest first
+        slots (List[int]): position of each track in the upstream list
+        durations (List[int]): duration of each track in seconds, ascending
+        labels (List[str]): "name by artist" of each track
+        positions (Dict[str, List[int]]): lowercased label or track name -> positions of the matching tracks
+    """
+
+    def __init__(self, tracks: List[dict], version: str, lineage: Optional[str] = None):
+        start = time.perf_counter()
+        self.version: str = version
+        self.lineage: str = version if lineage is None else lineage
+        self.slots: List[int] = sorted(range(len(tracks)), key=lambda position: track_duration(tracks[position]))
+        self.tracks: List[dict] = [tracks[position] for position in self.slots]
+        self.durations: List[int] = [track_duration(track) for track in self.tracks]
+        self.labels: List[str] = [song_label(track) for track in self.tracks]
+        self.positions: Dict[str, List[int]] = {}
+        for position, (track, label) in enumerate(zip(self.tracks, self.labels)):
+            self.positions.setdefault(label.lower(), []).append(position)
+            name = str(track.get("name") or "").lower()
+            if name and name != label.lower():
+                self.positions.setdefault(name, []).append(position)
+        logger.info("Indexed tracks version %s: %d tracks in %.3fs", version, len(self.tracks), time.perf_counter() - start)
+
+    def __len__(self) -> int:
+        return len(self.tracks)
+
+    def find(self, song: str) -> List[int]:
+        """Positions of the tracks whose label or name is song, ignoring case."""
+        return self.positions.get(song.lower(), [])
+
+    def span(self, min_duration: int = 0, max_duration: Optional[int] = None) -> range:
+        """
+        Positions of the tracks lasting between min_duration and max_duration seconds, inclusive.
+
+        Args:
+            min_duration (int): Shortest duration kept.
+            max_duration (int): Longest duration kept. None keeps every longer track.
+
+        Returns:
+            range: Ascending positions in tracks.
+        """
+        first = bisect_left(self.durations, min_duration)
+        last = len(self.durations) if max_duration is None else bisect_right(self.durations, max_duration)
+        return range(first, max(first, last))
+
+    def count(self, min_duration: int = 0, max_duration: Optional[int] = None) -> int:
+        """Number of tracks lasting between min_duration and max_duration seconds."""
+        return len(self.span(min_duration, max_duration))
+
+    def labels_between(self, min_duration: int = 0, max_duration: Optional[int] = None,
+                       limit: Optional[int] = None, offset: int = 0) -> List[str]:
+        """
+        Returns one page of the songs lasting between min_duration and max_duration seconds.
+
+        Args:
+            min_duration (int): Shortest duration kept.
+            max_duration (int): Longest duration kept. None keeps every longer track.
+            limit (int): Page size. None returns every song from the offset on.
+            offset (int): Songs to skip before the page.
+
+        Returns:
+            List[str]: "name by artist" labels, shortest first.
+        """
+        span = self.span(min_duration, max_duration)
+        page = span[offset:] if limit is None else span[offset:offset + limit]
+        return self.labels[page.start:page.stop]
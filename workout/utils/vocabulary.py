@@ -0,0 +1,141 @@
+import logging
+import threading
+from typing import Dict, Iterable, List
+
+from workout.utils.logger import configure_logger
+
+logger = logging.getLogger(__name__)
+configure_logger(logger)
+
+
+class Vocabulary:
+    """
+    Interns names to small integer ids so that sets of names can be held as bitmasks.
+
+    Ids are handed out in first-seen order and never reused, so a mask built at any
+    point stays valid for the lifetime of the process.
+
+    Attributes:
+        kind (str): what the vocabulary holds, used in log messages
+    """
+
+    def __init__(self, kind: str, names: Iterable[str] = ()):
+        self.kind: str = kind
+        self._ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._lock = threading.Lock()
+        for name in names:
+            self.intern(name)
+
+    def intern(self, name: str) -> int:
+        """
+        Returns the id for a name, assigning the next free id if the name is new.
+
+        Args:
+            name (str): The name to intern.
+
+        Returns:
+            int: The id of the name.
+        """
+        name_id = self._ids.get(name)
+        if name_id is not None:
+            return name_id
+
+        with self._lock:
+            name_id = self._ids.get(name)
+            if name_id is None:
+                name_id = len(self._names)
+                self._names.append(name)
+                self._ids[name] = name_id
+        return name_id
+
+    def bit(self, name: str) -> int:
+        """
+        Returns the single-bit mask for a name.
+
+        Args:
+            name (str): The name to look up.
+
+        Returns:
+            int: A mask with only the name's bit set.
+        """
+        return 1 << self.intern(name)
+
+    def mask(self, names: Iterable[str]) -> int:
+        """
+        Returns the mask holding every name in the iterable.
+
+        Args:
+            names (Iterable[str]): The names to encode.
+
+        Returns:
+            int: The OR of the bits of all names.
+        """
+        mask = 0
+        for name in names:
+            mask |= 1 << self.intern(name)
+        return mask
+
+    def known_mask(self, names: Iterable[str]) -> int:
+        """
+        Returns the mask of the names already in the vocabulary, without interning new ones.
+
+        Use it for names that come from users or logs, so untrusted input cannot grow
+        the vocabulary; unknown names add no bits.
+
+        Args:
+            names (Iterable[str]): The names to encode.
+
+        Returns:
+            int: The OR of the bits of the known names.
+        """
+        mask = 0
+        for name in names:
+            name_id = self._ids.get(name)
+            if name_id is not None:
+                mask |= 1 << name_id
+        return mask
+
+    def name(self, name_id: int) -> str:
+        """
+        Returns the name interned under an id.
+
+        Args:
+            name_id (int): The id to look up.
+
+        Returns:
+            str: The name.
+        """
+        return self._names[name_id]
+
+    def names(self, mask: int) -> List[str]:
+        """
+        Decodes a mask back into names, ordered by id.
+
+        Args:
+            mask (int): The mask to decode.
+
+        Returns:
+            List[str]: The names whose bits are set in the mask.
+        """
+        names = []
+        name_id = 0
+        while mask:
+            if mask & 1:
+                names.append(self._names[name_id])
+            mask >>= 1
+            name_id += 1
+        return names
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._ids
+
+    def __len__(self) -> int:
+        return len(self._names)
+
+
+# Target groups the recommendation rules know about are interned first so their
+# bits are stable and small.
+MUSCLE_GROUPS = Vocabulary("muscle group", ["leg", "arm", "back", "abs", "cardio"])
+EQUIPMENT = Vocabulary("equipment")
+MUSCLES = Vocabulary("muscle")
@@ -1,4 +1,10 @@
 import requests
+from typing import List, Optional
+
+from workout.models.catalog_model import get_catalog_index
+from workout.utils.catalog_index import CatalogIndex
+from workout.utils.plan_builder import Plan, build_plan
+from workout.utils.vocabulary import EQUIPMENT, MUSCLE_GROUPS
 
 # Base URL for the wger API
 BASE_URL = "https://wger.de/api/v2/"
@@ -45,6 +51,62 @@ BASE_URL = "https://wger.de/api/v2/"
     except requests.RequestException as e:
         return [f"Error fetching exercises: {str(e)}"]'''
 
+def find_exercise_ids(index: CatalogIndex, muscle: str) -> List[int]:
+    """
+    Finds catalog records for a muscle typed by the user.
+
+    Arg:
+        index: indexes over the current catalog
+        muscle: target group ("leg", "legs") or wger muscle name ("Biceps brachii")
+
+    Return:
+        ids of the matching English records, in catalog order
+    """
+    ids = index.ids_for_group(muscle)
+    if not ids and muscle.endswith("s"):
+        ids = index.ids_for_group(muscle[:-1])
+    if not ids:
+        ids = index.ids_for_muscle(muscle)
+    return ids
+
+def normalize_group(muscle: str) -> str:
+    """
+    Maps a target group typed by the user to its rule name ("legs" -> "leg").
+
+    Arg:
+        muscle: target group as typed
+
+    Return:
+        the rule name, or the lowered input if no rule knows it
+    """
+    muscle = muscle.strip().lower()
+    if muscle not in MUSCLE_GROUPS and muscle.endswith("s") and muscle[:-1] in MUSCLE_GROUPS:
+        return muscle[:-1]
+    return muscle
+
+def build_workout_plan(list_of_muscle_group: List[str], target_time: int,
+                       equipment: Optional[List[str]] = None) -> Plan:
+    """
+    Builds a workout plan filling the target time with exercises for the target muscle groups
+
+    Arg:
+        list_of_muscle_group: list of target muscle groups from user
+        target_time: integer of user's target workout time in minutes
+        equipment: equipment the user has, or None to allow any equipment
+
+    Return:
+        the plan, see plan_builder.build_plan
+
+    Raises:
+        requests.RequestException: if the catalog must be downloaded and wger cannot be reached
+        ValueError: if the target time is out of range
+    """
+    index = get_catalog_index()
+    equipment_mask = None
+    if equipment is not None:
+        equipment_mask = EQUIPMENT.known_mask(map(str.lower, equipment))
+    return build_plan(index, [normalize_group(muscle) for muscle in list_of_muscle_group], target_time, equipment_mask)
+
 def fetch_exercise_by_muscle_group(list_of_muscle_group,target_time):
     """
     Fetch exercises based on the user's target muscle groups. Recommend exercises based on time constraint and target muscle
@@ -56,25 +118,9 @@ def fetch_exercise_by_muscle_group(list_of_muscle_group,target_time):
     Return:
         recommendations: list of recommended exercises
     """
-    params = {"language": 2}  # default Language: English
-
     try:
-        response = requests.get(f"{BASE_URL}exercise/", params=params)
-        response.raise_for_status()
-        data = response.json().get("results", []) # getting data
-
-        # Recommendation logic based on time and target muscle
-        recommendations = []
-        minutes_per_muscle = target_time // len(list_of_muscle_group) # dividing the time based on the number of targetted muscles
-        for exercise in data: 
-            for muscle in list_of_muscle_group: 
-                while(minutes_per_muscle>=0): # time constraint
-                    if muscle in exercise["description"].lower():
-                        recommendations.append(exercise["name"])
-                        minutes_per_muscle -= 3 # setting it to 3 mins per exercise for now
-                minutes_per_muscle = target_time // len(list_of_muscle_group) # reset the time
-            break
-        return recommendations
+        plan = build_workout_plan(list_of_muscle_group, target_time)
+        return [item.name for item in plan.items]
     except requests.RequestException as e:
         return [f"Error fetching exercises: {str(e)}"]
 
@@ -91,17 +137,13 @@ def update_one_exercise(recommendations,exercise,muscle):
     Return:
         recommendations: the new updated list of recommended exercises
     """
-    params = {"language": 2}  # default Language: English
-
     try:
-        response = requests.get(f"{BASE_URL}exercise/", params=params)
-        response.raise_for_status()
-        data = response.json().get("results", []) # getting data
-        
-        for workouts in data:
-            if muscle in workouts["description"].lower():
-                index = recommendations.index(exercise)
-                recommendations[index] = workouts["name"]
+        index = get_catalog_index()
+
+        for entry_id in find_exercise_ids(index, muscle):
+            name = index.records[entry_id].name
+            if name not in recommendations:
+                recommendations[recommendations.index(exercise)] = name
                 break
         return recommendations
     except requests.RequestException as e:
@@ -117,13 +159,16 @@ if __name__ == "__main__":
         muscle_groups_list = [muscle.strip() for muscle in target_muscle_groups.split(",")]
 
         target_time = int(input("\nEnter your target workout duration (in minutes): "))
+        owned_equipment = input("Enter the equipment you have, separated by commas (leave empty for any): ").strip()
+        equipment_list = [name.strip() for name in owned_equipment.split(",") if name.strip()] or None
 
-        print("\nFetching exercise recommendations...")
-        exercises = fetch_exercise_by_muscle_group(muscle_groups_list, target_time)
+        print("\nBuilding your workout plan...")
+        plan = build_workout_plan(muscle_groups_list, target_time, equipment_list)
+        exercises = [item.name for item in plan.items]
 
-        print(f"\nRecommended Exercises Targeting: {', '.join(muscle_groups_list)}")
-        for exercise in exercises:
-            print(f"- {exercise}")
+        print(f"\nWorkout Plan Targeting: {', '.join(muscle_groups_list)} ({plan.total_minutes} of {plan.budget_minutes} minutes)")
+        for item in plan.items:
+            print(f"- {item.name}: {item.sets} sets, {item.minutes} min ({item.equipment})")
 
         # Ask user if they want to update an exercise
         if exercises: